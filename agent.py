@@ -1,46 +1,279 @@
+import asyncio
+import contextvars
 import json
-import yaml
-from openai import OpenAI
-from tools import discover_tools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from openai.types.chat import ChatCompletionMessage
+from config_registry import load_config, get_tools, get_tool_schemas
+from context_manager import ContextManager
+from cancellation import CancellationToken, use_token
+from http_pool import get_openai_client, get_async_openai_client
+from rate_limiter import get_rate_limiter
+from llm_cache import get_llm_cache, LLMCacheMiss
+from telemetry import get_telemetry
+
+_tool_pool_lock = threading.Lock()
+_tool_executor = None
+
+def _tool_pool(config):
+    """Process-wide pool used to run independent tool calls of one turn concurrently"""
+    global _tool_executor
+    with _tool_pool_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(
+                max_workers=config.get('agent', {}).get('tool_workers', 16),
+                thread_name_prefix="agent-tool"
+            )
+        return _tool_executor
 
 class OpenRouterAgent:
-    def __init__(self, config_path="config.yaml", silent=False, tool_callback=None):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path="config.yaml", silent=False, tool_callback=None, cancel_token=None):
+        # Load configuration (parsed once per file version, shared read-only)
+        self.config = load_config(config_path)
         
         # Silent mode for orchestrator (suppresses debug output)
         self.silent = silent
         # Callback function for tool usage notifications
         self.tool_callback = tool_callback
         
+        # Cooperative cancellation: checked between steps, bounds every LLM call and tool wait
+        self.cancel_token = cancel_token or CancellationToken()
+        # Upper bound for a single LLM request, in seconds
+        self.llm_timeout = self.config.get('agent', {}).get('llm_timeout', 120)
+        # Model this agent talks to (the orchestrator routes phases to their own models),
+        # and the models tried in order when a request to it fails
+        self.model = self.config['openrouter']['model']
+        self.fallback_models = list(self.config['openrouter'].get('fallback_models') or [])
+        # Models that already failed for this agent are skipped while a fallback is left
+        self._failed_models = set()
+        
         # Initialize OpenAI client with OpenRouter
-        self.client = OpenAI(
-            base_url=self.config['openrouter']['base_url'],
-            api_key=self.config['openrouter']['api_key']
-        )
+        self.client = self._create_client()
+        # Process-wide request/token budget with retries, shared by every agent
+        self.rate_limiter = get_rate_limiter(self.config)
+        # Recorded responses for identical requests (llm_cache.mode: read_through/record/replay)
+        self.llm_cache = get_llm_cache(self.config)
+        
+        # Spans for each run, iteration, LLM call and tool call (telemetry.py).
+        # trace_parent is the span this agent's work hangs under (set by the orchestrator or web handler)
+        self.telemetry = get_telemetry(self.config)
+        self.trace_parent = None
+        self._run_span = None
+        self._iteration_span = None
         
-        # Discover tools dynamically
-        self.discovered_tools = discover_tools(self.config, silent=self.silent)
+        # Discover tools dynamically (cached registry, re-discovered when config.yaml changes)
+        self.discovered_tools = dict(get_tools(config_path, silent=self.silent))
         
-        # Build OpenRouter tools array
-        self.tools = [tool.to_openrouter_schema() for tool in self.discovered_tools.values()]
+        # Build OpenRouter tools array from the registry's immutable schemas
+        self.tools = list(get_tool_schemas(config_path, silent=self.silent))
         
         # Build tool mapping
         self.tool_mapping = {name: tool.execute for name, tool in self.discovered_tools.items()}
+        
+        # Keeps each request under the prompt token budget by compacting consumed tool outputs
+        self.context = ContextManager(self.config)
+        # Usage reported for the last streamed call (None if the provider sent none), read by the loop
+        # after the stream ends to calibrate the token counter like the non-streamed path does
+        self.stream_usage = None
     
+    def _create_client(self):
+        """Get the shared OpenAI-compatible client pointed at OpenRouter"""
+        return get_openai_client(self.config)
     
-    def call_llm(self, messages):
-        """Make OpenRouter API call with tools"""
+    def _request_tokens(self, messages) -> int:
+        """Prompt size charged to the shared token budget (only counted when one is configured)"""
+        return self.context.count_tokens(messages) if self.rate_limiter.limits_tokens else 0
+    
+    def _span_parent(self):
+        """Innermost open span of this agent: the current iteration, the run, or trace_parent"""
+        return self._iteration_span or self._run_span or self.trace_parent
+    
+    def _llm_span(self, stream: bool):
+        return self.telemetry.start_span("llm.call", parent=self._span_parent(), attributes={
+            "gen_ai.system": "openrouter",
+            "gen_ai.request.model": self.model,
+            "llm.stream": stream,
+        })
+    
+    def _tool_span(self, tool_name: str):
+        return self.telemetry.start_span("tool.call", parent=self._span_parent(), attributes={"gen_ai.tool.name": tool_name})
+    
+    def _record_usage(self, span, messages, message, usage):
+        """Token counts of a completed call; estimated locally when the provider reports none"""
+        if usage is not None and getattr(usage, 'prompt_tokens', None) is not None:
+            span.set("gen_ai.usage.input_tokens", usage.prompt_tokens)
+            span.set("gen_ai.usage.output_tokens", usage.completion_tokens or 0)
+        else:
+            span.set("gen_ai.usage.input_tokens", self.context.count_tokens(messages))
+            span.set("gen_ai.usage.output_tokens", self.context.count_tokens([message]) if message is not None else 0)
+            span.set("llm.usage_estimated", True)
+    
+    @contextmanager
+    def _traced_run(self):
+        """Span covering one run; the loop opens an iteration span per turn under it"""
+        self._run_span = self.telemetry.start_span("agent.run", parent=self.trace_parent)
         try:
-            response = self.client.chat.completions.create(
-                model=self.config['openrouter']['model'],
-                messages=messages,
-                tools=self.tools
+            with self._run_span:
+                try:
+                    yield
+                finally:
+                    self._next_iteration(None)
+        finally:
+            self._run_span = None
+    
+    def _next_iteration(self, iteration):
+        """Close the open iteration span and, unless iteration is None, open the next one"""
+        if self._iteration_span is not None:
+            self._iteration_span.end()
+        self._iteration_span = None
+        if iteration is not None:
+            self._iteration_span = self.telemetry.start_span(
+                "agent.iteration", parent=self._run_span, attributes={"agent.iteration": iteration}
             )
+    
+    def _models(self):
+        """The agent's model followed by its fallbacks, each tried once"""
+        models = list(dict.fromkeys([self.model, *self.fallback_models]))
+        return [model for model in models if model not in self._failed_models] or models
+    
+    def _create(self, span, messages, **kwargs):
+        """Send a chat completion through the rate limiter, moving on to the next fallback model on failure"""
+        error = None
+        for model in self._models():
+            try:
+                response = self.rate_limiter.call(
+                    lambda: self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=self.tools,
+                        timeout=self.cancel_token.bound(self.llm_timeout),
+                        **kwargs
+                    ),
+                    tokens=self._request_tokens(messages),
+                    token=self.cancel_token
+                )
+            except Exception as e:
+                # A timeout caused by the agent deadline is a cancellation, not an LLM failure
+                self.cancel_token.raise_if_cancelled()
+                error = e
+                self._failed_models.add(model)
+                continue
+            self._record_model(span, model)
             return response
-        except Exception as e:
-            raise Exception(f"LLM call failed: {str(e)}")
+        raise Exception(f"LLM call failed: {str(error)}")
+    
+    def _record_model(self, span, model):
+        span.set("gen_ai.response.model", model)
+        if model != self.model:
+            span.set("llm.fallback", True)
+    
+    def _cache_answer(self, span, cache_key, message, usage):
+        """Record an answer for identical requests; a fallback model's answer would be replayed as the primary's"""
+        if message is not None and not span.attributes.get("llm.fallback"):
+            self.llm_cache.put(cache_key, self.model, message, usage)
+    
+    def call_llm(self, messages):
+        """Make OpenRouter API call with tools"""
+        self.cancel_token.raise_if_cancelled()
+        with self._llm_span(stream=False) as span:
+            cache_key = self.llm_cache.key(self.model, messages, self.tools)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                span.set("llm.cache_hit", True)
+                return cached
+            response = self._create(span, messages)
+            message = response.choices[0].message if response.choices else None
+            self._cache_answer(span, cache_key, message, response.usage)
+            self._record_usage(span, messages, message, response.usage)
+            return response
+    
+    def call_llm_stream(self, messages):
+        """
+        Make a streaming OpenRouter API call with tools.
+        Yields content tokens as they arrive and returns the assembled assistant message.
+        """
+        content_parts = []
+        tool_calls = {}
+        usage = None
+        self.stream_usage = None
+        
+        self.cancel_token.raise_if_cancelled()
+        with self._llm_span(stream=True) as span:
+            cache_key = self.llm_cache.key(self.model, messages, self.tools)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                # A recorded answer arrives as a single token
+                span.set("llm.cache_hit", True)
+                self.stream_usage = cached.usage
+                message = cached.choices[0].message
+                if message.content:
+                    yield message.content
+                return message
+            # Only opening the stream is retried (or falls back): tokens already yielded cannot be taken back
+            stream = self._create(span, messages, stream=True, stream_options={"include_usage": True})
+            try:
+                for chunk in stream:
+                    if self.cancel_token.cancelled:
+                        # Closing the response drops the connection, so the provider stops generating
+                        stream.close()
+                        break
+                    # Providers that report usage for streams send it with the last chunk
+                    usage = getattr(chunk, 'usage', None) or usage
+                    token = self._accumulate_chunk(chunk, content_parts, tool_calls)
+                    if token:
+                        span.attributes.setdefault("llm.time_to_first_token_ms", round(span.duration * 1000, 1))
+                        yield token
+            except Exception as e:
+                self.cancel_token.raise_if_cancelled()
+                raise Exception(f"LLM call failed: {str(e)}")
+            self.cancel_token.raise_if_cancelled()
+            
+            message = self._assemble_message(content_parts, tool_calls)
+            self._cache_answer(span, cache_key, message, usage)
+            self._record_usage(span, messages, message, usage)
+            self.stream_usage = usage
+            return message
+    
+    @staticmethod
+    def _accumulate_chunk(chunk, content_parts, tool_calls):
+        """Fold one streamed chunk into the partial message and return its content token, if any"""
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        
+        if delta.content:
+            content_parts.append(delta.content)
+        
+        # Tool calls arrive as fragments keyed by index: rebuild them incrementally
+        for fragment in delta.tool_calls or []:
+            index = fragment.index
+            if index is None:
+                # Some providers omit the index: a new id starts a new call
+                index = len(tool_calls) if fragment.id or not tool_calls else len(tool_calls) - 1
+            entry = tool_calls.setdefault(index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if fragment.id:
+                entry["id"] = fragment.id
+            if fragment.function:
+                if fragment.function.name:
+                    entry["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    entry["function"]["arguments"] += fragment.function.arguments
+        
+        return delta.content
+    
+    @staticmethod
+    def _assemble_message(content_parts, tool_calls):
+        """Build the assistant message from accumulated stream fragments"""
+        return ChatCompletionMessage.model_validate({
+            "role": "assistant",
+            "content": "".join(content_parts) or None,
+            "tool_calls": [tool_calls[i] for i in sorted(tool_calls)] or None
+        })
     
     def handle_tool_call(self, tool_call):
         """Handle a tool call and return the result message"""
@@ -57,9 +290,11 @@ class OpenRouterAgent:
                     'tool_args': tool_args
                 })
             
-            # Call appropriate tool from tool_mapping
+            # Call appropriate tool from tool_mapping; tools see this agent's token via current_token()
             if tool_name in self.tool_mapping:
-                tool_result = self.tool_mapping[tool_name](**tool_args)
+                with use_token(self.cancel_token), self._tool_span(tool_name) as span:
+                    tool_result = self._execute_tool(tool_name, tool_args)
+                    span.end(error=tool_result.get("error") if isinstance(tool_result, dict) else None)
             else:
                 tool_result = {"error": f"Unknown tool: {tool_name}"}
             
@@ -72,23 +307,83 @@ class OpenRouterAgent:
                 })
             
             # Return tool result message
-            return {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": tool_name,
-                "content": json.dumps(tool_result)
-            }
+            return self._tool_message(tool_call, tool_name, tool_result)
         
+        except LLMCacheMiss:
+            # Replay must fail fast instead of handing the model an error it never saw while recording
+            raise
         except Exception as e:
-            return {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": tool_name,
-                "content": json.dumps({"error": f"Tool execution failed: {str(e)}"})
-            }
+            return self._tool_message(tool_call, tool_name, {"error": f"Tool execution failed: {str(e)}"})
     
-    def run(self, user_input: str):
-        """Run the agent with user input and return FULL conversation content"""
+    def _execute_tool(self, tool_name, tool_args):
+        """Run a tool; results of side-effect free tools are recorded/replayed with LLM responses"""
+        execute = self.tool_mapping[tool_name]
+        if self.discovered_tools[tool_name].side_effecting:
+            return execute(**tool_args)
+        return self.llm_cache.run_tool(tool_name, tool_args, lambda: execute(**tool_args))
+    
+    @staticmethod
+    def _tool_message(tool_call, tool_name, tool_result):
+        """Build the tool result message appended to the conversation"""
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "name": tool_name,
+            "content": json.dumps(tool_result)
+        }
+    
+    def handle_tool_calls(self, tool_calls):
+        """
+        Handle all tool calls of one assistant turn and return their result messages in order.
+        Independent calls are dispatched concurrently; side-effecting tools act as barriers.
+        """
+        results = []
+        for batch in self._tool_call_batches(tool_calls):
+            if len(batch) == 1:
+                results.append(self.handle_tool_call(batch[0]))
+            else:
+                # Each call runs in a copy of the caller's context so context variables follow it
+                futures = [
+                    _tool_pool(self.config).submit(contextvars.copy_context().run, self.handle_tool_call, tool_call)
+                    for tool_call in batch
+                ]
+                # Stop waiting once the agent is cancelled; the tools see the same token and wind down
+                wait(futures, timeout=self.cancel_token.remaining())
+                self.cancel_token.raise_if_cancelled()
+                results.extend(future.result() for future in futures)
+        return results
+    
+    @staticmethod
+    def _calls_until_completion(tool_calls):
+        """Drop calls after mark_task_complete: the loop exits there, so they were never run"""
+        for index, tool_call in enumerate(tool_calls):
+            if tool_call.function.name == "mark_task_complete":
+                return tool_calls[:index + 1]
+        return tool_calls
+    
+    def _tool_call_batches(self, tool_calls):
+        """
+        Split a turn's tool calls into batches that may run concurrently.
+        A side-effecting tool always gets a batch of its own, so it is ordered
+        with respect to every call before and after it.
+        """
+        batches = []
+        current = []
+        for tool_call in tool_calls:
+            tool = self.discovered_tools.get(tool_call.function.name)
+            if tool is not None and tool.side_effecting:
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([tool_call])
+            else:
+                current.append(tool_call)
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _initial_messages(self, user_input: str):
+        """Build the system prompt and user message that start the conversation"""
         # Import datetime for dynamic date injection
         from datetime import datetime
         
@@ -104,7 +399,7 @@ class OpenRouterAgent:
             system_prompt = f"{system_prompt}\n\nCurrent date: {current_date}"
         
         # Initialize messages with system prompt and user input
-        messages = [
+        return [
             {
                 "role": "system",
                 "content": system_prompt
@@ -114,6 +409,29 @@ class OpenRouterAgent:
                 "content": user_input
             }
         ]
+    
+    def run(self, user_input: str):
+        """Run the agent with user input and return FULL conversation content"""
+        # Drain the agent loop without streaming; only its return value matters here
+        loop = self._run_loop(user_input, stream=False)
+        with self._traced_run():
+            while True:
+                try:
+                    next(loop)
+                except StopIteration as done:
+                    return done.value
+    
+    def run_stream(self, user_input: str):
+        """
+        Run the agent with user input, yielding content tokens as the model produces them.
+        Returns the FULL conversation content once the loop finishes.
+        """
+        with self._traced_run():
+            return (yield from self._run_loop(user_input, stream=True))
+    
+    def _run_loop(self, user_input: str, stream: bool):
+        """Agentic loop shared by run() and run_stream()"""
+        messages = self._initial_messages(user_input)
         
         # Track all assistant responses for full content capture
         full_response_content = []
@@ -123,15 +441,37 @@ class OpenRouterAgent:
         iteration = 0
         
         while iteration < max_iterations:
+            self.cancel_token.raise_if_cancelled()
             iteration += 1
+            self._next_iteration(iteration)
             if not self.silent:
                 print(f"🔄 Agent iteration {iteration}/{max_iterations}")
             
+            # Compact stale tool outputs so the request stays under the token budget
+            self.context.compact(messages)
+            
             # Call LLM
-            response = self.call_llm(messages)
+            if stream:
+                # Separate consecutive assistant messages like the joined full response does
+                separator = "\n\n" if full_response_content else ""
+                tokens = self.call_llm_stream(messages)
+                while True:
+                    try:
+                        token = next(tokens)
+                    except StopIteration as done:
+                        assistant_message = done.value
+                        break
+                    yield separator + token
+                    separator = ""
+                if self.stream_usage:
+                    self.context.record_usage(messages, self.stream_usage.prompt_tokens)
+            else:
+                response = self.call_llm(messages)
+                assistant_message = response.choices[0].message
+                if response.usage:
+                    self.context.record_usage(messages, response.usage.prompt_tokens)
             
             # Add the response to messages
-            assistant_message = response.choices[0].message
             messages.append({
                 "role": "assistant",
                 "content": assistant_message.content,
@@ -146,24 +486,19 @@ class OpenRouterAgent:
             if assistant_message.tool_calls:
                 if not self.silent:
                     print(f"🔧 Agent making {len(assistant_message.tool_calls)} tool call(s)")
-                # Handle each tool call
-                task_completed = False
-                for tool_call in assistant_message.tool_calls:
+                tool_calls = self._calls_until_completion(assistant_message.tool_calls)
+                for tool_call in tool_calls:
                     if not self.silent:
                         print(f"   📞 Calling tool: {tool_call.function.name}")
-                    tool_result = self.handle_tool_call(tool_call)
-                    messages.append(tool_result)
-                    
-                    # Check if this was the task completion tool
-                    if tool_call.function.name == "mark_task_complete":
-                        task_completed = True
-                        if not self.silent:
-                            print("✅ Task completion tool called - exiting loop")
-                        # Return FULL conversation content, not just completion message
-                        return "\n\n".join(full_response_content)
                 
-                # If task was completed, we already returned above
-                if task_completed:
+                # Independent calls run concurrently; results keep the original tool_call order
+                messages.extend(self.handle_tool_calls(tool_calls))
+                
+                # Check if the task completion tool was called
+                if tool_calls[-1].function.name == "mark_task_complete":
+                    if not self.silent:
+                        print("✅ Task completion tool called - exiting loop")
+                    # Return FULL conversation content, not just completion message
                     return "\n\n".join(full_response_content)
             else:
                 if not self.silent:
@@ -172,4 +507,265 @@ class OpenRouterAgent:
             # Continue the loop regardless of whether there were tool calls or not
         
         # If max iterations reached, return whatever content we gathered
-        return "\n\n".join(full_response_content) if full_response_content else "Maximum iterations reached. The agent may be stuck in a loop."
\ No newline at end of file
+        return "\n\n".join(full_response_content) if full_response_content else "Maximum iterations reached. The agent may be stuck in a loop."
+
+
+class AsyncOpenRouterAgent(OpenRouterAgent):
+    """
+    Native asyncio variant of OpenRouterAgent.
+    LLM calls go through AsyncOpenAI and tools run through BaseTool.aexecute,
+    so many agents can share one event loop without a thread each.
+    """
+    
+    def __init__(self, config_path="config.yaml", silent=False, tool_callback=None, cancel_token=None):
+        super().__init__(config_path=config_path, silent=silent, tool_callback=tool_callback, cancel_token=cancel_token)
+        
+        # Map tool names to their async entry points
+        self.tool_mapping = {name: tool.aexecute for name, tool in self.discovered_tools.items()}
+    
+    def _create_client(self):
+        """Get the shared async OpenAI-compatible client pointed at OpenRouter"""
+        return get_async_openai_client(self.config)
+    
+    async def _create(self, span, messages, **kwargs):
+        """Send a chat completion through the rate limiter, moving on to the next fallback model on failure"""
+        error = None
+        for model in self._models():
+            try:
+                response = await self.rate_limiter.acall(
+                    lambda: self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=self.tools,
+                        timeout=self.cancel_token.bound(self.llm_timeout),
+                        **kwargs
+                    ),
+                    tokens=self._request_tokens(messages),
+                    token=self.cancel_token
+                )
+            except Exception as e:
+                self.cancel_token.raise_if_cancelled()
+                error = e
+                self._failed_models.add(model)
+                continue
+            self._record_model(span, model)
+            return response
+        raise Exception(f"LLM call failed: {str(error)}")
+    
+    async def call_llm(self, messages):
+        """Make OpenRouter API call with tools"""
+        self.cancel_token.raise_if_cancelled()
+        with self._llm_span(stream=False) as span:
+            cache_key = self.llm_cache.key(self.model, messages, self.tools)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                span.set("llm.cache_hit", True)
+                return cached
+            response = await self._create(span, messages)
+            message = response.choices[0].message if response.choices else None
+            self._cache_answer(span, cache_key, message, response.usage)
+            self._record_usage(span, messages, message, response.usage)
+            return response
+    
+    async def call_llm_stream(self, messages):
+        """
+        Make a streaming OpenRouter API call with tools.
+        Yields content tokens as they arrive; the final item is the assembled assistant message.
+        """
+        content_parts = []
+        tool_calls = {}
+        usage = None
+        self.stream_usage = None
+        
+        self.cancel_token.raise_if_cancelled()
+        with self._llm_span(stream=True) as span:
+            cache_key = self.llm_cache.key(self.model, messages, self.tools)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                # A recorded answer arrives as a single token
+                span.set("llm.cache_hit", True)
+                self.stream_usage = cached.usage
+                message = cached.choices[0].message
+                if message.content:
+                    yield message.content
+                yield message
+                return
+            stream = await self._create(span, messages, stream=True, stream_options={"include_usage": True})
+            try:
+                async for chunk in stream:
+                    if self.cancel_token.cancelled:
+                        # Closing the response drops the connection, so the provider stops generating
+                        await stream.close()
+                        break
+                    # Providers that report usage for streams send it with the last chunk
+                    usage = getattr(chunk, 'usage', None) or usage
+                    token = self._accumulate_chunk(chunk, content_parts, tool_calls)
+                    if token:
+                        span.attributes.setdefault("llm.time_to_first_token_ms", round(span.duration * 1000, 1))
+                        yield token
+            except Exception as e:
+                self.cancel_token.raise_if_cancelled()
+                raise Exception(f"LLM call failed: {str(e)}")
+            self.cancel_token.raise_if_cancelled()
+            
+            message = self._assemble_message(content_parts, tool_calls)
+            self._cache_answer(span, cache_key, message, usage)
+            self._record_usage(span, messages, message, usage)
+            self.stream_usage = usage
+            yield message
+    
+    async def _execute_tool(self, tool_name, tool_args):
+        """Run a tool; results of side-effect free tools are recorded/replayed with LLM responses"""
+        execute = self.tool_mapping[tool_name]
+        if self.discovered_tools[tool_name].side_effecting:
+            return await execute(**tool_args)
+        return await self.llm_cache.arun_tool(tool_name, tool_args, lambda: execute(**tool_args))
+    
+    async def handle_tool_call(self, tool_call):
+        """Handle a tool call and return the result message"""
+        try:
+            # Extract tool name and arguments
+            tool_name = tool_call.function.name
+            tool_args = json.loads(tool_call.function.arguments)
+            
+            # Notify about tool usage if callback is provided
+            if self.tool_callback:
+                self.tool_callback({
+                    'type': 'tool_start',
+                    'tool_name': tool_name,
+                    'tool_args': tool_args
+                })
+            
+            # Call appropriate tool from tool_mapping; tools see this agent's token via current_token()
+            if tool_name in self.tool_mapping:
+                with use_token(self.cancel_token), self._tool_span(tool_name) as span:
+                    tool_result = await self._execute_tool(tool_name, tool_args)
+                    span.end(error=tool_result.get("error") if isinstance(tool_result, dict) else None)
+            else:
+                tool_result = {"error": f"Unknown tool: {tool_name}"}
+            
+            # Notify about tool completion if callback is provided
+            if self.tool_callback:
+                self.tool_callback({
+                    'type': 'tool_complete',
+                    'tool_name': tool_name,
+                    'tool_result': tool_result
+                })
+            
+            # Return tool result message
+            return self._tool_message(tool_call, tool_name, tool_result)
+        
+        except LLMCacheMiss:
+            # Replay must fail fast instead of handing the model an error it never saw while recording
+            raise
+        except Exception as e:
+            return self._tool_message(tool_call, tool_name, {"error": f"Tool execution failed: {str(e)}"})
+    
+    async def handle_tool_calls(self, tool_calls):
+        """
+        Handle all tool calls of one assistant turn and return their result messages in order.
+        Independent calls are awaited concurrently; side-effecting tools act as barriers.
+        """
+        results = []
+        for batch in self._tool_call_batches(tool_calls):
+            try:
+                # gather() returns results in submission order
+                results.extend(await asyncio.wait_for(
+                    asyncio.gather(*[self.handle_tool_call(tool_call) for tool_call in batch]),
+                    timeout=self.cancel_token.remaining()
+                ))
+            except asyncio.TimeoutError:
+                self.cancel_token.raise_if_cancelled()
+                raise
+        return results
+    
+    async def run(self, user_input: str):
+        """Run the agent with user input and return FULL conversation content"""
+        with self._traced_run():
+            async for kind, data in self._run_loop(user_input, stream=False):
+                if kind == "done":
+                    return data
+    
+    async def run_stream(self, user_input: str):
+        """Run the agent with user input, yielding content tokens as the model produces them"""
+        with self._traced_run():
+            async for kind, data in self._run_loop(user_input, stream=True):
+                if kind == "token":
+                    yield data
+    
+    async def _run_loop(self, user_input: str, stream: bool):
+        """
+        Agentic loop shared by run() and run_stream().
+        Yields ("token", text) items while streaming and a final ("done", full_content) item.
+        """
+        messages = self._initial_messages(user_input)
+        
+        # Track all assistant responses for full content capture
+        full_response_content = []
+        
+        max_iterations = self.config.get('agent', {}).get('max_iterations', 10)
+        iteration = 0
+        
+        while iteration < max_iterations:
+            self.cancel_token.raise_if_cancelled()
+            iteration += 1
+            self._next_iteration(iteration)
+            if not self.silent:
+                print(f"🔄 Agent iteration {iteration}/{max_iterations}")
+            
+            # Compact stale tool outputs so the request stays under the token budget
+            self.context.compact(messages)
+            
+            # Call LLM
+            if stream:
+                # Separate consecutive assistant messages like the joined full response does
+                separator = "\n\n" if full_response_content else ""
+                async for item in self.call_llm_stream(messages):
+                    if isinstance(item, str):
+                        yield "token", separator + item
+                        separator = ""
+                    else:
+                        assistant_message = item
+                if self.stream_usage:
+                    self.context.record_usage(messages, self.stream_usage.prompt_tokens)
+            else:
+                response = await self.call_llm(messages)
+                assistant_message = response.choices[0].message
+                if response.usage:
+                    self.context.record_usage(messages, response.usage.prompt_tokens)
+            
+            # Add the response to messages
+            messages.append({
+                "role": "assistant",
+                "content": assistant_message.content,
+                "tool_calls": assistant_message.tool_calls
+            })
+            
+            # Capture assistant content for full response
+            if assistant_message.content:
+                full_response_content.append(assistant_message.content)
+            
+            # Check if there are tool calls
+            if assistant_message.tool_calls:
+                if not self.silent:
+                    print(f"🔧 Agent making {len(assistant_message.tool_calls)} tool call(s)")
+                tool_calls = self._calls_until_completion(assistant_message.tool_calls)
+                for tool_call in tool_calls:
+                    if not self.silent:
+                        print(f"   📞 Calling tool: {tool_call.function.name}")
+                
+                # Independent calls run concurrently; results keep the original tool_call order
+                messages.extend(await self.handle_tool_calls(tool_calls))
+                
+                # Check if the task completion tool was called
+                if tool_calls[-1].function.name == "mark_task_complete":
+                    if not self.silent:
+                        print("✅ Task completion tool called - exiting loop")
+                    yield "done", "\n\n".join(full_response_content)
+                    return
+            else:
+                if not self.silent:
+                    print("💭 Agent responded without tool calls - continuing loop")
+        
+        # If max iterations reached, return whatever content we gathered
+        yield "done", "\n\n".join(full_response_content) if full_response_content else "Maximum iterations reached. The agent may be stuck in a loop."
\ No newline at end of file
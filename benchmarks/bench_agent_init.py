@@ -0,0 +1,67 @@
+"""
+Benchmark agent and orchestrator construction time.
+
+"cold" invalidates the config/tool registry and the shared client pool before every
+construction, which reproduces the previous behaviour (YAML parse, tool discovery and
+a new OpenAI client per agent). "warm" is the cached path used at runtime.
+
+Usage: python benchmarks/bench_agent_init.py [--config config.yaml] [--iterations 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config_registry
+import http_pool
+from agent import OpenRouterAgent
+from orchestrator import TaskOrchestrator
+
+
+def measure(factory, iterations, cold):
+    """Return per-construction timings in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            config_registry.invalidate()
+            http_pool.close_http_clients()
+        start = time.perf_counter()
+        factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    """Print summary statistics for one benchmark case"""
+    print(f"{label:<32} mean {statistics.mean(timings):8.3f} ms   "
+          f"median {statistics.median(timings):8.3f} ms   max {max(timings):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent construction benchmark")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    
+    factories = {
+        "OpenRouterAgent": lambda: OpenRouterAgent(config_path=args.config, silent=True),
+        "TaskOrchestrator": lambda: TaskOrchestrator(config_path=args.config, silent=True),
+    }
+    
+    # Warm up imports so both modes measure construction only
+    for factory in factories.values():
+        factory()
+    
+    for name, factory in factories.items():
+        cold = measure(factory, args.iterations, cold=True)
+        warm = measure(factory, args.iterations, cold=False)
+        report(f"{name} (cold, before)", cold)
+        report(f"{name} (warm, after)", warm)
+        print(f"{'':<32} speedup x{statistics.mean(cold) / statistics.mean(warm):.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
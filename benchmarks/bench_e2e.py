@@ -0,0 +1,424 @@
+"""
+End-to-end benchmark against a local mock of OpenRouter and of the search result pages.
+
+Starts benchmarks/mock_openrouter.py, writes a config pointing at it (response caches off,
+so every request does the full work) and drives the pipeline under concurrent load:
+
+  agent         OpenRouterAgent.run_stream, one agent per request
+  orchestrator  TaskOrchestrator.orchestrate
+  stream        POST /api/stream on a web server started from main.py
+
+For each scenario it reports time to first token, p50/p95/p99 end-to-end latency,
+throughput, peak thread count and peak RSS (of this process, or of the web server),
+and writes everything as JSON. --compare prints the change against an earlier result file.
+
+Usage: python benchmarks/bench_e2e.py [--scenarios agent,orchestrator,stream] [--requests 16]
+                                      [--concurrency 4] [--latency 0.2] [--token-rate 200]
+                                      [--error-rate 0] [--output results.json] [--compare old.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import httpx
+import yaml
+
+MOCK_SERVER = os.path.join(REPO_DIR, "benchmarks", "mock_openrouter.py")
+QUESTION = "What changed in the European energy market over the last year?"
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def distribution(values):
+    """Summary statistics in milliseconds"""
+    if not values:
+        return None
+    return {
+        "mean_ms": statistics.mean(values) * 1000,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def proc_status(pid="self"):
+    """Thread count and resident set size (MB) from /proc, or None off Linux"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class ResourceSampler:
+    """Samples the peak thread count and RSS of a process while a scenario runs"""
+    
+    def __init__(self, pid="self", interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = None
+        self.peak_rss_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _sample(self):
+        status = proc_status(self.pid)
+        if status is None and self.pid == "self":
+            # No /proc: fall back to Python-level threads and the max RSS reported by the OS
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            status = (threading.active_count(), maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024))
+        if status is None:
+            return
+        threads, rss = status
+        self.peak_threads = max(self.peak_threads or 0, threads)
+        self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def wait_for(url, timeout=30):
+    """Poll a health endpoint until the server answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server did not come up: {url}")
+
+
+def start_mock(args):
+    """Start the mock OpenRouter server as a subprocess"""
+    command = [
+        sys.executable, MOCK_SERVER, "--port", str(args.mock_port),
+        "--latency", str(args.latency), "--token-rate", str(args.token_rate),
+        "--response-words", str(args.response_words), "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status), "--page-latency", str(args.page_latency),
+    ]
+    if args.retry_after is not None:
+        command += ["--retry-after", str(args.retry_after)]
+    if args.script:
+        command += ["--script", os.path.abspath(args.script)]
+    process = subprocess.Popen(command)
+    wait_for(f"http://127.0.0.1:{args.mock_port}/health")
+    return process
+
+
+def write_config(args, workdir):
+    """Benchmark config: the repo config pointed at the mock, with response caches disabled"""
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config["openrouter"]["base_url"] = f"http://127.0.0.1:{args.mock_port}/v1"
+    config["openrouter"]["api_key"] = "benchmark"
+    config.setdefault("cache", {})["enabled"] = False
+    config.setdefault("llm_cache", {})["mode"] = "off"
+    jobs_config = config.setdefault("jobs", {})
+    jobs_config["workers"] = 0
+    jobs_config["path"] = os.path.join(workdir, "jobs.sqlite")
+    rate_limit = config.setdefault("rate_limit", {})
+    rate_limit["requests_per_minute"] = args.rpm
+    rate_limit["backoff_base"] = args.backoff_base
+    with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+
+
+def mock_stats(args):
+    return httpx.get(f"http://127.0.0.1:{args.mock_port}/stats", timeout=5).json()
+
+
+def run_threaded(request, args, sampler_pid="self"):
+    """Run request() args.requests times with args.concurrency threads and collect metrics"""
+    latencies, ttfts, errors = [], [], []
+    
+    def one():
+        start = time.perf_counter()
+        try:
+            first_token = request()
+        except Exception as e:
+            errors.append(str(e))
+            return
+        latencies.append(time.perf_counter() - start)
+        if first_token is not None:
+            ttfts.append(first_token - start)
+    
+    stats_before = mock_stats(args)
+    with ResourceSampler(sampler_pid) as sampler:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for _ in range(args.requests):
+                executor.submit(one)
+        wall = time.perf_counter() - wall_start
+    return summarize(args, latencies, ttfts, errors, wall, sampler, stats_before)
+
+
+def summarize(args, latencies, ttfts, errors, wall, sampler, stats_before):
+    stats_after = mock_stats(args)
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_time_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else None,
+        "latency": distribution(latencies),
+        "ttft": distribution(ttfts),
+        "peak_threads": sampler.peak_threads,
+        "peak_rss_mb": sampler.peak_rss_mb,
+        "llm_requests": stats_after["requests"] - stats_before["requests"],
+        "injected_errors": stats_after["errors"] - stats_before["errors"],
+    }
+
+
+def bench_agent(args):
+    from agent import OpenRouterAgent
+    
+    def request():
+        agent = OpenRouterAgent(silent=True)
+        first_token = None
+        for _ in agent.run_stream(QUESTION):
+            if first_token is None:
+                first_token = time.perf_counter()
+        return first_token
+    
+    return run_threaded(request, args)
+
+
+def bench_orchestrator(args):
+    from orchestrator import TaskOrchestrator
+    
+    def request():
+        first_token = []
+        orchestrator = TaskOrchestrator(silent=True)
+        orchestrator.orchestrate(
+            QUESTION,
+            content_callback=lambda token: first_token.append(time.perf_counter()) if not first_token else None
+        )
+        # Only the hierarchical strategy streams the final answer
+        return first_token[0] if first_token else None
+    
+    return run_threaded(request, args)
+
+
+def bench_stream(args, workdir):
+    """Concurrent SSE clients against /api/stream on a web server subprocess"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-web", str(args.web_port),
+         "--mock-port", str(args.mock_port)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{args.web_port}/api/health")
+        return asyncio.run(_stream_load(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def _stream_load(args, server_pid):
+    latencies, ttfts, errors = [], [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    url = f"http://127.0.0.1:{args.web_port}/api/stream"
+    payload = {"message": QUESTION, "use_orchestrator": args.stream_orchestrator}
+    
+    async def one(client):
+        async with semaphore:
+            start = time.perf_counter()
+            first_token = None
+            try:
+                async with client.stream("POST", url, json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: ") or line == "data: [DONE]":
+                            continue
+                        event = json.loads(line[6:])
+                        if event.get("type") == "error":
+                            raise RuntimeError(event.get("data"))
+                        if event.get("type") == "content" and first_token is None:
+                            first_token = time.perf_counter()
+            except Exception as e:
+                errors.append(str(e))
+                return
+            latencies.append(time.perf_counter() - start)
+            if first_token is not None:
+                ttfts.append(first_token - start)
+    
+    stats_before = mock_stats(args)
+    with ResourceSampler(server_pid) as sampler:
+        wall_start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=None) as client:
+            await asyncio.gather(*(one(client) for _ in range(args.requests)))
+        wall = time.perf_counter() - wall_start
+    return summarize(args, latencies, ttfts, errors, wall, sampler, stats_before)
+
+
+def serve_web(args):
+    """Web server entry point for the stream scenario (runs in the benchmark work directory)"""
+    from benchmarks.mock_openrouter import patch_search
+    patch_search(f"http://127.0.0.1:{args.mock_port}")
+    import main as web
+    web.web_main(args.serve_web)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the relative change of the headline metrics against an earlier run"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    metrics = [("latency", "p50_ms"), ("latency", "p95_ms"), ("latency", "p99_ms"), ("ttft", "p50_ms"),
+               ("throughput_rps", None), ("peak_threads", None), ("peak_rss_mb", None)]
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        for group, key in metrics:
+            new = current.get(group) if key is None else (current.get(group) or {}).get(key)
+            old = previous.get(group) if key is None else (previous.get(group) or {}).get(key)
+            if new is None or old is None or old == 0:
+                continue
+            label = f"{group}.{key}" if key else group
+            print(f"  {scenario:<13} {label:<16} {old:10.1f} -> {new:10.1f}  ({(new - old) / old * 100:+.1f}%)")
+
+
+def milliseconds(summary, key):
+    value = (summary or {}).get(key)
+    return f"{value:8.1f} ms" if value is not None else f"{'n/a':>8}   "
+
+
+def report(name, result):
+    latency, ttft = result["latency"], result["ttft"]
+    print(f"{name:<13} {result['completed']}/{result['requests']} ok  "
+          f"{result['throughput_rps'] or 0:6.2f} req/s  "
+          f"p50 {milliseconds(latency, 'p50_ms')}  p95 {milliseconds(latency, 'p95_ms')}  "
+          f"p99 {milliseconds(latency, 'p99_ms')}  ttft p50 {milliseconds(ttft, 'p50_ms')}  "
+          f"threads {result['peak_threads']}  rss {result['peak_rss_mb'] or 0:.0f} MB")
+    if result["first_error"]:
+        print(f"{'':<13} first error: {result['first_error']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark with a mock OpenRouter server")
+    parser.add_argument("--scenarios", default="agent,orchestrator,stream")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--config", default=os.path.join(REPO_DIR, "config.yaml"), help="Base config")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Mock tokens per second")
+    parser.add_argument("--response-words", type=int, default=120)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM requests failing")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--script", default=None, help="Tool-call script for the mock (JSON)")
+    parser.add_argument("--rpm", type=int, default=0, help="rate_limit.requests_per_minute (0: unlimited)")
+    parser.add_argument("--backoff-base", type=float, default=0.1, help="rate_limit.backoff_base")
+    parser.add_argument("--stream-orchestrator", action=argparse.BooleanOptionalAction, default=True,
+                        help="Use heavy mode for /api/stream requests")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--web-port", type=int, default=9101)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare with")
+    parser.add_argument("--serve-web", type=int, default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.serve_web is not None:
+        serve_web(args)
+        return
+    
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    mock = start_mock(args)
+    cwd = os.getcwd()
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "compare", "serve_web", "config")},
+        "scenarios": {},
+    }
+    try:
+        write_config(args, workdir)
+        # Agents and the orchestrator read config.yaml from the working directory
+        os.chdir(workdir)
+        from benchmarks.mock_openrouter import patch_search
+        patch_search(f"http://127.0.0.1:{args.mock_port}")
+        runners = {
+            "agent": lambda: bench_agent(args),
+            "orchestrator": lambda: bench_orchestrator(args),
+            "stream": lambda: bench_stream(args, workdir),
+        }
+        for name in scenarios:
+            if name not in runners:
+                raise SystemExit(f"Unknown scenario: {name} (expected {', '.join(runners)})")
+            results["scenarios"][name] = runners[name]()
+            report(name, results["scenarios"][name])
+    finally:
+        os.chdir(cwd)
+        mock.terminate()
+        mock.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    output = args.output or os.path.join(REPO_DIR, "benchmarks", "results", f"e2e-{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
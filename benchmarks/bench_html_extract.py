@@ -0,0 +1,88 @@
+"""
+Benchmark HTML-to-text extraction over saved HTML fixtures.
+
+"baseline" is the previous SearchTool pipeline: BeautifulSoup html.parser over the
+whole page, decompose script/style, get_text() on the full DOM, keep 1000 characters.
+Every available html_extract backend is then measured on the same bodies, fed in
+16 KiB chunks as they would arrive from the socket.
+
+Usage: python benchmarks/bench_html_extract.py [--fixtures DIR] [--iterations 20]
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+import html_extract
+
+CHUNK_SIZE = 16 * 1024
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+
+def baseline(body: bytes, max_chars: int) -> str:
+    """Previous pipeline, kept verbatim for comparison"""
+    soup = BeautifulSoup(body.decode("utf-8", errors="replace"), 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = ' '.join(soup.get_text().split())
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+
+def chunked(body: bytes):
+    """Yield the body in socket-sized chunks"""
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def measure(extract, body: bytes, iterations: int) -> float:
+    """Return the median extraction time in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        extract(body)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extraction benchmark")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-chars", type=int, default=1000)
+    args = parser.parse_args()
+    
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        sys.exit(f"No .html fixtures found in {args.fixtures}")
+    
+    candidates = {"baseline": lambda body: baseline(body, args.max_chars)}
+    for backend in html_extract.available_backends():
+        candidates[backend] = (
+            lambda body, backend=backend: html_extract.extract_text(chunked(body), args.max_chars, "utf-8", backend)
+        )
+    
+    totals = {name: 0.0 for name in candidates}
+    print(f"{'fixture':<28}{'KiB':>8}" + "".join(f"{name:>14}" for name in candidates))
+    for path in paths:
+        with open(path, "rb") as f:
+            body = f.read()
+        row = f"{os.path.basename(path):<28}{len(body) / 1024:>8.0f}"
+        for name, extract in candidates.items():
+            median_ms = measure(extract, body, args.iterations)
+            totals[name] += median_ms
+            row += f"{median_ms:>11.2f} ms"
+        print(row)
+    
+    print(f"{'total':<36}" + "".join(f"{totals[name]:>11.2f} ms" for name in candidates))
+    for name in candidates:
+        if name != "baseline":
+            print(f"{name}: x{totals['baseline'] / totals[name]:.1f} faster than baseline")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
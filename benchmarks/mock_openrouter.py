@@ -0,0 +1,190 @@
+"""
+Local stand-in for OpenRouter (OpenAI-compatible chat completions) and for web search pages.
+
+Agents with tools follow a script, one step per assistant turn: by default a web search
+followed by an answer that calls mark_task_complete. Tool-free calls are answered by prompt:
+question generation gets a JSON array of questions, everything else (summaries, synthesis)
+gets plain text. Latency, token rate and error injection are configurable.
+
+Usage: python benchmarks/mock_openrouter.py [--port 9100] [--latency 0.2] [--token-rate 200]
+                                             [--error-rate 0.05] [--script steps.json]
+
+A script file is a JSON list of steps, each {"content": "...", "tool": "name", "arguments": {...}}
+(all keys optional). The agent is told to finish once the script is exhausted.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+
+DEFAULT_SCRIPT = [
+    {"content": "Let me search for that.", "tool": "search_web", "arguments": {"query": "{question}"}},
+]
+
+WORDS = ("the agent found several relevant sources and cross-checked the figures they report "
+         "against each other before summarising the most important points for the user").split()
+
+
+def text_of(words: int) -> str:
+    """Deterministic filler text of the given length in words"""
+    return " ".join(WORDS[i % len(WORDS)] for i in range(words))
+
+
+def page_html(index: int, paragraphs: int) -> str:
+    """Search result page with boilerplate around the article text"""
+    body = "".join(f"<p>{text_of(60)} ({index}.{i})</p>" for i in range(paragraphs))
+    return (f"<html><head><title>Result {index}</title><style>p {{ margin: 0 }}</style>"
+            f"<script>var tracking = {index};</script></head>"
+            f"<body><nav>Home | News | About</nav><article><h1>Result {index}</h1>{body}</article>"
+            f"<footer>Copyright</footer></body></html>")
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Mock OpenRouter")
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    stats = {"requests": 0, "errors": 0, "streams": 0, "completion_tokens": 0}
+    
+    def plan(body: dict):
+        """Content and tool calls answering a request"""
+        messages = body.get("messages", [])
+        prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        if not body.get("tools"):
+            if "JSON array" in prompt:
+                questions = [f"Research angle {i + 1} of the question" for i in range(args.questions)]
+                return json.dumps(questions), []
+            return text_of(args.response_words), []
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        if turn < len(script):
+            step = script[turn]
+            calls = []
+            if step.get("tool"):
+                arguments = json.dumps(step.get("arguments", {})).replace("{question}", prompt[:200].replace('"', "'"))
+                calls.append((f"call_{turn}", step["tool"], arguments))
+            return step.get("content", ""), calls
+        answer = text_of(args.response_words)
+        done = json.dumps({"task_summary": "Answered the question", "completion_message": answer})
+        return answer, [(f"call_{turn}", "mark_task_complete", done)]
+    
+    def usage(body: dict, content: str) -> dict:
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_tokens = max(len(content.split()), 1)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+    
+    def tool_call_payload(calls, index_key=False):
+        payload = []
+        for index, (call_id, name, arguments) in enumerate(calls):
+            entry = {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+            if index_key:
+                entry["index"] = index
+            payload.append(entry)
+        return payload
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if args.error_rate and random.random() < args.error_rate:
+            stats["errors"] += 1
+            headers = {"retry-after": str(args.retry_after)} if args.retry_after is not None else {}
+            return JSONResponse({"error": {"message": "injected error", "code": args.error_status}},
+                                status_code=args.error_status, headers=headers)
+        content, calls = plan(body)
+        stats["completion_tokens"] += len(content.split())
+        await asyncio.sleep(args.latency)
+        created = int(time.time())
+        
+        if not body.get("stream"):
+            if args.token_rate:
+                await asyncio.sleep(len(content.split()) / args.token_rate)
+            message = {"role": "assistant", "content": content or None}
+            if calls:
+                message["tool_calls"] = tool_call_payload(calls)
+            return {
+                "id": "mock", "object": "chat.completion", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "tool_calls" if calls else "stop", "message": message}],
+                "usage": usage(body, content),
+            }
+        
+        stats["streams"] += 1
+        
+        async def events():
+            base = {"id": "mock", "object": "chat.completion.chunk", "created": created, "model": body.get("model")}
+            for word in content.split(" ") if content else []:
+                if args.token_rate:
+                    await asyncio.sleep(1 / args.token_rate)
+                chunk = {**base, "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if calls:
+                chunk = {**base, "choices": [{"index": 0, "delta": {"tool_calls": tool_call_payload(calls, index_key=True)}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            finish = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls" if calls else "stop"}]}
+            yield f"data: {json.dumps(finish)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage(body, content)})}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    @app.get("/pages/{index}")
+    async def page(index: int):
+        await asyncio.sleep(args.page_latency)
+        return HTMLResponse(page_html(index, args.page_paragraphs))
+    
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+    
+    return app
+
+
+def search_results(base_url: str, query: str, max_results: int) -> list:
+    """Search hits pointing at the mock pages, in the shape SearchTool._search returns"""
+    return [
+        {"title": f"Result {i} for {query}", "href": f"{base_url}/pages/{i}", "body": text_of(30)}
+        for i in range(max_results)
+    ]
+
+
+def patch_search(base_url: str):
+    """Point SearchTool at the mock pages instead of DuckDuckGo (call before agents are created)"""
+    from tools.search_tool import SearchTool
+    SearchTool._search = lambda self, query, max_results: search_results(base_url, query, max_results)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mock OpenRouter and search page server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens per second (0: instant)")
+    parser.add_argument("--response-words", type=int, default=120, help="Length of answers in words")
+    parser.add_argument("--questions", type=int, default=8, help="Questions returned to the decomposition")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with errors")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="Seconds before a search page is served")
+    parser.add_argument("--page-paragraphs", type=int, default=40)
+    parser.add_argument("--script", default=None, help="JSON file with the tool-call script of agents")
+    return parser
+
+
+def main():
+    import uvicorn
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Two-tier key/value cache shared across agents (and processes, through SQLite).
+# An in-memory LRU sits in front of an optional on-disk SQLite store; both tiers
+# honour per-entry TTLs and size limits. Concurrent computations of the same key
+# are coalesced so only one caller does the work.
+
+_MISSING = object()
+
+
+class TTLCache:
+    """In-memory LRU in front of an optional SQLite store, with TTLs and size-based eviction"""
+    
+    def __init__(self, name: str, path: Optional[str] = None, ttl: float = 3600,
+                 max_entries: int = 512, max_disk_bytes: int = 200 * 1024 * 1024):
+        self.name = name
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        
+        # In-memory front: key -> (expires_at, value), most recently used last
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # In-flight computations for request coalescing
+        self._inflight: Dict[str, Future] = {}
+        self._writes_since_prune = 0
+        
+        self._db = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (namespace, accessed_at)"
+            )
+            self._db.commit()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+            
+            if self._db is None:
+                return default
+            
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] <= now:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, key))
+                self._db.commit()
+                return default
+            
+            self._db.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.name, key)
+            )
+            self._db.commit()
+            value = json.loads(row[0])
+            # Promote disk hits into the memory tier
+            self._remember(key, row[1], value)
+            return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value in both tiers"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            
+            if self._db is None:
+                return
+            
+            payload = json.dumps(value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.name, key, payload, len(payload), expires_at, now)
+            )
+            self._db.commit()
+            
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 50:
+                self._writes_since_prune = 0
+                self._prune_disk(now)
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        Concurrent callers asking for the same missing key wait for a single computation.
+        Exceptions are propagated to every waiter and never cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            # Another owner may have stored the value between our miss and taking ownership
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def get_or_submit(self, key: str, compute: Callable[[], Any], executor, ttl: Optional[float] = None) -> Future:
+        """
+        Non-blocking get_or_compute: return a Future for the value, running compute on executor on a miss.
+        Concurrent callers share one Future, so waiting for a coalesced result never occupies a worker.
+        The shared Future must not be cancelled by callers.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            future = Future()
+            future.set_result(value)
+            return future
+        
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._inflight[key] = future
+        
+        def run():
+            try:
+                result = compute()
+                self.set(key, result, ttl)
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        
+        executor.submit(run)
+        return future
+    
+    def clear(self):
+        """Drop every entry of this cache from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                self._db.commit()
+    
+    def _remember(self, key: str, expires_at: float, value: Any):
+        """Insert into the memory tier, evicting least recently used entries (lock held)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def _prune_disk(self, now: float):
+        """Remove expired rows, then least recently used rows over the size budget (lock held)"""
+        self._db.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.name, now))
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.name,)
+        ).fetchone()[0]
+        if total > self.max_disk_bytes:
+            excess = total - self.max_disk_bytes
+            rows = self._db.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+                (self.name,)
+            ).fetchall()
+            stale = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                stale.append((self.name, key))
+                excess -= size
+            self._db.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", stale)
+        self._db.commit()
+
+
+_caches: Dict[Tuple[str, Optional[str]], TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, config: dict) -> TTLCache:
+    """
+    Return the process-wide cache instance for a name, configured from the 'cache' config section.
+    Every caller (and every worker process, through the SQLite file) shares the same entries.
+    """
+    cache_config = (config or {}).get('cache', {}) or {}
+    enabled = cache_config.get('enabled', True)
+    path = cache_config.get('path') if enabled else None
+    ttl = (cache_config.get('ttl', {}) or {}).get(name, cache_config.get('default_ttl', 3600))
+    # A disabled cache stores nothing but still coalesces concurrent computations
+    max_entries = cache_config.get('memory_entries', 512) if enabled else 0
+    
+    with _caches_lock:
+        cache = _caches.get((name, path))
+        if cache is None:
+            cache = TTLCache(
+                name,
+                path=path,
+                ttl=ttl,
+                max_entries=max_entries,
+                max_disk_bytes=int(cache_config.get('max_disk_mb', 200) * 1024 * 1024)
+            )
+            _caches[(name, path)] = cache
+        return cache
\ No newline at end of file
@@ -0,0 +1,94 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Cooperative cancellation for agent runs.
+# A CancellationToken carries an optional deadline and can be cancelled explicitly
+# (client disconnect, quorum reached, ...). Agents check it between LLM calls and
+# tool batches and bound every blocking call by its remaining time; tools reach
+# the token of the agent that called them through current_token().
+
+
+class OperationCancelled(Exception):
+    """Raised when an agent run is cancelled or its deadline has passed"""
+
+
+class CancellationToken:
+    """Cancellation flag with an optional deadline, optionally linked to a parent token"""
+    
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancellationToken"] = None):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.parent = parent
+        self.reason = None
+        self._event = threading.Event()
+    
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel this token and every token derived from it"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        return False
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (of this token or a parent), or None without one"""
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(self.deadline - time.monotonic(), 0)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+    
+    def bound(self, timeout: Optional[float]) -> Optional[float]:
+        """Clamp a timeout so a blocking call never outlives the token"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+    
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise OperationCancelled(f"Operation cancelled: {self.reason}")
+    
+    def child(self, timeout: Optional[float] = None) -> "CancellationToken":
+        """Derived token: cancelled with this one, optionally with a tighter deadline"""
+        return CancellationToken(timeout=timeout, parent=self)
+
+
+_current_token: contextvars.ContextVar = contextvars.ContextVar("cancellation_token", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Token of the agent run executing the current tool, if any"""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Raise OperationCancelled if the current agent run was cancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]):
+    """Make token the current one for the duration of the block"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
\ No newline at end of file
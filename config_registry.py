@@ -0,0 +1,96 @@
+import os
+import threading
+from typing import Any, Dict, Tuple
+import yaml
+from tools import discover_tools
+from tools.base_tool import BaseTool
+
+# Process-wide cache of parsed config files and discovered tools.
+# Entries are keyed by absolute config path and re-validated against the file's
+# mtime, so agents and orchestrators can be constructed per request at near-zero cost.
+
+_lock = threading.RLock()
+_configs: Dict[str, Tuple[int, dict]] = {}
+_tools: Dict[str, Tuple[int, Dict[str, BaseTool], tuple]] = {}
+
+
+class _FrozenDict(dict):
+    """Read-only dict: still JSON-serializable, but refuses in-place mutation"""
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Tool schemas are shared and read-only; copy them before modifying")
+    
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts into _FrozenDict and lists into tuples"""
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _config_entry(path: str) -> Tuple[int, dict]:
+    """Return (mtime, config) for an absolute path, re-parsing only if the file changed"""
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _configs.get(path)
+        if cached and cached[0] == mtime:
+            return cached
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        _configs[path] = (mtime, config)
+        return _configs[path]
+
+
+def load_config(config_path: str = "config.yaml") -> dict:
+    """
+    Return the parsed config, re-reading the YAML only when the file's mtime changes.
+    The returned dict is shared between callers and must be treated as read-only.
+    """
+    return _config_entry(os.path.abspath(config_path))[1]
+
+
+def get_tools(config_path: str = "config.yaml", silent: bool = False) -> Dict[str, BaseTool]:
+    """
+    Return the discovered tool instances for a config, discovering them once per config version.
+    Tool instances are shared by every agent using that config.
+    """
+    return _tool_entry(config_path, silent)[1]
+
+
+def get_tool_schemas(config_path: str = "config.yaml", silent: bool = False) -> tuple:
+    """Return the immutable OpenRouter schemas of the discovered tools"""
+    return _tool_entry(config_path, silent)[2]
+
+
+def _tool_entry(config_path: str, silent: bool):
+    """Return (mtime, tools, schemas) for a config, rediscovering tools when the config changed"""
+    path = os.path.abspath(config_path)
+    with _lock:
+        mtime, config = _config_entry(path)
+        cached = _tools.get(path)
+        if cached and cached[0] == mtime:
+            return cached
+        
+        tools = discover_tools(config, silent=silent)
+        schemas = tuple(_freeze(tool.to_openrouter_schema()) for tool in tools.values())
+        entry = (mtime, tools, schemas)
+        _tools[path] = entry
+        return entry
+
+
+def invalidate(config_path: str = None):
+    """Drop cached config and tools for one config file, or for all of them"""
+    with _lock:
+        if config_path is None:
+            _configs.clear()
+            _tools.clear()
+        else:
+            path = os.path.abspath(config_path)
+            _configs.pop(path, None)
+            _tools.pop(path, None)
\ No newline at end of file
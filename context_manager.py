@@ -0,0 +1,151 @@
+import json
+from typing import Any, List
+
+# Optional exact tokenizer; falls back to a characters-per-token estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+# Fixed per-message overhead of the chat format, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+
+class ContextManager:
+    """
+    Keeps an agent conversation under a prompt token budget.
+    Tool outputs the model has already responded to are compacted first (long strings
+    inside the JSON result are clipped); if the conversation is still over budget the
+    oldest tool outputs are reduced to a stub, and finally the newest ones are clipped.
+    The system prompt, user input and assistant messages are never modified.
+    """
+    
+    def __init__(self, config: dict):
+        context_config = config.get('agent', {}).get('context', {}) or {}
+        self.enabled = context_config.get('enabled', True)
+        self.max_prompt_tokens = context_config.get('max_prompt_tokens', 100000)
+        self.stale_tool_output_chars = context_config.get('stale_tool_output_chars', 2000)
+        # Ratio between the provider's reported prompt tokens and our estimate
+        self.calibration = 1.0
+    
+    def count_tokens(self, messages: List[Any]) -> int:
+        """Estimate the prompt tokens of a conversation"""
+        total = 0
+        for message in messages:
+            total += MESSAGE_OVERHEAD_TOKENS + self._text_tokens(_field(message, "content") or "")
+            for tool_call in _field(message, "tool_calls") or []:
+                function = _field(tool_call, "function")
+                total += self._text_tokens(_field(function, "name") or "")
+                total += self._text_tokens(_field(function, "arguments") or "")
+        return int(total * self.calibration)
+    
+    def record_usage(self, messages: List[Any], prompt_tokens: int):
+        """Calibrate the estimate against the prompt token count reported by the provider"""
+        self.calibration = 1.0
+        estimate = self.count_tokens(messages)
+        if estimate and prompt_tokens:
+            self.calibration = prompt_tokens / estimate
+    
+    def compact(self, messages: List[Any]) -> List[Any]:
+        """Compact the conversation in place so the next request fits the budget; returns messages"""
+        if not self.enabled:
+            return messages
+        
+        consumed = self._consumed_tool_indexes(messages)
+        
+        # 1. Tool outputs already answered by the model: clip long strings inside them
+        if self.stale_tool_output_chars:
+            for index in consumed:
+                self._shrink_tool_message(messages, index, self.stale_tool_output_chars)
+        
+        if self.count_tokens(messages) <= self.max_prompt_tokens:
+            return messages
+        
+        # 2. Still over budget: replace the oldest consumed outputs with a stub
+        for index in consumed:
+            content = messages[index]["content"]
+            messages[index] = dict(messages[index], content=json.dumps({
+                "note": f"Earlier tool output removed to fit the context budget ({len(content)} chars)"
+            }))
+            if self.count_tokens(messages) <= self.max_prompt_tokens:
+                return messages
+        
+        # 3. Finally clip the outputs the model has not seen yet, sharing what is left evenly
+        pending = [i for i, m in enumerate(messages) if _field(m, "role") == "tool" and i not in consumed]
+        if pending:
+            excess_chars = (self.count_tokens(messages) - self.max_prompt_tokens) * CHARS_PER_TOKEN
+            for index in pending:
+                content = messages[index]["content"]
+                budget = max(len(content) - excess_chars // len(pending), 200)
+                self._shrink_tool_message(messages, index, budget)
+        
+        return messages
+    
+    def _text_tokens(self, text: str) -> int:
+        if _encoding is not None:
+            return len(_encoding.encode(text, disallowed_special=()))
+        return len(text) // CHARS_PER_TOKEN + 1
+    
+    @staticmethod
+    def _consumed_tool_indexes(messages: List[Any]) -> List[int]:
+        """Indexes of tool messages followed by a later assistant message, oldest first"""
+        last_assistant = max(
+            (i for i, m in enumerate(messages) if _field(m, "role") == "assistant"),
+            default=-1
+        )
+        return [
+            i for i, m in enumerate(messages[:last_assistant])
+            if _field(m, "role") == "tool"
+        ]
+    
+    @staticmethod
+    def _shrink_tool_message(messages: List[Any], index: int, max_chars: int):
+        """Replace a tool message with a copy whose content is at most about max_chars long"""
+        content = messages[index]["content"]
+        if len(content) <= max_chars:
+            return
+        messages[index] = dict(messages[index], content=shrink_json_text(content, max_chars))
+
+
+def shrink_json_text(content: str, max_chars: int) -> str:
+    """
+    Shrink a JSON-encoded tool result to about max_chars while keeping it valid JSON:
+    long strings are clipped (titles, URLs and numbers survive, page bodies do not).
+    Non-JSON content is simply truncated.
+    """
+    try:
+        value = json.loads(content)
+    except (TypeError, ValueError):
+        return content[:max_chars] + f"... [truncated {len(content) - max_chars} chars]"
+    
+    limit = 1000
+    while limit >= 20:
+        shrunk = json.dumps(_clip_strings(value, limit))
+        if len(shrunk) <= max_chars:
+            return shrunk
+        limit //= 2
+    shrunk = json.dumps(_clip_strings(value, limit))
+    if len(shrunk) <= max_chars:
+        return shrunk
+    return json.dumps({"truncated": shrunk[:max_chars]})
+
+
+def _clip_strings(value: Any, limit: int) -> Any:
+    if isinstance(value, str):
+        return value if len(value) <= limit else value[:limit] + "..."
+    if isinstance(value, list):
+        return [_clip_strings(item, limit) for item in value]
+    if isinstance(value, dict):
+        return {key: _clip_strings(item, limit) for key, item in value.items()}
+    return value
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Read a field from a message dict or an OpenAI response object"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
\ No newline at end of file
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Optional, Tuple
+
+# Push-based delivery of progress, tool and content events to a streaming response.
+# Producers (agents, tool callbacks, orchestrator progress updates) may run on the
+# event loop or in worker threads; the consumer awaits the next event instead of
+# polling shared lists, so events reach the client as soon as they are published.
+
+
+class EventBus:
+    """Queue of (kind, payload) events published from any thread to one asyncio consumer"""
+    
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        # Bound to the consumer's loop: create the bus inside the coroutine that reads it
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+    
+    def publish(self, kind: str, payload: Any = None):
+        """Enqueue an event; safe to call from worker threads"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.queue.put_nowait((kind, payload))
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, (kind, payload))
+        except RuntimeError:
+            # The loop is closed: nobody is listening any more
+            pass
+    
+    async def get(self, timeout: Optional[float] = None) -> Tuple[str, Any]:
+        """Wait for the next event; raises asyncio.TimeoutError after timeout seconds"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
\ No newline at end of file
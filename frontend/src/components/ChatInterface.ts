@@ -432,6 +432,13 @@ export class ChatInterface {
                 this.scrollToBottom();
                 break;
                 
+              case 'replace':
+                // Refined answer superseding the content streamed so far
+                assistantMessage.content = chunk.data;
+                contentElement.innerHTML = this.renderMarkdown(assistantMessage.content);
+                this.scrollToBottom();
+                break;
+                
               case 'status':
                 this.showStatusMessage(chunk.data);
                 // Détecter les phases d'orchestration
@@ -7,7 +7,7 @@ export interface ChatMessage {
 }
 
 export interface StreamChunk {
-  type: 'content' | 'status' | 'clear_status' | 'progress' | 'tool_usage' | 'clear_tool_usage' | 'error';
+  type: 'content' | 'replace' | 'status' | 'clear_status' | 'progress' | 'tool_usage' | 'clear_tool_usage' | 'error';
   data: string | ProgressData | any;
 }
 
@@ -0,0 +1,147 @@
+from typing import Iterable, Iterator, List, Optional
+
+# HTML-to-text extraction for fetched pages.
+# The lxml path parses the body incrementally and stops reading as soon as enough
+# text has been collected; selectolax parses the capped body in one pass; without
+# either, BeautifulSoup's html.parser is used. Every backend drops scripts and styles as
+# well as page chrome (navigation, header, footer, sidebars) to keep the main content.
+
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:
+    _lxml_etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+# Elements whose text never belongs to the page's main content
+SKIP_TAGS = ("script", "style", "noscript", "template", "nav", "header", "footer", "aside")
+
+
+def available_backends() -> List[str]:
+    """Extraction backends usable in this environment, fastest first"""
+    backends = []
+    if _lxml_etree is not None:
+        backends.append("lxml")
+    if _SelectolaxParser is not None:
+        backends.append("selectolax")
+    backends.append("html.parser")
+    return backends
+
+
+def limit_bytes(chunks: Iterable[bytes], max_bytes: int) -> Iterator[bytes]:
+    """Yield chunks until max_bytes have been produced, truncating the last one"""
+    remaining = max_bytes
+    for chunk in chunks:
+        if remaining <= 0:
+            return
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
+
+def clip_text(text: str, max_chars: int) -> str:
+    """Normalize whitespace and limit content length"""
+    text = ' '.join(text.split())
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+
+def extract_text(chunks: Iterable[bytes], max_chars: int = 1000, encoding: Optional[str] = None,
+                 backend: str = "auto") -> str:
+    """
+    Extract visible text from an HTML body given as byte chunks.
+    Returns at most max_chars characters of whitespace-normalized text ("..." appended when clipped).
+    """
+    if backend == "auto":
+        backend = available_backends()[0]
+    
+    if backend == "lxml":
+        return _extract_lxml(chunks, max_chars, encoding)
+    
+    html = b"".join(chunks).decode(encoding or "utf-8", errors="replace")
+    if backend == "selectolax":
+        return _extract_selectolax(html, max_chars)
+    return _extract_html_parser(html, max_chars)
+
+
+class _TextCollector:
+    """lxml parser target collecting text outside of skipped elements until enough is gathered"""
+    
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        # Whitespace-normalized text, normalized chunk by chunk as it arrives
+        self.parts = []
+        self.length = 0
+        self.pending_space = False
+        self.skip_depth = 0
+        self.done = False
+    
+    def start(self, tag, attrib):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+    
+    def end(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+    
+    def data(self, data):
+        if self.skip_depth or self.done:
+            return
+        words = data.split()
+        if not words:
+            self.pending_space = self.pending_space or bool(data)
+            return
+        if self.parts and (self.pending_space or data[0].isspace()):
+            self.parts.append(' ')
+            self.length += 1
+        text = ' '.join(words)
+        self.parts.append(text)
+        self.length += len(text)
+        self.pending_space = data[-1].isspace()
+        if self.length > self.max_chars:
+            self.done = True
+    
+    def close(self):
+        return ''.join(self.parts)
+
+
+def _extract_lxml(chunks: Iterable[bytes], max_chars: int, encoding: Optional[str]) -> str:
+    """Incremental parse: stop feeding (and reading the body) once max_chars of text are collected"""
+    collector = _TextCollector(max_chars)
+    parser = _lxml_etree.HTMLParser(target=collector, encoding=encoding, recover=True)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if collector.done:
+            break
+    try:
+        text = parser.close()
+    except _lxml_etree.XMLSyntaxError:
+        text = collector.close()
+    return clip_text(text, max_chars)
+
+
+def _extract_selectolax(html: str, max_chars: int) -> str:
+    """Single pass over the capped body with selectolax's C parser"""
+    tree = _SelectolaxParser(html)
+    for node in tree.css(", ".join(SKIP_TAGS)):
+        node.decompose()
+    text = tree.root.text(separator="") if tree.root is not None else ""
+    return clip_text(text, max_chars)
+
+
+def _extract_html_parser(html: str, max_chars: int) -> str:
+    """Original pipeline: BeautifulSoup's pure-Python parser over the whole document"""
+    from bs4 import BeautifulSoup
+    
+    # Parse HTML with BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove scripts, styles and page chrome
+    for element in soup(list(SKIP_TAGS)):
+        element.decompose()
+    
+    # Get text content
+    return clip_text(soup.get_text(), max_chars)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict, Tuple
+import httpx
+from openai import OpenAI, AsyncOpenAI, DEFAULT_MAX_RETRIES
+
+# Process-wide pooled HTTP transports.
+# LLM clients and tools share these so keep-alive connections (and HTTP/2 streams)
+# are reused across agents instead of paying a TCP/TLS handshake on every hop.
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_openai_clients: Dict[Tuple[str, str], OpenAI] = {}
+_async_openai_clients = weakref.WeakKeyDictionary()
+
+
+def _http_settings(config: dict) -> dict:
+    """Read the http section of the config with defaults"""
+    http_config = (config or {}).get('http', {}) or {}
+    return {
+        'max_connections': http_config.get('max_connections', 100),
+        'max_keepalive_connections': http_config.get('max_keepalive_connections', 20),
+        'keepalive_expiry': http_config.get('keepalive_expiry', 30),
+        'http2': http_config.get('http2', True),
+        'connect_timeout': http_config.get('connect_timeout', 10),
+        'timeout': http_config.get('timeout', 60),
+        'hosts': http_config.get('hosts', {}) or {},
+    }
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _limits(settings: dict) -> httpx.Limits:
+    """Connection pool limits from http settings"""
+    return httpx.Limits(
+        max_connections=settings['max_connections'],
+        max_keepalive_connections=settings['max_keepalive_connections'],
+        keepalive_expiry=settings['keepalive_expiry'],
+    )
+
+
+def _client_kwargs(config: dict, transport_cls) -> dict:
+    """Shared constructor arguments for the sync and async pooled clients"""
+    settings = _http_settings(config)
+    http2 = bool(settings['http2']) and _http2_available()
+    
+    # Per-host limits are separate connection pools mounted on the host pattern
+    mounts = {}
+    for host, host_config in settings['hosts'].items():
+        host_settings = dict(settings, **(host_config or {}))
+        mounts[f"all://{host}"] = transport_cls(limits=_limits(host_settings), http2=http2)
+    
+    return {
+        'limits': _limits(settings),
+        'http2': http2,
+        'mounts': mounts or None,
+        'timeout': httpx.Timeout(settings['timeout'], connect=settings['connect_timeout']),
+        'follow_redirects': True,
+    }
+
+
+def get_http_client(config: dict = None) -> httpx.Client:
+    """Return the process-wide pooled sync HTTP client (created on first use)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(**_client_kwargs(config, httpx.HTTPTransport))
+        return _sync_client
+
+
+def get_async_http_client(config: dict = None) -> httpx.AsyncClient:
+    """
+    Return the pooled async HTTP client for the running event loop.
+    Async connections are bound to the loop that opened them, hence one pool per loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**_client_kwargs(config, httpx.AsyncHTTPTransport))
+            _async_clients[loop] = client
+        return client
+
+
+def _max_retries(config: dict) -> int:
+    """SDK-level retries; the shared rate limiter retries LLM calls itself when enabled"""
+    limit_config = (config or {}).get('rate_limit', {}) or {}
+    return 0 if limit_config.get('enabled', True) else DEFAULT_MAX_RETRIES
+
+
+def get_openai_client(config: dict) -> OpenAI:
+    """Return a shared OpenAI client for the configured OpenRouter endpoint and key"""
+    key = (config['openrouter']['base_url'], config['openrouter']['api_key'])
+    http_client = get_http_client(config)
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = OpenAI(base_url=key[0], api_key=key[1], http_client=http_client,
+                            max_retries=_max_retries(config))
+            _openai_clients[key] = client
+        return client
+
+
+def get_async_openai_client(config: dict) -> AsyncOpenAI:
+    """
+    Return a shared AsyncOpenAI client for the running event loop.
+    Outside of an event loop a standalone client is returned.
+    """
+    key = (config['openrouter']['base_url'], config['openrouter']['api_key'])
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return AsyncOpenAI(base_url=key[0], api_key=key[1], max_retries=_max_retries(config))
+    
+    http_client = get_async_http_client(config)
+    with _lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(base_url=key[0], api_key=key[1], http_client=http_client,
+                                 max_retries=_max_retries(config))
+            clients[key] = client
+        return client
+
+
+def close_http_clients():
+    """Close the pooled sync client (async pools are released with their event loop)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+        _openai_clients.clear()
\ No newline at end of file
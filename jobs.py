@@ -0,0 +1,444 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent import OpenRouterAgent
+from orchestrator import TaskOrchestrator
+from config_registry import load_config
+from cancellation import CancellationToken, OperationCancelled
+
+# Durable job queue for heavy requests.
+# Jobs and their event streams live in SQLite, so any process can submit, run or follow
+# them. Worker processes claim queued jobs oldest first while respecting per-tenant
+# concurrency limits, and record progress, tool usage and content as numbered events
+# that clients can replay from any point (SSE Last-Event-ID).
+# Every claim starts a new attempt: a job re-queued after its worker stopped sending
+# heartbeats only shows the events of its latest attempt, and the earlier worker (if it
+# was merely slow) stops once it notices it no longer owns the job.
+# A job that keeps losing its worker (crash, OOM) fails after jobs.max_attempts attempts.
+
+FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised when a tenant already has too many queued or running jobs"""
+
+
+def tool_event_payload(event: dict) -> Optional[Dict[str, Any]]:
+    """Convert a tool callback event into the message sent to the frontend"""
+    if event.get('type') == 'tool_start':
+        tool_args = event.get('tool_args', {})
+        tool_event = {
+            'event': 'tool_start',
+            'tool_name': event.get('tool_name', 'unknown'),
+            'tool_args': tool_args
+        }
+        
+        # Extract the argument shown in the UI
+        if 'query' in tool_args:
+            tool_event['query'] = tool_args['query']
+        elif 'expression' in tool_args:
+            tool_event['expression'] = tool_args['expression']
+        elif 'path' in tool_args:
+            tool_event['filename'] = tool_args['path']
+        
+        return {'type': 'tool_usage', 'data': tool_event}
+    elif event.get('type') == 'tool_complete':
+        return {'type': 'clear_tool_usage', 'data': None}
+    return None
+
+
+class JobStore:
+    """SQLite-backed job queue and per-job event log, shared by threads and processes"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode: multi-statement updates use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, tenant TEXT NOT NULL, kind TEXT NOT NULL, message TEXT NOT NULL,"
+            " status TEXT NOT NULL, result TEXT, error TEXT, worker TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL,"
+            " attempt INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL, seq INTEGER NOT NULL, type TEXT NOT NULL, data TEXT,"
+            " created_at REAL NOT NULL, attempt INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (job_id, seq))"
+        )
+        # Stores created before attempts were tracked
+        for table in ("jobs", "job_events"):
+            columns = {row["name"] for row in self._db.execute(f"PRAGMA table_info({table})")}
+            if "attempt" not in columns:
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN attempt INTEGER NOT NULL DEFAULT 0")
+    
+    def submit(self, message: str, kind: str = "orchestrator", tenant: str = "default",
+               max_active: Optional[int] = None) -> str:
+        """Queue a job and return its id; raises QueueFull when the tenant is over max_active"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if max_active is not None:
+                    active = self._db.execute(
+                        "SELECT COUNT(*) FROM jobs WHERE tenant = ? AND status IN ('queued', 'running')",
+                        (tenant,)
+                    ).fetchone()[0]
+                    if active >= max_active:
+                        raise QueueFull(f"Tenant '{tenant}' already has {active} active jobs")
+                self._db.execute(
+                    "INSERT INTO jobs (id, tenant, kind, message, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, tenant, kind, message, time.time())
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or None if unknown"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+    
+    def claim(self, worker: str, max_running_per_tenant: int, stale_after: float,
+              max_attempts: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest eligible queued job to running and return it, with its new attempt number.
+        Running jobs whose worker stopped sending heartbeats are re-queued first, or failed once they
+        already used max_attempts (a job that kills its worker every time would otherwise run forever).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if max_attempts is not None:
+                    exhausted = self._db.execute(
+                        "SELECT id, attempt FROM jobs WHERE status = 'running' AND heartbeat_at < ? AND attempt >= ?",
+                        (now - stale_after, max_attempts)
+                    ).fetchall()
+                    for job in exhausted:
+                        error = f"Job lost its worker on all {job['attempt']} attempts (jobs.max_attempts: {max_attempts})"
+                        self._db.execute(
+                            "UPDATE jobs SET status = 'failed', error = ?, worker = NULL, finished_at = ? WHERE id = ?",
+                            (error, now, job["id"])
+                        )
+                        self._append_event(job["id"], "error", error, job["attempt"])
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                    (now - stale_after,)
+                )
+                row = self._db.execute(
+                    "SELECT * FROM jobs AS j WHERE status = 'queued' AND ("
+                    " SELECT COUNT(*) FROM jobs AS r WHERE r.tenant = j.tenant AND r.status = 'running'"
+                    ") < ? ORDER BY created_at LIMIT 1",
+                    (max_running_per_tenant,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?,"
+                        " attempt = attempt + 1 WHERE id = ?",
+                        (worker, now, now, row["id"])
+                    )
+                    row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+    
+    def heartbeat(self, job_id: str, attempt: int) -> Optional[str]:
+        """
+        Mark an attempt of a running job as alive and return the job's status (to notice cancellation).
+        Returns None once the attempt no longer owns the job: it was re-queued, possibly claimed again.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND attempt = ? AND status = 'running'",
+                (time.time(), job_id, attempt)
+            )
+            row = self._db.execute("SELECT status, attempt FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["attempt"] != attempt or row["status"] == 'queued':
+            return None
+        return row["status"]
+    
+    def finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None,
+               attempt: Optional[int] = None):
+        """Record the outcome of a job; a job cancelled meanwhile stays cancelled, a lost attempt changes nothing"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+                " WHERE id = ? AND status NOT IN ('succeeded', 'failed', 'cancelled') AND (? IS NULL OR attempt = ?)",
+                (status, result, error, time.time(), job_id, attempt, attempt)
+            )
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; its worker notices at the next heartbeat"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount > 0
+    
+    def add_event(self, job_id: str, event_type: str, data: Any = None, attempt: Optional[int] = None) -> int:
+        """Append an event to a job's stream (for attempt, default: the current one) and return its sequence number"""
+        with self._lock:
+            return self._append_event(job_id, event_type, data, attempt)
+    
+    def _append_event(self, job_id: str, event_type: str, data: Any, attempt: Optional[int]) -> int:
+        """add_event with the lock already held"""
+        self._db.execute(
+            "INSERT INTO job_events (job_id, seq, type, data, created_at, attempt)"
+            " SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?,"
+            " COALESCE(?, (SELECT attempt FROM jobs WHERE id = ?), 0) FROM job_events WHERE job_id = ?",
+            (job_id, event_type, json.dumps(data), time.time(), attempt, job_id, job_id)
+        )
+        return self._db.execute("SELECT MAX(seq) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()[0]
+    
+    def events_since(self, job_id: str, after: int = 0, limit: int = 500) -> List[Tuple[int, str, Any]]:
+        """
+        Events of a job's current attempt with a sequence number greater than after, in order.
+        Sequence numbers keep increasing across attempts, so Last-Event-ID stays valid after a re-queue.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, type, data FROM job_events WHERE job_id = ? AND seq > ?"
+                " AND attempt = (SELECT attempt FROM jobs WHERE id = ?) ORDER BY seq LIMIT ?",
+                (job_id, after, job_id, limit)
+            ).fetchall()
+        return [(row["seq"], row["type"], json.loads(row["data"])) for row in rows]
+    
+    def prune(self, retention: float):
+        """Delete finished jobs older than retention seconds, with their events"""
+        cutoff = time.time() - retention
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "DELETE FROM job_events WHERE job_id IN ("
+                    " SELECT id FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?)",
+                    (cutoff,)
+                )
+                self._db.execute(
+                    "DELETE FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?",
+                    (cutoff,)
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+
+_stores: Dict[str, JobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_job_store(config: dict) -> JobStore:
+    """Return the process-wide job store configured by the 'jobs' config section"""
+    path = (config.get('jobs', {}) or {}).get('path', '.cache/jobs.sqlite')
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = JobStore(path)
+            _stores[path] = store
+        return store
+
+
+class JobWorker:
+    """Runs queued jobs one at a time in the current process"""
+    
+    def __init__(self, config_path="config.yaml", worker_id: Optional[str] = None):
+        self.config_path = config_path
+        self.config = load_config(config_path)
+        jobs_config = self.config.get('jobs', {}) or {}
+        
+        self.store = get_job_store(self.config)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.max_running_per_tenant = jobs_config.get('max_running_per_tenant', 1)
+        self.job_timeout = jobs_config.get('job_timeout', 900)
+        self.poll_interval = jobs_config.get('poll_interval', 0.5)
+        self.stale_after = jobs_config.get('stale_after', 30)
+        self.max_attempts = jobs_config.get('max_attempts', 3)
+        self.retention = jobs_config.get('retention', 86400)
+    
+    def run_forever(self, stop_event: Optional[threading.Event] = None):
+        """Claim and run jobs until stop_event is set"""
+        last_prune = 0
+        while stop_event is None or not stop_event.is_set():
+            job = self.store.claim(self.worker_id, self.max_running_per_tenant, self.stale_after, self.max_attempts)
+            if job is None:
+                if time.time() - last_prune > 60:
+                    last_prune = time.time()
+                    self.store.prune(self.retention)
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+    
+    def run_job(self, job: Dict[str, Any]):
+        """Run one claimed job to completion, recording its events and outcome"""
+        job_id = job['id']
+        attempt = job['attempt']
+        token = CancellationToken(timeout=self.job_timeout)
+        finished = threading.Event()
+        
+        def emit(event_type, data=None):
+            self.store.add_event(job_id, event_type, data, attempt=attempt)
+        
+        def watch():
+            # Heartbeat while the job runs; stop it when a client cancels the job, or when it was
+            # re-queued after missed heartbeats and another worker now runs it
+            while not finished.wait(self.poll_interval):
+                status = self.store.heartbeat(job_id, attempt)
+                if status == 'cancelled':
+                    token.cancel("job cancelled")
+                elif status != 'running':
+                    token.cancel("job reassigned")
+        
+        watcher = threading.Thread(target=watch, name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        watcher.start()
+        try:
+            if attempt > 1:
+                # Clients that followed the earlier attempt drop the content it streamed
+                emit('replace', '')
+            emit('status', 'Processing...')
+            if job['kind'] == 'agent':
+                result = self._run_agent(job, token, emit)
+            else:
+                result = self._run_orchestrator(job, token, emit)
+            self.store.finish(job_id, 'succeeded', result=result, attempt=attempt)
+        except OperationCancelled as e:
+            emit('error', str(e))
+            self.store.finish(job_id, 'cancelled' if token.reason == "job cancelled" else 'failed', error=str(e), attempt=attempt)
+        except Exception as e:
+            emit('error', str(e))
+            self.store.finish(job_id, 'failed', error=str(e), attempt=attempt)
+        finally:
+            finished.set()
+            watcher.join()
+    
+    def _tool_callback(self, emit):
+        def tool_callback(event):
+            payload = tool_event_payload(event)
+            if payload:
+                emit(payload['type'], payload['data'])
+        return tool_callback
+    
+    def _run_agent(self, job, token, emit) -> str:
+        """Single agent job: content tokens are recorded as they stream"""
+        agent = OpenRouterAgent(
+            config_path=self.config_path, silent=True, tool_callback=self._tool_callback(emit), cancel_token=token
+        )
+        with agent.telemetry.start_span("request", attributes={"request.mode": "agent", "job.id": job['id']}) as span:
+            agent.trace_parent = span
+            tokens = agent.run_stream(job['message'])
+            while True:
+                try:
+                    emit('content', next(tokens))
+                except StopIteration as done:
+                    result = done.value
+                    break
+        emit('summary', span.trace.summary())
+        return result
+    
+    def _run_orchestrator(self, job, token, emit) -> str:
+        """Heavy-mode job: agent progress, tool usage and the (streamed) answer are recorded"""
+        orchestrator = TaskOrchestrator(config_path=self.config_path, silent=True, cancel_token=token)
+        # Every agent status change is recorded as a job event
+        orchestrator.progress_callback = lambda agent_id, status: emit(
+            'progress', {"agent_id": agent_id + 1, "status": status, "total_agents": orchestrator.num_agents}
+        )
+        for agent_id in range(orchestrator.num_agents):
+            emit('progress', {"agent_id": agent_id + 1, "status": "QUEUED", "total_agents": orchestrator.num_agents})
+        
+        streamed = []
+        
+        def content_callback(text):
+            streamed.append(text)
+            emit('content', text)
+        
+        with orchestrator.telemetry.start_span("request", attributes={"request.mode": "orchestrator", "job.id": job['id']}) as span:
+            orchestrator.trace_parent = span
+            result = orchestrator.orchestrate(
+                job['message'], tool_callback=self._tool_callback(emit), content_callback=content_callback
+            )
+        if not streamed:
+            emit('content', result)
+        elif "".join(streamed) != result:
+            # The streamed draft was refined with late agents: the refined answer replaces it
+            emit('replace', result)
+        emit('summary', span.trace.summary())
+        return result
+
+
+def _worker_process(config_path: str, worker_id: str):
+    """Entry point of a worker process"""
+    JobWorker(config_path, worker_id).run_forever()
+
+
+class JobManager:
+    """Starts and stops the worker processes serving the job queue"""
+    
+    def __init__(self, config_path="config.yaml", workers: Optional[int] = None):
+        self.config_path = str(config_path)
+        jobs_config = load_config(self.config_path).get('jobs', {}) or {}
+        self.workers = jobs_config.get('workers', 2) if workers is None else workers
+        self.processes = []
+    
+    def start(self):
+        # Spawned (not forked) so workers never inherit the web server's threads and sockets
+        context = multiprocessing.get_context("spawn")
+        for i in range(self.workers):
+            process = context.Process(
+                target=_worker_process,
+                args=(self.config_path, f"{socket.gethostname()}:{os.getpid()}:{i}"),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+    
+    def stop(self, timeout: float = 5):
+        # Jobs interrupted here are re-queued by the next worker once their heartbeat goes stale
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+        self.processes = []
+
+
+def main():
+    """Run job workers without the web server"""
+    parser = argparse.ArgumentParser(description="Job queue workers")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: jobs.workers)")
+    args = parser.parse_args()
+    
+    manager = JobManager(args.config, workers=args.workers)
+    manager.start()
+    print(f"👷 {manager.workers} job worker(s) running, press Ctrl+C to stop")
+    try:
+        for process in manager.processes:
+            process.join()
+    except KeyboardInterrupt:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
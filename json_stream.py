@@ -0,0 +1,59 @@
+import json
+from typing import List
+
+# Incremental parsing of model output that is still being streamed.
+
+
+class JsonStringArrayParser:
+    """
+    Incremental parser for a JSON array of strings, fed with arbitrary text fragments.
+    feed() returns the strings completed by the new fragment, so callers can act on each
+    element before the array is closed. Text before the opening bracket (a markdown code
+    fence, a preamble) is ignored, as are non-string elements. A bracket only opens the
+    array when a string or the closing bracket follows it, so "Here are [4] questions:"
+    in a preamble is skipped too.
+    """
+    
+    def __init__(self):
+        self.state = "before"  # before -> opened -> between <-> string -> done
+        self._buffer = []
+        self._escaped = False
+    
+    @property
+    def done(self) -> bool:
+        """Whether the closing bracket has been seen"""
+        return self.state == "done"
+    
+    def feed(self, text: str) -> List[str]:
+        """Consume a fragment and return the strings it completed, in order"""
+        completed = []
+        for char in text:
+            if self.state == "before":
+                if char == "[":
+                    self.state = "opened"
+            elif self.state == "opened":
+                # The first element decides whether this bracket opened the array
+                if char == '"':
+                    self.state = "string"
+                    self._buffer = [char]
+                elif char == "]":
+                    self.state = "done"
+                elif not char.isspace() and char != "[":
+                    self.state = "before"
+            elif self.state == "between":
+                if char == '"':
+                    self.state = "string"
+                    self._buffer = [char]
+                elif char == "]":
+                    self.state = "done"
+            elif self.state == "string":
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    # Decode escapes with the real JSON decoder; tolerate raw newlines from the model
+                    completed.append(json.loads("".join(self._buffer), strict=False))
+                    self.state = "between"
+        return completed
\ No newline at end of file
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from openai.types.chat import ChatCompletion
+
+# Content-addressed store of LLM responses, keyed on model, messages and tools.
+# Modes (llm_cache.mode in config.yaml):
+#   off           - every request goes to the provider
+#   read_through  - identical requests are answered from the store, misses are recorded
+#   record        - every request goes to the provider and its answer is (re)recorded
+#   replay        - answers come from the store only; a miss raises LLMCacheMiss
+# In record and replay modes the results of tools without side effects (web search, ...)
+# are stored as well, so a recorded orchestration can be re-run without network access:
+# in replay mode a tool call without a recording fails too instead of going online.
+# Answers produced by a fallback model are never stored, since they are keyed on the
+# primary model and would be replayed as its answer.
+
+MODES = ("off", "read_through", "record", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when no recorded response (or tool result) matches the request"""
+
+
+def _canonical_message(message: Any) -> Dict[str, Any]:
+    """Reduce a message (dict or SDK object) to the fields that determine the model's answer"""
+    if hasattr(message, "model_dump"):
+        message = message.model_dump(exclude_none=True)
+    canonical = {key: message[key] for key in ("role", "content", "name", "tool_call_id") if message.get(key) is not None}
+    tool_calls = []
+    for tool_call in message.get("tool_calls") or []:
+        if hasattr(tool_call, "model_dump"):
+            tool_call = tool_call.model_dump(exclude_none=True)
+        function = tool_call.get("function") or {}
+        tool_calls.append({
+            "id": tool_call.get("id"),
+            "name": function.get("name"),
+            "arguments": function.get("arguments"),
+        })
+    if tool_calls:
+        canonical["tool_calls"] = tool_calls
+    return canonical
+
+
+def _digest(payload: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of payload"""
+    # Prompts embed today's date; keying on the placeholder keeps recordings valid on later days
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    encoded = encoded.replace(datetime.now().strftime("%d/%m/%Y"), "{current_date}")
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """On-disk store of LLM responses (and replayable tool results), one JSON file per key"""
+    
+    def __init__(self, path: str, mode: str = "off", ttl: float = 0):
+        mode = _normalize_mode(mode)
+        if mode not in MODES:
+            raise ValueError(f"Unknown llm_cache mode: {mode} (expected one of {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        # Seconds a recorded answer is reused in read_through mode (0: forever); replay ignores it
+        self.ttl = ttl
+    
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+    
+    @property
+    def records_tools(self) -> bool:
+        return self.mode in ("record", "replay")
+    
+    def key(self, model: str, messages: List[Any], tools: Optional[List[dict]] = None) -> Optional[str]:
+        """Content address of a chat completion request (None when the cache is off)"""
+        if not self.enabled:
+            return None
+        return _digest({
+            "model": model,
+            "messages": [_canonical_message(message) for message in messages],
+            "tools": list(tools or []),
+        })
+    
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+    
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.mode == "read_through" and self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            return None
+        return entry
+    
+    def _write(self, key: str, entry: Dict[str, Any]):
+        """Write an entry atomically so concurrent readers never see a partial file"""
+        directory = os.path.dirname(self._file(key))
+        os.makedirs(directory, exist_ok=True)
+        entry["created"] = time.time()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self._file(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def get(self, key: Optional[str]) -> Optional[ChatCompletion]:
+        """Recorded response for a request key, rebuilt as a ChatCompletion"""
+        if key is None or self.mode == "record":
+            return None
+        entry = self._read(key)
+        if entry is None:
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded LLM response for request {key} in {self.path} (llm_cache.mode: replay)")
+            return None
+        message = entry["message"]
+        return ChatCompletion.model_validate({
+            "id": f"llmcache-{key[:16]}",
+            "object": "chat.completion",
+            "created": int(entry.get("created", 0)),
+            "model": entry.get("model", ""),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                "message": message,
+            }],
+            "usage": entry.get("usage"),
+        })
+    
+    def put(self, key: Optional[str], model: str, message: Any, usage: Any = None):
+        """Record the assistant message (and usage, when reported) answering a request"""
+        if key is None or self.mode == "replay":
+            return
+        self._write(key, {
+            "model": model,
+            "message": message.model_dump(exclude_none=True) if hasattr(message, "model_dump") else message,
+            "usage": usage.model_dump() if hasattr(usage, "model_dump") else usage,
+        })
+    
+    def _tool_key(self, tool_name: str, tool_args: Dict[str, Any]) -> str:
+        return _digest({"tool": tool_name, "arguments": tool_args})
+    
+    def _recorded_tool_result(self, tool_name: str, tool_args: Dict[str, Any]) -> Tuple[Optional[str], Optional[dict]]:
+        if not self.records_tools:
+            return None, None
+        key = self._tool_key(tool_name, tool_args)
+        if self.mode != "replay":
+            return key, None
+        entry = self._read(key)
+        if entry is None:
+            raise LLMCacheMiss(f"No recorded result of tool {tool_name} for request {key} in {self.path} (llm_cache.mode: replay)")
+        return key, entry
+    
+    def run_tool(self, tool_name: str, tool_args: Dict[str, Any], execute: Callable[[], Any]) -> Any:
+        """
+        Execute a side-effect free tool, recording its result in record mode and reusing it in
+        replay mode, where a tool call without a recording raises LLMCacheMiss.
+        """
+        key, entry = self._recorded_tool_result(tool_name, tool_args)
+        if entry is not None:
+            return entry["result"]
+        result = execute()
+        if key is not None and self.mode == "record":
+            self._write(key, {"tool": tool_name, "arguments": tool_args, "result": result})
+        return result
+    
+    async def arun_tool(self, tool_name: str, tool_args: Dict[str, Any], execute: Callable[[], Any]) -> Any:
+        """Async variant of run_tool(); execute() returns an awaitable"""
+        key, entry = self._recorded_tool_result(tool_name, tool_args)
+        if entry is not None:
+            return entry["result"]
+        result = await execute()
+        if key is not None and self.mode == "record":
+            self._write(key, {"tool": tool_name, "arguments": tool_args, "result": result})
+        return result
+
+
+def _normalize_mode(mode: Any) -> str:
+    """YAML parses an unquoted `mode: off` as False: treat it, like a missing value, as off"""
+    if mode is None or mode is False:
+        return "off"
+    return mode
+
+
+_caches: Dict[Tuple[str, str], LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(config: dict) -> LLMCache:
+    """Return the process-wide LLM response cache configured by the 'llm_cache' config section"""
+    cache_config = (config or {}).get('llm_cache', {}) or {}
+    mode = _normalize_mode(cache_config.get('mode', 'off'))
+    path = cache_config.get('path', '.cache/llm_responses')
+    with _caches_lock:
+        cache = _caches.get((path, mode))
+        if cache is None:
+            cache = LLMCache(path, mode=mode, ttl=cache_config.get('ttl', 0))
+            _caches[(path, mode)] = cache
+        return cache
\ No newline at end of file
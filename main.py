@@ -3,13 +3,17 @@ import argparse
 import json
 import asyncio
 import time
-import threading
 import logging
 from typing import AsyncGenerator, Optional
 from pathlib import Path
 
-from agent import OpenRouterAgent
-from orchestrator import TaskOrchestrator
+from agent import OpenRouterAgent, AsyncOpenRouterAgent
+from orchestrator import TaskOrchestrator, AsyncTaskOrchestrator
+import config_registry
+from cancellation import CancellationToken, OperationCancelled
+from jobs import JobManager, QueueFull, FINAL_STATUSES, get_job_store, tool_event_payload
+from telemetry import render_metrics
+from event_bus import EventBus
 
 def cli_main():
     """Original CLI interface"""
@@ -20,7 +24,7 @@ def cli_main():
     try:
         agent = OpenRouterAgent()
         print("Agent initialized successfully!")
-        print(f"Using model: {agent.config['openrouter']['model']}")
+        print(f"Using model: {agent.model}")
         print("Note: Make sure to set your OpenRouter API key in config.yaml")
         print("-" * 50)
     except Exception as e:
@@ -56,9 +60,10 @@ def cli_main():
 def web_main(port=8000):
     """Web interface using FastAPI"""
     try:
-        from fastapi import FastAPI, HTTPException
+        from contextlib import asynccontextmanager
+        from fastapi import FastAPI, HTTPException, Request
         from fastapi.middleware.cors import CORSMiddleware
-        from fastapi.responses import StreamingResponse
+        from fastapi.responses import StreamingResponse, PlainTextResponse
         from fastapi.staticfiles import StaticFiles
         from pydantic import BaseModel
         import yaml
@@ -76,8 +81,22 @@ def web_main(port=8000):
     )
     logger = logging.getLogger("openrouter-web")
 
+    CONFIG_PATH = Path("config.yaml")
+    
+    # Heavy requests submitted through /api/jobs run in worker processes
+    jobs_config = config_registry.load_config(CONFIG_PATH).get('jobs', {}) or {}
+    job_store = get_job_store(config_registry.load_config(CONFIG_PATH))
+    job_manager = JobManager(CONFIG_PATH)
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        job_manager.start()
+        logger.info(f"👷 Started {job_manager.workers} job worker process(es)")
+        yield
+        job_manager.stop()
+    
     # FastAPI Web Interface
-    app = FastAPI(title="OpenRouter Agent Web Interface", version="1.0.0")
+    app = FastAPI(title="OpenRouter Agent Web Interface", version="1.0.0", lifespan=lifespan)
 
     # CORS configuration
     app.add_middleware(
@@ -100,6 +119,11 @@ def web_main(port=8000):
         temperature: Optional[float] = 0.7
         max_tokens: Optional[int] = 2000
 
+    class JobRequest(BaseModel):
+        message: str
+        use_orchestrator: Optional[bool] = True
+        tenant: Optional[str] = None
+
     class ConfigResponse(BaseModel):
         api_key: str
         base_url: str
@@ -107,13 +131,10 @@ def web_main(port=8000):
         temperature: float
         max_tokens: int
 
-    CONFIG_PATH = Path("config.yaml")
-
     def load_config():
         """Load configuration from config.yaml"""
         try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = config_registry.load_config(CONFIG_PATH)
             
             openrouter_config = config.get('openrouter', {})
             return {
@@ -145,6 +166,9 @@ def web_main(port=8000):
             
             with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
                 yaml.dump(full_config, f, default_flow_style=False, allow_unicode=True)
+            
+            # Make the next agent pick up the new settings even within the same mtime tick
+            config_registry.invalidate(CONFIG_PATH)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error saving configuration: {str(e)}")
 
@@ -200,112 +224,118 @@ def web_main(port=8000):
             }
         )
 
+    def format_tool_event(event) -> Optional[str]:
+        """Convert a tool callback event into an SSE message for the frontend"""
+        payload = tool_event_payload(event)
+        if payload is None:
+            return None
+        return f"data: {json.dumps(payload)}\n\n"
+
+    def end_span(span, error=None):
+        if span is not None:
+            span.end(error=error)
+
+    def trace_summary(span) -> Optional[str]:
+        """SSE event with the per-phase timings and token counts of a finished request"""
+        if span is None or span.end_ns is None:
+            return None
+        return f"data: {json.dumps({'type': 'summary', 'data': span.trace.summary()})}\n\n"
+
     async def stream_agent_response(message: str) -> AsyncGenerator[str, None]:
-        """Stream response from a single agent"""
+        """Stream response from a single agent, forwarding model tokens as they arrive"""
         logger.info(f"🚀 Starting single agent processing")
         
         yield f"data: {json.dumps({'type': 'status', 'data': 'Processing...'})}\n\n"
         
-        result_container = {"result": None, "error": None}
-        tool_events = []
+        # Tool events, tokens and the outcome are pushed here as they happen
+        events = EventBus()
+        
+        # Request deadline; also cancelled when the client goes away
+        cancel_token = CancellationToken(timeout=120)  # 2 minutes
         
         def tool_callback(event):
             """Callback to capture tool usage events"""
             logger.info(f"🔍 Tool callback received: {event}")
-            tool_events.append(event)
+            events.publish('tool', event)
         
-        def run_agent():
+        # Root span of the request, summarized for the client once the agent is done
+        request_span = None
+        
+        async def run_agent():
+            nonlocal request_span
             try:
                 logger.info("🔧 Initializing OpenRouter agent")
-                agent = OpenRouterAgent(silent=True, tool_callback=tool_callback)
+                agent = AsyncOpenRouterAgent(silent=True, tool_callback=tool_callback, cancel_token=cancel_token)
+                request_span = agent.telemetry.start_span("request", attributes={"request.mode": "agent"})
+                agent.trace_parent = request_span
                 logger.info("📤 Sending message to agent")
-                result_container["result"] = agent.run(message)
-                logger.info(f"📨 Agent response received - Length: {len(result_container['result']) if result_container['result'] else 0} chars")
+                length = 0
+                async for token in agent.run_stream(message):
+                    length += len(token)
+                    events.publish('token', token)
+                logger.info(f"📨 Agent response received - Length: {length} chars")
+                events.publish('done')
+            except OperationCancelled as e:
+                logger.warning("⏰ Agent timeout reached")
+                end_span(request_span, e)
+                events.publish('error', 'Request timeout after 2 minutes')
             except Exception as e:
                 logger.error(f"💥 Agent error: {str(e)}")
-                result_container["error"] = str(e)
+                end_span(request_span, e)
+                events.publish('error', str(e))
+            finally:
+                end_span(request_span)
         
-        agent_thread = threading.Thread(target=run_agent)
-        agent_thread.start()
+        # The agent runs as a task on this event loop, no thread needed
+        agent_task = asyncio.create_task(run_agent())
         
-        timeout = 120  # 2 minutes
-        start_time = time.time()
-        last_tool_event_count = 0
+        streamed_tokens = 0
+        status_cleared = False
         
-        while agent_thread.is_alive() and (time.time() - start_time) < timeout:
-            # Check for new tool events and stream them
-            if len(tool_events) > last_tool_event_count:
-                logger.info(f"🎯 Processing {len(tool_events) - last_tool_event_count} new tool events")
-                for event in tool_events[last_tool_event_count:]:
+        try:
+            while True:
+                try:
+                    kind, payload = await events.get(cancel_token.remaining())
+                except asyncio.TimeoutError:
+                    logger.warning("⏰ Agent timeout reached")
+                    yield f"data: {json.dumps({'type': 'error', 'data': 'Request timeout after 2 minutes'})}\n\n"
+                    return
+                
+                if kind == 'tool':
                     try:
-                        if event.get('type') == 'tool_start':
-                            tool_info = f"🔧 Using {event.get('tool_name', 'unknown tool')}"
-                            tool_args = event.get('tool_args', {})
-                            if 'query' in tool_args:
-                                tool_info += f" (searching: {tool_args['query'][:50]}...)"
-                            elif 'expression' in tool_args:
-                                tool_info += f" (calculating: {tool_args['expression']})"
-                            elif 'path' in tool_args:
-                                tool_info += f" (file: {tool_args['path']})"
-                            
-                            # Convertir la structure pour correspondre à l'attente du frontend
-                            tool_event = {
-                                'event': 'tool_start',
-                                'tool_name': event.get('tool_name', 'unknown'),
-                                'tool_args': event.get('tool_args', {})
-                            }
-                            
-                            # Extraire les arguments spécifiques pour l'affichage
-                            tool_args = event.get('tool_args', {})
-                            if 'query' in tool_args:
-                                tool_event['query'] = tool_args['query']
-                            elif 'expression' in tool_args:
-                                tool_event['expression'] = tool_args['expression']
-                            elif 'path' in tool_args:
-                                tool_event['filename'] = tool_args['path']
-                            
-                            tool_data = {
-                                'type': 'tool_usage',
-                                'data': tool_event
-                            }
-                            yield f"data: {json.dumps(tool_data)}\n\n"
-                            logger.info(f"🚀 Streamed tool_usage event: {event.get('tool_name')}")
-                        elif event.get('type') == 'tool_complete':
-                            clear_data = {'type': 'clear_tool_usage'}
-                            yield f"data: {json.dumps(clear_data)}\n\n"
-                            logger.info(f"🚀 Streamed clear_tool_usage event")
+                        chunk = format_tool_event(payload)
+                        if chunk:
+                            yield chunk
+                            logger.info(f"🚀 Streamed {payload.get('type')} event: {payload.get('tool_name')}")
                     except Exception as e:
-                        logger.error(f"Error processing tool event: {e}, event: {event}")
-                
-                last_tool_event_count = len(tool_events)
-            
-            await asyncio.sleep(0.5)
-        
-        if agent_thread.is_alive():
-            logger.warning("⏰ Agent timeout reached")
-            yield f"data: {json.dumps({'type': 'error', 'data': 'Request timeout after 2 minutes'})}\n\n"
-            return
-        
-        agent_thread.join()
-        
-        # Clear status message
-        yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
-        
-        if result_container["error"]:
-            logger.error(f"🚫 Sending error response: {result_container['error']}")
-            yield f"data: {json.dumps({'type': 'error', 'data': result_container['error']})}\n\n"
-        elif result_container["result"]:
-            response = result_container["result"]
-            words = response.split()
-            logger.info(f"📝 Streaming {len(words)} words")
-            for i, word in enumerate(words):
-                chunk = {
-                    "type": "content",
-                    "data": word + (" " if i < len(words) - 1 else "")
-                }
-                yield f"data: {json.dumps(chunk)}\n\n"
-                await asyncio.sleep(0.03)
+                        logger.error(f"Error processing tool event: {e}, event: {payload}")
+                elif kind == 'token':
+                    if not status_cleared:
+                        # Clear status message as soon as the first token arrives
+                        yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+                        status_cleared = True
+                    streamed_tokens += 1
+                    yield f"data: {json.dumps({'type': 'content', 'data': payload})}\n\n"
+                elif kind == 'error':
+                    if not status_cleared:
+                        yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+                    logger.error(f"🚫 Sending error response: {payload}")
+                    yield f"data: {json.dumps({'type': 'error', 'data': payload})}\n\n"
+                    break
+                elif kind == 'done':
+                    if not status_cleared:
+                        yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+                    logger.info(f"📝 Streamed {streamed_tokens} tokens")
+                    break
+        finally:
+            # Timeout, error or client disconnect: stop the agent, its LLM stream and its tools
+            if not agent_task.done():
+                cancel_token.cancel("request ended")
+                agent_task.cancel()
         
+        summary = trace_summary(request_span)
+        if summary:
+            yield summary
         logger.info("🏁 Single agent streaming completed")
         yield "data: [DONE]\n\n"
 
@@ -316,25 +346,18 @@ def web_main(port=8000):
         yield f"data: {json.dumps({'type': 'status', 'data': 'Initializing multi-agent orchestrator...'})}\n\n"
         
         try:
-            logger.info("🔧 Creating TaskOrchestrator instance")
-            orchestrator = TaskOrchestrator(silent=True)
+            logger.info("🔧 Creating AsyncTaskOrchestrator instance")
+            # Request deadline for the whole orchestration; also cancelled when the client goes away
+            cancel_token = CancellationToken(timeout=300)  # 5 minutes for multi-agents
+            orchestrator = AsyncTaskOrchestrator(silent=True, cancel_token=cancel_token)
             logger.info(f"✅ Orchestrator initialized with {orchestrator.num_agents} agents")
         except Exception as e:
             logger.error(f"💥 Orchestrator initialization failed: {str(e)}")
             yield f"data: {json.dumps({'type': 'error', 'data': f'Initialization error: {str(e)}'})}\n\n"
             return
         
-        yield f"data: {json.dumps({'type': 'status', 'data': 'Decomposing task...'})}\n\n"
-        
-        try:
-            logger.info("📋 Decomposing task into subtasks")
-            subtasks = orchestrator.decompose_task(message, orchestrator.num_agents)
-            logger.info(f"✂️ Task decomposed into {len(subtasks)} subtasks")
-            yield f"data: {json.dumps({'type': 'status', 'data': f'Task decomposed into {len(subtasks)} subtasks'})}\n\n"
-        except Exception as e:
-            logger.error(f"💥 Task decomposition failed: {str(e)}")
-            yield f"data: {json.dumps({'type': 'error', 'data': f'Decomposition error: {str(e)}'})}\n\n"
-            return
+        # Decomposition happens inside orchestrate(): agents start as their questions are generated
+        yield f"data: {json.dumps({'type': 'status', 'data': 'Decomposing task and starting agents...'})}\n\n"
         
         # Initialize progress
         for i in range(orchestrator.num_agents):
@@ -351,95 +374,111 @@ def web_main(port=8000):
         
         result_container = {"result": None, "error": None}
         
-        tool_events = []
+        # Progress changes, tool events and synthesis tokens are pushed here as they happen
+        events = EventBus()
         
         def tool_callback(event):
             """Callback to capture tool usage events from orchestrator agents"""
             logger.info(f"🔍 Orchestrator tool callback received: {event}")
-            tool_events.append(event)
+            events.publish('tool', event)
+        
+        # Only status changes are published, so each agent's progress is sent once per change
+        orchestrator.progress_callback = lambda agent_id, status: events.publish('progress', (agent_id, status))
+        
+        # Hierarchical synthesis streams its answer: tokens are forwarded as they arrive
+        content_tokens = []
+        
+        def content_callback(token):
+            content_tokens.append(token)
+            events.publish('token', token)
         
-        def run_orchestration():
+        request_span = orchestrator.telemetry.start_span("request", attributes={"request.mode": "orchestrator"})
+        orchestrator.trace_parent = request_span
+        
+        async def run_orchestration():
             try:
                 logger.info("🚀 Starting orchestration process")
                 # Pass tool callback to orchestrator
-                result_container["result"] = orchestrator.orchestrate(message, tool_callback=tool_callback)
+                result_container["result"] = await orchestrator.orchestrate(
+                    message, tool_callback=tool_callback, content_callback=content_callback
+                )
                 logger.info(f"📨 Orchestration completed - Result length: {len(result_container['result']) if result_container['result'] else 0} chars")
+            except OperationCancelled as e:
+                logger.warning("⏰ Orchestrator timeout reached")
+                result_container["error"] = 'Request timeout after 5 minutes'
+                end_span(request_span, e)
             except Exception as e:
                 logger.error(f"💥 Orchestration error: {str(e)}")
                 result_container["error"] = str(e)
+                end_span(request_span, e)
+            finally:
+                end_span(request_span)
+                events.publish('done')
         
-        orchestration_thread = threading.Thread(target=run_orchestration)
-        orchestration_thread.start()
-        
-        timeout = 300  # 5 minutes for multi-agents
-        start_time = time.time()
-        last_tool_event_count = 0
+        # Agents run as tasks on this event loop instead of a polled worker thread
+        orchestration_task = asyncio.create_task(run_orchestration())
         
-        while orchestration_thread.is_alive() and (time.time() - start_time) < timeout:
-            # Stream progress updates
-            progress = orchestrator.get_progress_status()
-            for agent_id, status in progress.items():
-                progress_data = {
-                    "type": "progress",
-                    "data": {
-                        "agent_id": agent_id + 1,
-                        "status": status,
-                        "total_agents": orchestrator.num_agents
-                    }
-                }
-                yield f"data: {json.dumps(progress_data)}\n\n"
+        try:
+            streamed_content = 0
             
-            # Check for new tool events and stream them
-            if len(tool_events) > last_tool_event_count:
-                for event in tool_events[last_tool_event_count:]:
+            while True:
+                try:
+                    kind, payload = await events.get(cancel_token.remaining())
+                except asyncio.TimeoutError:
+                    break
+                
+                if kind == 'progress':
+                    agent_id, status = payload
+                    progress_data = {
+                        "type": "progress",
+                        "data": {
+                            "agent_id": agent_id + 1,
+                            "status": status,
+                            "total_agents": orchestrator.num_agents
+                        }
+                    }
+                    yield f"data: {json.dumps(progress_data)}\n\n"
+                elif kind == 'tool':
                     try:
-                        if event.get('type') == 'tool_start':
-                            tool_info = f"🔧 Agent using {event.get('tool_name', 'unknown tool')}"
-                            tool_args = event.get('tool_args', {})
-                            if 'query' in tool_args:
-                                tool_info += f" (searching: {tool_args['query'][:50]}...)"
-                            elif 'expression' in tool_args:
-                                tool_info += f" (calculating: {tool_args['expression']})"
-                            elif 'path' in tool_args:
-                                tool_info += f" (file: {tool_args['path']})"
-                            
-                            # Convertir la structure pour correspondre à l'attente du frontend
-                            tool_event = {
-                                'event': 'tool_start',
-                                'tool_name': event.get('tool_name', 'unknown'),
-                                'tool_args': event.get('tool_args', {})
-                            }
-                            
-                            # Extraire les arguments spécifiques pour l'affichage
-                            tool_args = event.get('tool_args', {})
-                            if 'query' in tool_args:
-                                tool_event['query'] = tool_args['query']
-                            elif 'expression' in tool_args:
-                                tool_event['expression'] = tool_args['expression']
-                            elif 'path' in tool_args:
-                                tool_event['filename'] = tool_args['path']
-                            
-                            yield f"data: {json.dumps({'type': 'tool_usage', 'data': tool_event})}\n\n"
-                            logger.info(f"🔧 Orchestrator tool used: {event.get('tool_name')} with args: {tool_args}")
-                        elif event.get('type') == 'tool_complete':
-                            yield f"data: {json.dumps({'type': 'clear_tool_usage'})}\n\n"
+                        chunk = format_tool_event(payload)
+                        if chunk:
+                            yield chunk
+                            if payload.get('type') == 'tool_start':
+                                logger.info(f"🔧 Orchestrator tool used: {payload.get('tool_name')} with args: {payload.get('tool_args', {})}")
                     except Exception as e:
-                        logger.error(f"Error processing orchestrator tool event: {e}, event: {event}")
-                
-                last_tool_event_count = len(tool_events)
+                        logger.error(f"Error processing orchestrator tool event: {e}, event: {payload}")
+                elif kind == 'token':
+                    if not streamed_content:
+                        yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+                    streamed_content += 1
+                    yield f"data: {json.dumps({'type': 'content', 'data': payload})}\n\n"
+                elif kind == 'done':
+                    break
             
-            await asyncio.sleep(1.0)
-        
-        if orchestration_thread.is_alive():
-            logger.warning("⏰ Orchestrator timeout reached")
-            yield f"data: {json.dumps({'type': 'error', 'data': 'Request timeout after 5 minutes'})}\n\n"
-            return
-        
-        orchestration_thread.join()
+            if not orchestration_task.done():
+                logger.warning("⏰ Orchestrator timeout reached")
+                yield f"data: {json.dumps({'type': 'error', 'data': 'Request timeout after 5 minutes'})}\n\n"
+                return
+        finally:
+            # Timeout or client disconnect: stop every agent, their LLM streams and their tools
+            if not orchestration_task.done():
+                cancel_token.cancel("request ended")
+                orchestration_task.cancel()
         
         if result_container["error"]:
             logger.error(f"🚫 Sending orchestrator error: {result_container['error']}")
             yield f"data: {json.dumps({'type': 'error', 'data': result_container['error']})}\n\n"
+        elif content_tokens and "".join(content_tokens) == result_container["result"]:
+            # The answer was streamed as it was synthesized: only flush the last tokens
+            if not streamed_content:
+                yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+            for token in content_tokens[streamed_content:]:
+                yield f"data: {json.dumps({'type': 'content', 'data': token})}\n\n"
+        elif content_tokens and result_container["result"]:
+            # A streamed draft was refined with late agents: the refined answer replaces it
+            if not streamed_content:
+                yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
+            yield f"data: {json.dumps({'type': 'replace', 'data': result_container['result']})}\n\n"
         elif result_container["result"]:
             # Indiquer le début de la consolidation finale
             yield f"data: {json.dumps({'type': 'status', 'data': 'All agents completed! Consolidating results...'})}\n\n"
@@ -455,20 +494,96 @@ def web_main(port=8000):
             # Clear status message final avant le contenu
             yield f"data: {json.dumps({'type': 'clear_status'})}\n\n"
             
+            # Deliver the result as-is: replaying it word by word only added latency
             response = result_container["result"]
-            words = response.split()
-            logger.info(f"📝 Streaming {len(words)} words from orchestrator result")
-            for i, word in enumerate(words):
-                chunk = {
-                    "type": "content",
-                    "data": word + (" " if i < len(words) - 1 else "")
-                }
-                yield f"data: {json.dumps(chunk)}\n\n"
-                await asyncio.sleep(0.02)
+            logger.info(f"📝 Streaming {len(response)} chars from orchestrator result")
+            yield f"data: {json.dumps({'type': 'content', 'data': response})}\n\n"
         
+        summary = trace_summary(request_span)
+        if summary:
+            yield summary
         logger.info("🏁 Orchestrator streaming completed")
         yield "data: [DONE]\n\n"
 
+    @app.post("/api/jobs", status_code=202)
+    async def submit_job(job_request: JobRequest, request: Request):
+        """Queue a request for the worker pool and return its job id"""
+        tenant = job_request.tenant or request.headers.get("x-tenant-id") or "default"
+        kind = "orchestrator" if job_request.use_orchestrator else "agent"
+        try:
+            job_id = await asyncio.to_thread(
+                job_store.submit, job_request.message, kind, tenant, jobs_config.get('max_queued_per_tenant', 20)
+            )
+        except QueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        logger.info(f"📥 Job {job_id} queued for tenant {tenant} ({kind})")
+        return {"job_id": job_id, "status": "queued"}
+
+    async def get_job_or_404(job_id: str):
+        job = await asyncio.to_thread(job_store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+        return job
+
+    @app.get("/api/jobs/{job_id}")
+    async def job_status(job_id: str):
+        job = await get_job_or_404(job_id)
+        return {key: job[key] for key in ("id", "tenant", "kind", "status", "created_at", "started_at", "finished_at")}
+
+    @app.get("/api/jobs/{job_id}/result")
+    async def job_result(job_id: str):
+        job = await get_job_or_404(job_id)
+        if job["status"] not in FINAL_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+        return {"id": job["id"], "status": job["status"], "result": job["result"], "error": job["error"]}
+
+    @app.delete("/api/jobs/{job_id}")
+    async def cancel_job(job_id: str):
+        await get_job_or_404(job_id)
+        cancelled = await asyncio.to_thread(job_store.cancel, job_id)
+        return {"id": job_id, "cancelled": cancelled}
+
+    @app.get("/api/jobs/{job_id}/events")
+    async def job_events(job_id: str, request: Request, after: int = 0):
+        """
+        SSE stream of a job's events. Every event carries its sequence number as the SSE id,
+        so a reconnecting client resumes with Last-Event-ID (or ?after=N) without losing events.
+        """
+        await get_job_or_404(job_id)
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id and last_event_id.isdigit():
+            after = int(last_event_id)
+        poll_interval = jobs_config.get('poll_interval', 0.5)
+        
+        async def event_stream() -> AsyncGenerator[str, None]:
+            last_seq = after
+            while True:
+                # Read the status first: events written before the job finished are then all visible
+                job = await asyncio.to_thread(job_store.get, job_id)
+                events = await asyncio.to_thread(job_store.events_since, job_id, last_seq)
+                for seq, event_type, data in events:
+                    yield f"id: {seq}\ndata: {json.dumps({'type': event_type, 'data': data})}\n\n"
+                    last_seq = seq
+                if not events:
+                    if job is None or job["status"] in FINAL_STATUSES:
+                        yield "data: [DONE]\n\n"
+                        return
+                    await asyncio.sleep(poll_interval)
+        
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+            }
+        )
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus scrape endpoint: span durations, errors, LLM requests, tokens and tool calls"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
     @app.get("/api/health")
     async def health_check():
         return {"status": "healthy", "timestamp": time.time()}
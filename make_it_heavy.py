@@ -10,7 +10,7 @@ class OrchestratorCLI:
         self.running = False
         
         # Extract model name for display
-        model_full = self.orchestrator.config['openrouter']['model']
+        model_full = self.orchestrator.phase_model("agents")
         # Extract model name (e.g., "google/gemini-2.5-flash-preview-05-20" -> "GEMINI-2.5-FLASH")
         if '/' in model_full:
             model_name = model_full.split('/')[-1]
@@ -145,8 +145,7 @@ class OrchestratorCLI:
         print("-" * 50)
         
         try:
-            orchestrator_config = self.orchestrator.config['openrouter']
-            print(f"Using model: {orchestrator_config['model']}")
+            print(f"Using model: {self.orchestrator.phase_model('agents')}")
             print("Orchestrator initialized successfully!")
             print("Note: Make sure to set your OpenRouter API key in config.yaml")
             print("-" * 50)
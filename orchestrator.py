@@ -1,33 +1,115 @@
-import json
-import yaml
 import time
+import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
-from agent import OpenRouterAgent
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional
+from agent import OpenRouterAgent, AsyncOpenRouterAgent
+from config_registry import load_config
+from cancellation import CancellationToken, OperationCancelled
+from cache_store import get_cache
+from llm_cache import get_llm_cache, LLMCacheMiss
+from telemetry import get_telemetry
+from json_stream import JsonStringArrayParser
 
 class TaskOrchestrator:
-    def __init__(self, config_path="config.yaml", silent=False):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path="config.yaml", silent=False, cancel_token=None):
+        # Load configuration (parsed once per file version, shared read-only)
+        self.config = load_config(config_path)
         
         self.num_agents = self.config['orchestrator']['parallel_agents']
         self.task_timeout = self.config['orchestrator']['task_timeout']
         self.aggregation_strategy = self.config['orchestrator']['aggregation_strategy']
         self.silent = silent
         
+        # Quorum policy: start synthesis once enough agents succeeded or the deadline passed
+        quorum_config = self.config['orchestrator'].get('quorum', {}) or {}
+        self.quorum_agents = min(max(quorum_config.get('min_agents', self.num_agents), 1), self.num_agents)
+        self.quorum_deadline = quorum_config.get('deadline')
+        # "cancel" drops unfinished agents, "refine" folds their answers into a second synthesis
+        self.straggler_policy = quorum_config.get('stragglers', 'cancel')
+        
+        # Per-phase model routing (decomposition, agents, summary, synthesis); unset phases use openrouter.model
+        self.models = self.config['orchestrator'].get('models', {}) or {}
+        
+        # Recorded runs must replay the same LLM calls: wait for every agent and always
+        # generate the decomposition, so the recording covers the whole pipeline
+        self.reproducible = get_llm_cache(self.config).mode in ("record", "replay")
+        if self.reproducible:
+            self.quorum_agents = self.num_agents
+            self.quorum_deadline = None
+        
         # Track agent progress
         self.agent_progress = {}
         self.agent_results = {}
         self.progress_lock = threading.Lock()
+        # Called with (agent_id, status) whenever an agent's status changes, from any thread
+        self.progress_callback = None
+        
+        # Request-level cancellation; each agent gets a child token with its own deadline
+        self.cancel_token = cancel_token or CancellationToken()
+        self.agent_tokens = {}
+        
+        # Decompositions already generated for a query (same day, same agent count)
+        self.decomposition_cache = get_cache('decompositions', self.config)
+        
+        # Spans for the orchestration and its phases; trace_parent is the enclosing request span
+        self.telemetry = get_telemetry(self.config)
+        self.trace_parent = None
+        self.span = None
     
     def decompose_task(self, user_input: str, num_agents: int) -> List[str]:
         """Use AI to dynamically generate different questions based on user input"""
+        return list(self.iter_questions(user_input, num_agents))
+    
+    def iter_questions(self, user_input: str, num_agents: int):
+        """
+        Yield the agent questions one by one, each as soon as the model has finished writing it.
+        Generation is a single tool-free streamed call whose JSON array is parsed incrementally;
+        results are cached per query, and fallback questions fill in if generation falls short.
+        """
+        cache_key = self._decomposition_key(user_input, num_agents)
+        with self.telemetry.start_span("decomposition", parent=self.span, attributes={"decomposition.agents": num_agents}) as span:
+            cached = None if self.reproducible else self.decomposition_cache.get(cache_key)
+            if cached:
+                span.set("decomposition.cache_hit", True)
+                yield from cached
+                return
+            
+            questions = []
+            try:
+                question_agent = OpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+                self._route(question_agent, "decomposition")
+                self._prepare_synthesis_agent(question_agent)
+                question_agent.trace_parent = span
+                parser = JsonStringArrayParser()
+                prompt = self._prompt_messages(self._question_generation_prompt(user_input, num_agents))
+                for token in question_agent.call_llm_stream(prompt):
+                    for question in parser.feed(token):
+                        if len(questions) < num_agents:
+                            questions.append(question)
+                            yield question
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception:
+                # Fall through to the fallback questions below
+                pass
+            
+            if len(questions) == num_agents:
+                self.decomposition_cache.set(cache_key, questions)
+            else:
+                yield from self._fallback_questions(user_input, num_agents)[len(questions):]
+    
+    def _decomposition_key(self, user_input: str, num_agents: int) -> str:
+        """Cache key for a decomposition: normalized query, agent count, model and date"""
         from datetime import datetime
         
-        # Create question generation agent
-        question_agent = OpenRouterAgent(silent=True)
+        query = ' '.join(user_input.lower().split())
+        current_date = datetime.now().strftime("%d/%m/%Y")
+        return f"{num_agents}:{self.phase_model('decomposition')}:{current_date}:{query}"
+    
+    def _question_generation_prompt(self, user_input: str, num_agents: int) -> str:
+        """Build the question generation prompt from config"""
+        from datetime import datetime
         
         # Get current date for prompt injection
         current_date = datetime.now().strftime("%d/%m/%Y")
@@ -40,66 +122,75 @@ class TaskOrchestrator:
         )
         
         # Inject current date into prompt
-        generation_prompt = generation_prompt.replace('{current_date}', current_date)
-        
-        # Remove task completion tool to avoid issues
-        question_agent.tools = [tool for tool in question_agent.tools if tool.get('function', {}).get('name') != 'mark_task_complete']
-        question_agent.tool_mapping = {name: func for name, func in question_agent.tool_mapping.items() if name != 'mark_task_complete'}
+        return generation_prompt.replace('{current_date}', current_date)
+    
+    @staticmethod
+    def _fallback_questions(user_input: str, num_agents: int) -> List[str]:
+        """Simple question variations used when AI question generation fails"""
+        from datetime import datetime
         
-        try:
-            # Get AI-generated questions
-            response = question_agent.run(generation_prompt)
-            
-            # Parse JSON response
-            questions = json.loads(response.strip())
-            
-            # Validate we got the right number of questions
-            if len(questions) != num_agents:
-                raise ValueError(f"Expected {num_agents} questions, got {len(questions)}")
-            
-            return questions
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            # Fallback: create simple variations if AI fails
-            return [
-                f"Research comprehensive information about: {user_input} (as of {current_date})",
-                f"Analyze and provide insights about: {user_input} (as of {current_date})",
-                f"Find alternative perspectives on: {user_input} (as of {current_date})",
-                f"Verify and cross-check facts about: {user_input} (as of {current_date})"
-            ][:num_agents]
+        current_date = datetime.now().strftime("%d/%m/%Y")
+        return [
+            f"Research comprehensive information about: {user_input} (as of {current_date})",
+            f"Analyze and provide insights about: {user_input} (as of {current_date})",
+            f"Find alternative perspectives on: {user_input} (as of {current_date})",
+            f"Verify and cross-check facts about: {user_input} (as of {current_date})"
+        ][:num_agents]
     
     def update_agent_progress(self, agent_id: int, status: str, result: str = None):
-        """Thread-safe progress tracking"""
+        """Thread-safe progress tracking; only actual changes reach progress_callback"""
         with self.progress_lock:
+            changed = self.agent_progress.get(agent_id) != status
             self.agent_progress[agent_id] = status
             if result is not None:
                 self.agent_results[agent_id] = result
+        if changed and self.progress_callback:
+            self.progress_callback(agent_id, status)
     
     def run_agent_parallel(self, agent_id: int, subtask: str, tool_callback=None) -> Dict[str, Any]:
         """
         Run a single agent with the given subtask.
         Returns result dictionary with agent_id, status, and response.
         """
+        token = self._agent_token(agent_id)
+        span = self.telemetry.start_span("agent", parent=self.span, attributes={"agent.id": agent_id})
         try:
             self.update_agent_progress(agent_id, "PROCESSING...")
             
             # Use simple agent like in main.py, pass tool_callback
-            agent = OpenRouterAgent(silent=True, tool_callback=tool_callback)
+            agent = OpenRouterAgent(silent=True, tool_callback=tool_callback, cancel_token=token)
+            self._route(agent, "agents", agent_id)
+            agent.trace_parent = span
             
             start_time = time.time()
             response = agent.run(subtask)
             execution_time = time.time() - start_time
             
-            self.update_agent_progress(agent_id, "COMPLETED", response)
-            
-            return {
+            result = {
                 "agent_id": agent_id,
-                "status": "success", 
+                "status": "success",
                 "response": response,
                 "execution_time": execution_time
             }
             
+            # Hierarchical aggregation: condense the answer now, while other agents are still running
+            if self.aggregation_strategy == "hierarchical":
+                self.update_agent_progress(agent_id, "SUMMARIZING...")
+                result["summary"] = self._summarize(subtask, response, token, span)
+            
+            self.update_agent_progress(agent_id, "COMPLETED", response)
+            
+            return result
+        
+        except OperationCancelled as e:
+            span.end(error=e)
+            return self._cancelled_result(agent_id, token, e)
+        except LLMCacheMiss as e:
+            # Replay must fail the whole run, not turn into one agent's error answer
+            span.end(error=e)
+            raise
         except Exception as e:
+            span.end(error=e)
             # Simple error handling
             return {
                 "agent_id": agent_id,
@@ -107,11 +198,14 @@ class TaskOrchestrator:
                 "response": f"Error: {str(e)}",
                 "execution_time": 0
             }
+        finally:
+            span.end()
     
-    def aggregate_results(self, agent_results: List[Dict[str, Any]]) -> str:
+    def aggregate_results(self, agent_results: List[Dict[str, Any]], content_callback=None) -> str:
         """
         Combine results from all agents into a comprehensive final answer.
-        Uses the configured aggregation strategy.
+        Uses the configured aggregation strategy; the hierarchical strategy streams
+        the final answer to content_callback as it is generated.
         """
         successful_results = [r for r in agent_results if r["status"] == "success"]
         
@@ -123,24 +217,90 @@ class TaskOrchestrator:
         
         if self.aggregation_strategy == "consensus":
             return self._aggregate_consensus(responses, successful_results)
+        elif self.aggregation_strategy == "hierarchical":
+            return self._aggregate_hierarchical(successful_results, content_callback)
         else:
             # Default to consensus
             return self._aggregate_consensus(responses, successful_results)
     
-    def _aggregate_consensus(self, responses: List[str], _results: List[Dict[str, Any]]) -> str:
+    def _summarize(self, subtask: str, response: str, token: CancellationToken, parent=None) -> str:
+        """Map step of the hierarchical strategy: condense one agent's answer with a single LLM call"""
+        summary_agent = OpenRouterAgent(silent=True, cancel_token=token)
+        self._route(summary_agent, "summary")
+        self._prepare_synthesis_agent(summary_agent)
+        with self.telemetry.start_span("summary", parent=parent) as span:
+            summary_agent.trace_parent = span
+            try:
+                reply = summary_agent.call_llm(self._prompt_messages(self._summary_prompt(subtask, response)))
+                return reply.choices[0].message.content or response
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception:
+                # The full answer still works as synthesis input, just a longer one
+                return response
+    
+    def _aggregate_hierarchical(self, results: List[Dict[str, Any]], content_callback=None) -> str:
+        """Reduce step of the hierarchical strategy: one streamed synthesis call over the summaries"""
+        if len(results) == 1:
+            return results[0]["response"]
+        
+        summaries = self._synthesis_inputs(results)
+        synthesis_agent = OpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+        self._route(synthesis_agent, "synthesis")
+        self._prepare_synthesis_agent(synthesis_agent)
+        
+        with self.telemetry.start_span("synthesis", parent=self.span, attributes={"synthesis.inputs": len(summaries)}) as span:
+            synthesis_agent.trace_parent = span
+            parts = []
+            try:
+                for token in synthesis_agent.call_llm_stream(self._prompt_messages(self._synthesis_prompt(summaries))):
+                    parts.append(token)
+                    if content_callback:
+                        content_callback(token)
+                return "".join(parts)
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception as e:
+                return self._synthesis_fallback(summaries, e)
+    
+    def _aggregate_consensus(self, responses: List[str], _results: List[Dict[str, Any]], draft: Optional[str] = None) -> str:
         """
         Use one final AI call to synthesize all agent responses into a coherent answer.
+        With a draft, the responses are folded into that earlier synthesis.
         """
-        from datetime import datetime
-        
-        if len(responses) == 1:
+        if len(responses) == 1 and draft is None:
             return responses[0]
         
         # Create synthesis agent to combine all responses
-        synthesis_agent = OpenRouterAgent(silent=True)
+        synthesis_agent = OpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+        self._route(synthesis_agent, "synthesis")
+        self._prepare_synthesis_agent(synthesis_agent)
+        
+        with self.telemetry.start_span("synthesis", parent=self.span, attributes={"synthesis.inputs": len(responses)}) as span:
+            synthesis_agent.trace_parent = span
+            # Get the synthesized response
+            try:
+                final_answer = synthesis_agent.run(self._synthesis_prompt(responses, draft))
+                return final_answer
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception as e:
+                # A failed refinement keeps the draft that was already delivered
+                return draft if draft is not None else self._synthesis_fallback(responses, e)
+    
+    def _synthesis_prompt(self, responses: List[str], draft: Optional[str] = None) -> str:
+        """Build the synthesis prompt from config and the agent responses (plus an earlier draft to refine)"""
+        from datetime import datetime
         
-        # Build agent responses section
+        # Build agent responses section; a draft is labelled as such so it is not counted as one more agent
         agent_responses_text = ""
+        if draft is not None:
+            agent_responses_text += (
+                "=== CURRENT DRAFT ANSWER ===\n"
+                "(Already synthesized from the earlier agents. Not an independent agent response: "
+                "refine it with the additional responses below.)\n"
+                f"{draft}\n\n"
+            )
         for i, response in enumerate(responses, 1):
             agent_responses_text += f"=== AGENT {i} RESPONSE ===\n{response}\n\n"
         
@@ -156,45 +316,107 @@ class TaskOrchestrator:
         )
         
         # Inject current date into prompt
-        synthesis_prompt = synthesis_prompt.replace('{current_date}', current_date)
-        
-        # Completely remove all tools from synthesis agent to force direct response
+        return synthesis_prompt.replace('{current_date}', current_date)
+    
+    def _summary_prompt(self, subtask: str, response: str) -> str:
+        """Build the per-agent summary prompt from config"""
+        return self.config['orchestrator']['summary_prompt'].format(
+            question=subtask,
+            response=response
+        )
+    
+    @staticmethod
+    def _synthesis_inputs(results: List[Dict[str, Any]]) -> List[str]:
+        """Per-agent text handed to synthesis: the summary when one was made, else the full answer"""
+        return [r.get("summary") or r["response"] for r in results]
+    
+    @staticmethod
+    def _prompt_messages(prompt: str) -> List[Dict[str, str]]:
+        """Single-turn conversation for a direct LLM call, without the agent system prompt"""
+        return [{"role": "user", "content": prompt}]
+    
+    def _phase_route(self, phase: str, agent_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Route configured for a phase: a model name or {model, fallback_models}. A list
+        assigns its entries to agents round-robin (per-agent models).
+        """
+        route = self.models.get(phase)
+        if isinstance(route, list):
+            route = route[(agent_id or 0) % len(route)] if route else None
+        if isinstance(route, dict):
+            return route
+        return {"model": route} if route else {}
+    
+    def phase_model(self, phase: str, agent_id: Optional[int] = None) -> str:
+        """Model used for a phase (openrouter.model unless routed elsewhere)"""
+        return self._phase_route(phase, agent_id).get('model') or self.config['openrouter']['model']
+    
+    def _route(self, agent: OpenRouterAgent, phase: str, agent_id: Optional[int] = None):
+        """Point an agent at the model (and fallback models) configured for its phase"""
+        route = self._phase_route(phase, agent_id)
+        agent.model = route.get('model') or agent.model
+        if route.get('fallback_models') is not None:
+            agent.fallback_models = list(route['fallback_models'])
+    
+    @staticmethod
+    def _prepare_synthesis_agent(synthesis_agent: OpenRouterAgent):
+        """Completely remove all tools from synthesis agent to force direct response"""
         synthesis_agent.tools = []
         synthesis_agent.tool_mapping = {}
-        
-        # Get the synthesized response
-        try:
-            final_answer = synthesis_agent.run(synthesis_prompt)
-            return final_answer
-        except Exception as e:
-            # Log the error for debugging
-            print(f"\n🚨 SYNTHESIS FAILED: {str(e)}")
-            print("📋 Falling back to concatenated responses\n")
-            # Fallback: if synthesis fails, concatenate responses
-            combined = []
-            for i, response in enumerate(responses, 1):
-                combined.append(f"=== Agent {i} Response ===")
-                combined.append(response)
-                combined.append("")
-            return "\n".join(combined)
+    
+    @staticmethod
+    def _synthesis_fallback(responses: List[str], error: Exception) -> str:
+        """Concatenate agent responses when synthesis fails"""
+        # Log the error for debugging
+        print(f"\n🚨 SYNTHESIS FAILED: {str(error)}")
+        print("📋 Falling back to concatenated responses\n")
+        combined = []
+        for i, response in enumerate(responses, 1):
+            combined.append(f"=== Agent {i} Response ===")
+            combined.append(response)
+            combined.append("")
+        return "\n".join(combined)
     
     def get_progress_status(self) -> Dict[int, str]:
         """Get current progress status for all agents"""
         with self.progress_lock:
             return self.agent_progress.copy()
     
-    def orchestrate(self, user_input: str, tool_callback=None):
+    def _agent_token(self, agent_id: int) -> CancellationToken:
+        """Cancellation token of one agent: task_timeout deadline, cancelled with the whole request"""
+        with self.progress_lock:
+            token = self.agent_tokens.get(agent_id)
+            if token is None:
+                token = self.cancel_token.child(timeout=self.task_timeout)
+                self.agent_tokens[agent_id] = token
+            return token
+    
+    def _cancel_agent(self, agent_id: int, reason: str):
+        """Stop one agent at its next checkpoint"""
+        self._agent_token(agent_id).cancel(reason)
+        self.update_agent_progress(agent_id, "CANCELLED")
+    
+    def _cancelled_result(self, agent_id: int, token: CancellationToken, error: Exception) -> Dict[str, Any]:
+        """Result entry for an agent stopped by its deadline or by cancellation"""
+        if token.reason == "deadline exceeded":
+            self.update_agent_progress(agent_id, "FAILED (timeout)")
+        else:
+            self.update_agent_progress(agent_id, "CANCELLED")
+        return self._timeout_result(agent_id, error)
+    
+    def orchestrate(self, user_input: str, tool_callback=None, draft_callback=None, content_callback=None):
         """
         Main orchestration method.
         Takes user input, delegates to parallel agents, and returns aggregated result.
+        Synthesis starts as soon as the quorum policy allows; with the "refine" straggler
+        policy the early answer is passed to draft_callback and refined with late agents.
+        content_callback receives the answer's tokens while it streams (hierarchical strategy).
         """
         
         # Reset progress tracking
         self.agent_progress = {}
         self.agent_results = {}
-        
-        # Decompose task into subtasks
-        subtasks = self.decompose_task(user_input, self.num_agents)
+        self.agent_tokens = {}
         
         # Initialize progress tracking
         for i in range(self.num_agents):
@@ -203,31 +425,363 @@ class TaskOrchestrator:
         # Execute agents in parallel
         agent_results = []
         
-        with ThreadPoolExecutor(max_workers=self.num_agents) as executor:
-            # Submit all agent tasks with tool_callback
-            future_to_agent = {
-                executor.submit(self.run_agent_parallel, i, subtasks[i], tool_callback): i
-                for i in range(self.num_agents)
+        # Not a context manager: leaving it would wait for stragglers
+        executor = ThreadPoolExecutor(max_workers=self.num_agents)
+        future_to_agent = {}
+        pending = set()
+        start_time = time.time()
+        self.span = self._start_orchestration_span()
+        try:
+            # Decompose the task while it runs: each agent starts as soon as its question is written
+            for agent_id, subtask in enumerate(self.iter_questions(user_input, self.num_agents)):
+                future = executor.submit(self.run_agent_parallel, agent_id, subtask, tool_callback)
+                future_to_agent[future] = agent_id
+                pending.add(future)
+            
+            # Collect results as they complete until the quorum is reached.
+            # Agents stop themselves at task_timeout; the check below only guards against a tool
+            # ignoring its cancellation token
+            while not self._quorum_reached(agent_results, len(pending), time.time() - start_time):
+                elapsed = time.time() - start_time
+                if elapsed >= self.task_timeout:
+                    break
+                done, pending = wait(pending, timeout=self._next_wait(elapsed), return_when=FIRST_COMPLETED)
+                for future in done:
+                    agent_results.append(self._future_result(future, future_to_agent[future]))
+            
+            # Aggregate results
+            agent_results.sort(key=lambda x: x["agent_id"])
+            final_result = self.aggregate_results(agent_results, content_callback)
+            
+            if pending and self.straggler_policy == "refine":
+                if draft_callback:
+                    draft_callback(final_result)
+                done, pending = wait(pending, timeout=max(self.task_timeout - (time.time() - start_time), 0))
+                late_results = [self._future_result(future, future_to_agent[future]) for future in done]
+                final_result = self._refine(final_result, late_results)
+        finally:
+            # Stragglers stop at their next checkpoint instead of running on in the background
+            for future in pending:
+                self._cancel_agent(future_to_agent[future], "synthesis started")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.span.set("orchestrator.agents_finished", len(agent_results))
+            self.span.end()
+        
+        return final_result
+    
+    def _start_orchestration_span(self):
+        return self.telemetry.start_span("orchestration", parent=self.trace_parent, attributes={
+            "orchestrator.agents": self.num_agents,
+            "orchestrator.aggregation_strategy": self.aggregation_strategy,
+        })
+    
+    def _quorum_reached(self, agent_results: List[Dict[str, Any]], pending_count: int, elapsed: float) -> bool:
+        """Whether synthesis can start without waiting for the remaining agents"""
+        if not pending_count:
+            return True
+        successes = sum(1 for r in agent_results if r["status"] == "success")
+        if successes >= self.quorum_agents:
+            return True
+        # Past the deadline any successful answer is enough
+        return self.quorum_deadline is not None and elapsed >= self.quorum_deadline and successes > 0
+    
+    def _next_wait(self, elapsed: float) -> float:
+        """Seconds to wait for the next agent before re-checking the quorum"""
+        remaining = self.task_timeout - elapsed
+        if self.quorum_deadline is not None and elapsed < self.quorum_deadline:
+            remaining = min(remaining, self.quorum_deadline - elapsed)
+        return max(remaining, 0)
+    
+    def _future_result(self, future, agent_id: int) -> Dict[str, Any]:
+        """Result entry of a finished agent future"""
+        try:
+            return future.result()
+        except LLMCacheMiss:
+            raise
+        except Exception as e:
+            return self._timeout_result(agent_id, e)
+    
+    def _refine(self, draft: str, late_results: List[Dict[str, Any]]) -> str:
+        """Fold the answers of agents that finished after the early synthesis into it"""
+        late_responses = self._synthesis_inputs([r for r in late_results if r["status"] == "success"])
+        if not late_responses:
+            return draft
+        return self._aggregate_consensus(late_responses, late_results, draft=draft)
+    
+    def _timeout_result(self, agent_id: int, error: Exception) -> Dict[str, Any]:
+        """Result entry for an agent that timed out or failed outside run_agent_parallel"""
+        return {
+            "agent_id": agent_id,
+            "status": "timeout",
+            "response": f"Agent {agent_id + 1} timed out or failed: {str(error)}",
+            "execution_time": self.task_timeout
+        }
+
+
+class AsyncTaskOrchestrator(TaskOrchestrator):
+    """
+    Native asyncio variant of TaskOrchestrator.
+    Agents are AsyncOpenRouterAgent coroutines scheduled on the running event loop
+    instead of threads, so orchestrations can run directly inside an async server.
+    """
+    
+    async def decompose_task(self, user_input: str, num_agents: int) -> List[str]:
+        """Use AI to dynamically generate different questions based on user input"""
+        return [question async for question in self.iter_questions(user_input, num_agents)]
+    
+    async def iter_questions(self, user_input: str, num_agents: int):
+        """
+        Yield the agent questions one by one, each as soon as the model has finished writing it.
+        Generation is a single tool-free streamed call whose JSON array is parsed incrementally;
+        results are cached per query, and fallback questions fill in if generation falls short.
+        """
+        cache_key = self._decomposition_key(user_input, num_agents)
+        with self.telemetry.start_span("decomposition", parent=self.span, attributes={"decomposition.agents": num_agents}) as span:
+            cached = None if self.reproducible else self.decomposition_cache.get(cache_key)
+            if cached:
+                span.set("decomposition.cache_hit", True)
+                for question in cached:
+                    yield question
+                return
+            
+            questions = []
+            try:
+                question_agent = AsyncOpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+                self._route(question_agent, "decomposition")
+                self._prepare_synthesis_agent(question_agent)
+                question_agent.trace_parent = span
+                parser = JsonStringArrayParser()
+                prompt = self._prompt_messages(self._question_generation_prompt(user_input, num_agents))
+                async for item in question_agent.call_llm_stream(prompt):
+                    # The last item is the assembled message, not a token
+                    if not isinstance(item, str):
+                        continue
+                    for question in parser.feed(item):
+                        if len(questions) < num_agents:
+                            questions.append(question)
+                            yield question
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception:
+                # Fall through to the fallback questions below
+                pass
+            
+            if len(questions) == num_agents:
+                self.decomposition_cache.set(cache_key, questions)
+            else:
+                for question in self._fallback_questions(user_input, num_agents)[len(questions):]:
+                    yield question
+    
+    async def run_agent_parallel(self, agent_id: int, subtask: str, tool_callback=None) -> Dict[str, Any]:
+        """
+        Run a single agent with the given subtask.
+        Returns result dictionary with agent_id, status, and response.
+        """
+        token = self._agent_token(agent_id)
+        span = self.telemetry.start_span("agent", parent=self.span, attributes={"agent.id": agent_id})
+        try:
+            self.update_agent_progress(agent_id, "PROCESSING...")
+            
+            agent = AsyncOpenRouterAgent(silent=True, tool_callback=tool_callback, cancel_token=token)
+            self._route(agent, "agents", agent_id)
+            agent.trace_parent = span
+            
+            start_time = time.time()
+            response = await agent.run(subtask)
+            execution_time = time.time() - start_time
+            
+            result = {
+                "agent_id": agent_id,
+                "status": "success",
+                "response": response,
+                "execution_time": execution_time
+            }
+            
+            # Hierarchical aggregation: condense the answer now, while other agents are still running
+            if self.aggregation_strategy == "hierarchical":
+                self.update_agent_progress(agent_id, "SUMMARIZING...")
+                result["summary"] = await self._summarize(subtask, response, token, span)
+            
+            self.update_agent_progress(agent_id, "COMPLETED", response)
+            
+            return result
+        
+        except OperationCancelled as e:
+            span.end(error=e)
+            return self._cancelled_result(agent_id, token, e)
+        except LLMCacheMiss as e:
+            # Replay must fail the whole run, not turn into one agent's error answer
+            span.end(error=e)
+            raise
+        except asyncio.CancelledError:
+            span.end(error="cancelled")
+            raise
+        except Exception as e:
+            span.end(error=e)
+            return {
+                "agent_id": agent_id,
+                "status": "error",
+                "response": f"Error: {str(e)}",
+                "execution_time": 0
             }
+        finally:
+            span.end()
+    
+    async def aggregate_results(self, agent_results: List[Dict[str, Any]], content_callback=None) -> str:
+        """
+        Combine results from all agents into a comprehensive final answer.
+        Uses the configured aggregation strategy; the hierarchical strategy streams
+        the final answer to content_callback as it is generated.
+        """
+        successful_results = [r for r in agent_results if r["status"] == "success"]
+        
+        if not successful_results:
+            return "All agents failed to provide results. Please try again."
+        
+        responses = [r["response"] for r in successful_results]
+        
+        if self.aggregation_strategy == "hierarchical":
+            return await self._aggregate_hierarchical(successful_results, content_callback)
+        return await self._aggregate_consensus(responses, successful_results)
+    
+    async def _summarize(self, subtask: str, response: str, token: CancellationToken, parent=None) -> str:
+        """Map step of the hierarchical strategy: condense one agent's answer with a single LLM call"""
+        summary_agent = AsyncOpenRouterAgent(silent=True, cancel_token=token)
+        self._route(summary_agent, "summary")
+        self._prepare_synthesis_agent(summary_agent)
+        with self.telemetry.start_span("summary", parent=parent) as span:
+            summary_agent.trace_parent = span
+            try:
+                reply = await summary_agent.call_llm(self._prompt_messages(self._summary_prompt(subtask, response)))
+                return reply.choices[0].message.content or response
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception:
+                # The full answer still works as synthesis input, just a longer one
+                return response
+    
+    async def _aggregate_hierarchical(self, results: List[Dict[str, Any]], content_callback=None) -> str:
+        """Reduce step of the hierarchical strategy: one streamed synthesis call over the summaries"""
+        if len(results) == 1:
+            return results[0]["response"]
+        
+        summaries = self._synthesis_inputs(results)
+        synthesis_agent = AsyncOpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+        self._route(synthesis_agent, "synthesis")
+        self._prepare_synthesis_agent(synthesis_agent)
+        
+        with self.telemetry.start_span("synthesis", parent=self.span, attributes={"synthesis.inputs": len(summaries)}) as span:
+            synthesis_agent.trace_parent = span
+            parts = []
+            try:
+                async for item in synthesis_agent.call_llm_stream(self._prompt_messages(self._synthesis_prompt(summaries))):
+                    # The last item is the assembled message, not a token
+                    if isinstance(item, str):
+                        parts.append(item)
+                        if content_callback:
+                            content_callback(item)
+                return "".join(parts)
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception as e:
+                return self._synthesis_fallback(summaries, e)
+    
+    async def _aggregate_consensus(self, responses: List[str], _results: List[Dict[str, Any]], draft: Optional[str] = None) -> str:
+        """
+        Use one final AI call to synthesize all agent responses into a coherent answer.
+        With a draft, the responses are folded into that earlier synthesis.
+        """
+        if len(responses) == 1 and draft is None:
+            return responses[0]
+        
+        synthesis_agent = AsyncOpenRouterAgent(silent=True, cancel_token=self.cancel_token)
+        self._route(synthesis_agent, "synthesis")
+        self._prepare_synthesis_agent(synthesis_agent)
+        
+        with self.telemetry.start_span("synthesis", parent=self.span, attributes={"synthesis.inputs": len(responses)}) as span:
+            synthesis_agent.trace_parent = span
+            try:
+                return await synthesis_agent.run(self._synthesis_prompt(responses, draft))
+            except (OperationCancelled, LLMCacheMiss):
+                raise
+            except Exception as e:
+                # A failed refinement keeps the draft that was already delivered
+                return draft if draft is not None else self._synthesis_fallback(responses, e)
+    
+    async def _run_agent_with_timeout(self, agent_id: int, subtask: str, tool_callback=None) -> Dict[str, Any]:
+        """Run one agent, cancelling it once task_timeout elapses"""
+        try:
+            return await asyncio.wait_for(
+                self.run_agent_parallel(agent_id, subtask, tool_callback),
+                timeout=self.task_timeout
+            )
+        except asyncio.TimeoutError as e:
+            return self._timeout_result(agent_id, e)
+    
+    async def orchestrate(self, user_input: str, tool_callback=None, draft_callback=None, content_callback=None):
+        """
+        Main orchestration method.
+        Takes user input, delegates to concurrent agents, and returns aggregated result.
+        Synthesis starts as soon as the quorum policy allows; with the "refine" straggler
+        policy the early answer is passed to draft_callback and refined with late agents.
+        content_callback receives the answer's tokens while it streams (hierarchical strategy).
+        """
+        self.agent_progress = {}
+        self.agent_results = {}
+        self.agent_tokens = {}
+        
+        for i in range(self.num_agents):
+            self.agent_progress[i] = "QUEUED"
+        
+        task_to_agent = {}
+        pending = set()
+        agent_results = []
+        start_time = time.time()
+        self.span = self._start_orchestration_span()
+        
+        try:
+            # Decompose the task while it runs: each agent starts as soon as its question is written
+            agent_id = 0
+            async for subtask in self.iter_questions(user_input, self.num_agents):
+                task = asyncio.create_task(self._run_agent_with_timeout(agent_id, subtask, tool_callback))
+                task_to_agent[task] = agent_id
+                pending.add(task)
+                agent_id += 1
             
-            # Collect results as they complete
-            for future in as_completed(future_to_agent, timeout=self.task_timeout):
-                try:
-                    result = future.result()
-                    agent_results.append(result)
-                except Exception as e:
-                    agent_id = future_to_agent[future]
-                    agent_results.append({
-                        "agent_id": agent_id,
-                        "status": "timeout",
-                        "response": f"Agent {agent_id + 1} timed out or failed: {str(e)}",
-                        "execution_time": self.task_timeout
-                    })
-        
-        # Sort results by agent_id for consistent output
-        agent_results.sort(key=lambda x: x["agent_id"])
-        
-        # Aggregate results
-        final_result = self.aggregate_results(agent_results)
-        
-        return final_result
\ No newline at end of file
+            # Each agent enforces task_timeout itself, from its own start; past the orchestration's
+            # timeout a zero wait would return at once and spin, so stop collecting like the sync loop
+            while not self._quorum_reached(agent_results, len(pending), time.time() - start_time):
+                elapsed = time.time() - start_time
+                if elapsed >= self.task_timeout:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=self._next_wait(elapsed), return_when=asyncio.FIRST_COMPLETED
+                )
+                agent_results.extend(task.result() for task in done)
+            
+            agent_results.sort(key=lambda x: x["agent_id"])
+            final_result = await self.aggregate_results(agent_results, content_callback)
+            
+            if pending and self.straggler_policy == "refine":
+                if draft_callback:
+                    draft_callback(final_result)
+                done, pending = await asyncio.wait(pending)
+                final_result = await self._refine(final_result, [task.result() for task in done])
+            
+            return final_result
+        finally:
+            # Stragglers (or every agent, if we were cancelled) stop at their next await
+            for task in pending:
+                self._cancel_agent(task_to_agent[task], "synthesis started")
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self.span.set("orchestrator.agents_finished", len(agent_results))
+            self.span.end()
+    
+    async def _refine(self, draft: str, late_results: List[Dict[str, Any]]) -> str:
+        """Fold the answers of agents that finished after the early synthesis into it"""
+        late_responses = self._synthesis_inputs([r for r in late_results if r["status"] == "success"])
+        if not late_responses:
+            return draft
+        return await self._aggregate_consensus(late_responses, late_results, draft=draft)
\ No newline at end of file
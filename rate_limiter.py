@@ -0,0 +1,295 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import openai
+from cancellation import CancellationToken
+
+# Process-wide client-side rate limiting for LLM requests.
+# Every agent of a process draws from the same token buckets (requests and tokens
+# per minute), so a fan-out of N agents runs at the highest sustainable rate instead
+# of tripping provider limits. Rate-limit answers slow the buckets down and pause all
+# callers for the Retry-After period; transient failures are retried with jittered
+# exponential backoff, and a circuit breaker fails fast while the endpoint is down.
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the endpoint while the circuit breaker is open"""
+
+
+class _TokenBucket:
+    """Token bucket whose refill rate can be scaled down; reservations may go into debt"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float, scale: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60 * scale)
+        self.updated = now
+    
+    def reserve(self, amount: float, now: float, scale: float) -> float:
+        """Take amount from the bucket and return the seconds to wait until it is covered"""
+        self._refill(now, scale)
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / (self.capacity / 60 * scale)
+    
+    def refund(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Shared request/token budget with adaptive slow-down, retries and a circuit breaker"""
+    
+    def __init__(self, config: dict):
+        limit_config = (config or {}).get('rate_limit', {}) or {}
+        self.enabled = limit_config.get('enabled', True)
+        requests_per_minute = limit_config.get('requests_per_minute', 60)
+        tokens_per_minute = limit_config.get('tokens_per_minute', 0)
+        self.expected_completion_tokens = limit_config.get('expected_completion_tokens', 1000)
+        self.max_retries = limit_config.get('max_retries', 4)
+        self.backoff_base = limit_config.get('backoff_base', 1.0)
+        self.backoff_max = limit_config.get('backoff_max', 30.0)
+        self.min_rate_scale = limit_config.get('min_rate_scale', 0.1)
+        circuit_config = limit_config.get('circuit_breaker', {}) or {}
+        self.failure_threshold = circuit_config.get('failure_threshold', 5)
+        self.reset_timeout = circuit_config.get('reset_timeout', 30)
+        
+        # A limit of 0 disables the corresponding bucket
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        # Refill speed relative to the configured limits, lowered on rate-limit answers
+        self.rate_scale = 1.0
+        # Every caller waits until this time after a Retry-After
+        self._paused_until = 0.0
+        # Circuit breaker: consecutive failures, open until, no other probe request before
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_until = 0.0
+    
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether calls are charged against a tokens-per-minute budget"""
+        return self.enabled and self._tokens is not None
+    
+    def _reserve(self, tokens: int) -> float:
+        """Reserve one request and an estimated token count; returns the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self._paused_until - now, 0.0)
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now, self.rate_scale))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now, self.rate_scale))
+            return delay
+    
+    def _release(self, tokens: int):
+        """Give back a reservation that was never used (the caller was cancelled while waiting)"""
+        with self._lock:
+            if self._requests is not None:
+                self._requests.refund(1)
+            if self._tokens is not None:
+                self._tokens.refund(tokens)
+    
+    def _settle(self, estimated: int, result: Any):
+        """Correct the token reservation with the usage reported by the provider"""
+        usage = getattr(result, 'usage', None)
+        total = getattr(usage, 'total_tokens', None)
+        if total is None or self._tokens is None:
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated - total)
+    
+    def _check_circuit(self):
+        """Fail fast while the circuit is open; let a single probe through once it may close"""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return
+            now = time.monotonic()
+            if now < self._open_until or now < self._probe_until:
+                wait = max(self._open_until, self._probe_until) - now
+                raise CircuitOpenError(f"LLM endpoint unavailable after {self._failures} consecutive failures, retry in {wait:.0f}s")
+            # Half-open: this caller probes the endpoint; a lost probe is replaced after reset_timeout
+            self._probe_until = now + self.reset_timeout
+    
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_until = 0.0
+            # Recover the rate gradually after a slow-down
+            self.rate_scale = min(1.0, self.rate_scale + 0.05)
+    
+    def _record_failure(self, error: Exception) -> Optional[float]:
+        """Update limiter state for a failed attempt; returns the Retry-After delay if one was given"""
+        retry_after = _retry_after(error)
+        with self._lock:
+            now = time.monotonic()
+            self._probe_until = 0.0
+            if _status_code(error) == 429:
+                # The provider's limit is lower than ours: slow every caller down
+                self.rate_scale = max(self.min_rate_scale, self.rate_scale / 2)
+                if retry_after is not None:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open_until = now + self.reset_timeout
+        return retry_after
+    
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def _retry_delay(self, error: Exception, attempt: int, token: CancellationToken) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the error should be raised"""
+        token.raise_if_cancelled()
+        if not _is_retryable(error):
+            if _status_code(error) is not None:
+                # The endpoint answered: it is up, the request itself was rejected
+                self._record_success()
+            return None
+        retry_after = self._record_failure(error)
+        if attempt >= self.max_retries or self._failures >= self.failure_threshold:
+            return None
+        delay = self._backoff(attempt, retry_after)
+        remaining = token.remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+    
+    def call(self, request: Callable[[], Any], tokens: int = 0,
+             token: Optional[CancellationToken] = None) -> Any:
+        """Run request() within the budget, retrying transient failures"""
+        if not self.enabled:
+            return request()
+        token = token or CancellationToken()
+        tokens += self.expected_completion_tokens
+        attempt = 0
+        while True:
+            self._check_circuit()
+            delay = self._reserve(tokens)
+            if delay > 0:
+                try:
+                    _sleep(delay, token)
+                except Exception:
+                    self._release(tokens)
+                    raise
+            try:
+                result = request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, token)
+                if delay is None:
+                    raise
+                _sleep(delay, token)
+                attempt += 1
+                continue
+            self._record_success()
+            self._settle(tokens, result)
+            return result
+    
+    async def acall(self, request: Callable[[], Awaitable[Any]], tokens: int = 0,
+                    token: Optional[CancellationToken] = None) -> Any:
+        """Async variant of call(); request() returns a fresh awaitable per attempt"""
+        if not self.enabled:
+            return await request()
+        token = token or CancellationToken()
+        tokens += self.expected_completion_tokens
+        attempt = 0
+        while True:
+            self._check_circuit()
+            delay = self._reserve(tokens)
+            if delay > 0:
+                try:
+                    await _asleep(delay, token)
+                except BaseException:
+                    self._release(tokens)
+                    raise
+            try:
+                result = await request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, token)
+                if delay is None:
+                    raise
+                await _asleep(delay, token)
+                attempt += 1
+                continue
+            self._record_success()
+            self._settle(tokens, result)
+            return result
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, 'status_code', None)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth another attempt"""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    status = _status_code(error)
+    return status is not None and (status in (408, 409, 429) or status >= 500)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Delay requested by the provider through Retry-After (seconds or HTTP date) or retry-after-ms"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sleep(delay: float, token: CancellationToken):
+    """Sleep in short slices so a cancellation is noticed while waiting"""
+    end = time.monotonic() + delay
+    while True:
+        token.raise_if_cancelled()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 0.25))
+
+
+async def _asleep(delay: float, token: CancellationToken):
+    end = time.monotonic() + delay
+    while True:
+        token.raise_if_cancelled()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(remaining, 0.25))
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(config: dict) -> RateLimiter:
+    """Return the process-wide limiter for the configured endpoint and API key"""
+    key = (config['openrouter']['base_url'], config['openrouter']['api_key'])
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(config)
+            _limiters[key] = limiter
+        return limiter
\ No newline at end of file
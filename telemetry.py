@@ -0,0 +1,336 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Structured timing and token accounting.
+# Work is recorded as a tree of spans: request > orchestration > decomposition / agent /
+# synthesis, agent > agent.run > agent.iteration > llm.call / tool.call. Parents are passed
+# explicitly (agents and orchestrators expose a trace_parent attribute), so spans follow
+# the work across threads, tasks and generators. Finished spans feed process-wide
+# Prometheus metrics; a finished trace can be summarized per request and exported as
+# OTLP/JSON (to a file and/or an OTLP/HTTP collector).
+
+SERVICE_NAME = "make-it-heavy"
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Span names reported as phases in request summaries
+PHASES = ("decomposition", "agent", "summary", "synthesis")
+
+
+class Span:
+    """A timed unit of work; use as a context manager or call end() explicitly"""
+    
+    def __init__(self, telemetry: "Telemetry", name: str, parent: Optional["Span"] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.telemetry = telemetry
+        self.name = name
+        self.parent = parent
+        self.trace = parent.trace if parent is not None else Trace(self)
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+    
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (or to now while the span is open)"""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+    
+    def end(self, error: Any = None):
+        """Finish the span (only the first call counts), optionally marking it as failed"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+        self.telemetry._finish(self)
+    
+    def __enter__(self) -> "Span":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # A generator closed early by its consumer did not fail
+        self.end(error=None if exc_type is GeneratorExit else exc)
+        return False
+
+
+class Trace:
+    """All spans under one root span"""
+    
+    def __init__(self, root: Span):
+        self.trace_id = os.urandom(16).hex()
+        self.root = root
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+    
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+    
+    def finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Where the time and tokens of this trace went, per phase, LLM call, tool and agent"""
+        spans = self.finished_spans()
+        llm_calls = [s for s in spans if s.name == "llm.call"]
+        
+        phases = {}
+        for name in PHASES:
+            matching = [s for s in spans if s.name == name]
+            if matching:
+                phases[name] = {
+                    "count": len(matching),
+                    # Wall-clock time from the first start to the last end (agents overlap)
+                    "wall_ms": _ms(max(s.end_ns for s in matching) - min(s.start_ns for s in matching)),
+                    "total_ms": _ms(sum(s.end_ns - s.start_ns for s in matching)),
+                }
+        
+        tools = {}
+        for s in spans:
+            if s.name == "tool.call":
+                entry = tools.setdefault(s.attributes.get("gen_ai.tool.name", "unknown"), {"calls": 0, "errors": 0, "total_ms": 0.0})
+                entry["calls"] += 1
+                entry["errors"] += 1 if s.error else 0
+                entry["total_ms"] += _ms(s.end_ns - s.start_ns)
+        
+        agents = []
+        for agent_span in (s for s in spans if s.name == "agent"):
+            owned = [s for s in spans if _descends_from(s, agent_span)]
+            agents.append(dict(
+                {"agent_id": agent_span.attributes.get("agent.id"), "duration_ms": _ms(agent_span.end_ns - agent_span.start_ns),
+                 "status": "error" if agent_span.error else "ok",
+                 "iterations": sum(1 for s in owned if s.name == "agent.iteration"),
+                 "tool_calls": sum(1 for s in owned if s.name == "tool.call")},
+                **_llm_totals([s for s in owned if s.name == "llm.call"])
+            ))
+        
+        root_end = self.root.end_ns if self.root.end_ns is not None else time.time_ns()
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": _ms(root_end - self.root.start_ns),
+            "phases": phases,
+            "llm": _llm_totals(llm_calls),
+            "tools": tools,
+            "agents": sorted(agents, key=lambda a: (a["agent_id"] is None, a["agent_id"])),
+        }
+
+
+def _ms(nanoseconds: int) -> float:
+    return round(nanoseconds / 1e6, 1)
+
+
+def _descends_from(span: Span, ancestor: Span) -> bool:
+    parent = span.parent
+    while parent is not None:
+        if parent is ancestor:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _llm_totals(llm_calls: List[Span]) -> Dict[str, Any]:
+    """Call count, tokens and time of a set of llm.call spans"""
+    return {
+        "llm_calls": len(llm_calls),
+        "cache_hits": sum(1 for s in llm_calls if s.attributes.get("llm.cache_hit")),
+        "input_tokens": sum(s.attributes.get("gen_ai.usage.input_tokens", 0) for s in llm_calls),
+        "output_tokens": sum(s.attributes.get("gen_ai.usage.output_tokens", 0) for s in llm_calls),
+        "tokens_estimated": any(s.attributes.get("llm.usage_estimated") for s in llm_calls),
+        "llm_ms": _ms(sum(s.end_ns - s.start_ns for s in llm_calls)),
+    }
+
+
+class Metrics:
+    """Minimal Prometheus registry: labelled counters and histograms, rendered as text"""
+    
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._histograms: Dict[Tuple[str, tuple], List[float]] = {}
+    
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            state = self._histograms.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+    
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(state) for key, state in self._histograms.items()}
+        lines = []
+        for name in sorted({key[0] for key in counters} | {key[0] for key in histograms}):
+            kind, text = self._help.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {state[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {state[-2]:g}")
+                lines.append(f"{name}_count{_labels(labels)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+METRICS.describe("make_it_heavy_span_duration_seconds", "histogram", "Duration of traced work by span name")
+METRICS.describe("make_it_heavy_span_errors_total", "counter", "Spans that ended with an error")
+METRICS.describe("make_it_heavy_llm_requests_total", "counter", "LLM calls by model and cache outcome")
+METRICS.describe("make_it_heavy_llm_tokens_total", "counter", "LLM tokens by model and direction (input/output)")
+METRICS.describe("make_it_heavy_tool_calls_total", "counter", "Tool calls by tool and status")
+
+
+def render_metrics() -> str:
+    """Process-wide metrics in Prometheus text format (served at /metrics)"""
+    return METRICS.render()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """Spans encoded as an OTLP/JSON ExportTraceServiceRequest"""
+    encoded = []
+    for span in spans:
+        entry = {
+            "traceId": span.trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent is not None:
+            entry["parentSpanId"] = span.parent.span_id
+        encoded.append(entry)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": encoded}],
+    }]}
+
+
+class Telemetry:
+    """Span factory recording metrics and exporting finished traces"""
+    
+    def __init__(self, config: dict):
+        telemetry_config = (config or {}).get('telemetry', {}) or {}
+        self.config = config
+        self.enabled = telemetry_config.get('enabled', True)
+        self.otlp_endpoint = telemetry_config.get('otlp_endpoint')
+        self.otlp_file = telemetry_config.get('otlp_file')
+        self._file_lock = threading.Lock()
+        # Exports run off the request path, one at a time
+        self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry") \
+            if self.enabled and (self.otlp_endpoint or self.otlp_file) else None
+    
+    def start_span(self, name: str, parent: Optional[Span] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Open a span under parent (a new trace without one)"""
+        return Span(self, name, parent=parent, attributes=attributes)
+    
+    def _finish(self, span: Span):
+        span.trace.add(span)
+        if not self.enabled:
+            return
+        METRICS.observe("make_it_heavy_span_duration_seconds", span.duration, span=span.name)
+        if span.error:
+            METRICS.inc("make_it_heavy_span_errors_total", span=span.name)
+        if span.name == "llm.call":
+            # The model that answered: a fallback when the requested one failed
+            model = span.attributes.get("gen_ai.response.model") or span.attributes.get("gen_ai.request.model", "unknown")
+            METRICS.inc("make_it_heavy_llm_requests_total", model=model,
+                        cache="hit" if span.attributes.get("llm.cache_hit") else "miss")
+            for direction in ("input", "output"):
+                tokens = span.attributes.get(f"gen_ai.usage.{direction}_tokens")
+                if tokens:
+                    METRICS.inc("make_it_heavy_llm_tokens_total", tokens, model=model, direction=direction)
+        elif span.name == "tool.call":
+            METRICS.inc("make_it_heavy_tool_calls_total", tool=span.attributes.get("gen_ai.tool.name", "unknown"),
+                        status="error" if span.error else "ok")
+        if span is span.trace.root and self._exporter is not None:
+            self._exporter.submit(self._export, span.trace.finished_spans())
+    
+    def _export(self, spans: List[Span]):
+        """Write a finished trace to the OTLP file and/or collector; failures never reach requests"""
+        payload = otlp_payload(spans)
+        if self.otlp_file:
+            try:
+                directory = os.path.dirname(os.path.abspath(self.otlp_file))
+                os.makedirs(directory, exist_ok=True)
+                with self._file_lock, open(self.otlp_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+            except OSError:
+                pass
+        if self.otlp_endpoint:
+            from http_pool import get_http_client
+            try:
+                get_http_client(self.config).post(self.otlp_endpoint, json=payload, timeout=5)
+            except Exception:
+                pass
+
+
+_telemetry: Dict[Tuple[bool, Optional[str], Optional[str]], Telemetry] = {}
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(config: dict) -> Telemetry:
+    """Return the process-wide telemetry instance for the 'telemetry' config section"""
+    telemetry_config = (config or {}).get('telemetry', {}) or {}
+    key = (telemetry_config.get('enabled', True), telemetry_config.get('otlp_endpoint'), telemetry_config.get('otlp_file'))
+    with _telemetry_lock:
+        telemetry = _telemetry.get(key)
+        if telemetry is None:
+            telemetry = Telemetry(config)
+            _telemetry[key] = telemetry
+        return telemetry
\ No newline at end of file
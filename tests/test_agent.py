@@ -0,0 +1,66 @@
+import asyncio
+import json
+import os
+import sys
+
+from openai.types.chat import ChatCompletionChunk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent import AsyncOpenRouterAgent, OpenRouterAgent  # noqa: E402
+
+
+def completion_chunks(prompt_tokens: int):
+    """A streamed answer that completes the task, with usage reported in a final choice-less chunk"""
+    base = {"id": "test", "object": "chat.completion.chunk", "created": 0, "model": "test"}
+    done = json.dumps({"task_summary": "done", "completion_message": "done"})
+    return [ChatCompletionChunk.model_validate(chunk) for chunk in (
+        {**base, "choices": [{"index": 0, "delta": {"content": "answer"}}]},
+        {**base, "choices": [{"index": 0, "delta": {"tool_calls": [{
+            "index": 0, "id": "call_0", "type": "function",
+            "function": {"name": "mark_task_complete", "arguments": done}
+        }]}}]},
+        {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]},
+        {**base, "choices": [], "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 2, "total_tokens": prompt_tokens + 2}},
+    )]
+
+
+def spy_usage(agent) -> list:
+    recorded = []
+    record_usage = agent.context.record_usage
+    
+    def record(messages, prompt_tokens):
+        recorded.append(prompt_tokens)
+        record_usage(messages, prompt_tokens)
+    agent.context.record_usage = record
+    return recorded
+
+
+def test_streamed_run_calibrates_the_token_counter():
+    agent = OpenRouterAgent(silent=True)
+    agent._create = lambda span, messages, **kwargs: iter(completion_chunks(5000))
+    recorded = spy_usage(agent)
+    
+    assert "".join(agent.run_stream("question")) == "answer"
+    assert recorded == [5000]
+    assert agent.context.calibration != 1.0
+
+
+def test_async_streamed_run_calibrates_the_token_counter():
+    agent = AsyncOpenRouterAgent(silent=True)
+    
+    async def create(span, messages, **kwargs):
+        async def stream():
+            for chunk in completion_chunks(5000):
+                yield chunk
+        return stream()
+    agent._create = create
+    recorded = spy_usage(agent)
+    
+    async def run():
+        return [token async for token in agent.run_stream("question")]
+    
+    assert "".join(asyncio.run(run())) == "answer"
+    assert recorded == [5000]
+    assert agent.context.calibration != 1.0
\ No newline at end of file
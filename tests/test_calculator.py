@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools import calculator_tool  # noqa: E402
+from tools.calculator_tool import CalculatorTool  # noqa: E402
+
+
+def calculate(expression, variables=None, **calculator):
+    return CalculatorTool({'calculator': calculator}).execute(expression, variables)
+
+
+def test_round_with_huge_ndigits_is_refused_at_once():
+    start = time.monotonic()
+    response = calculate("round(7, -10**7)")
+    
+    assert not response["success"]
+    assert "ndigits" in response["error"]
+    assert time.monotonic() - start < 0.5
+    assert calculate("round(1234, -2)")["result"] == 1200
+    assert calculate("round(x, 1)", {"x": [1.25, 2.75]})["result"] == [1.2, 2.8]
+
+
+def test_power_and_product_are_checked_before_computing():
+    start = time.monotonic()
+    assert "Exponent too large" in calculate("9**9**9")["error"]
+    assert "exceeds 64 bits" in calculate("2**40 * 2**40", max_int_bits=64)["error"]
+    assert time.monotonic() - start < 0.5
+
+
+def test_arrays_and_arguments_are_capped():
+    assert "exceeds 3 elements" in calculate("sum(x)", {"x": [1, 2, 3, 4]}, max_elements=3)["error"]
+    assert "Too many arguments" in calculate("max(1, 2, 3, 4)", max_elements=3)["error"]
+    assert "longer than 5 characters" in calculate("1 + 2 + 3", max_expression_chars=5)["error"]
+
+
+def test_time_budget_stops_evaluation():
+    response = calculate("sum(x * x * x * x)", {"x": list(range(100000))}, timeout=0.01)
+    
+    assert not response["success"]
+    assert "budget" in response["error"]
+
+
+def test_process_isolation_falls_back_to_inline_in_daemonic_processes(monkeypatch):
+    monkeypatch.setattr(calculator_tool.multiprocessing, "current_process",
+                        lambda: types.SimpleNamespace(daemon=True))
+    tool = CalculatorTool({'calculator': {'isolation': 'process'}})
+    
+    assert tool.isolation == 'inline'
+    assert tool.execute("2 + 3")["result"] == 5
\ No newline at end of file
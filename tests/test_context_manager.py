@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from context_manager import ContextManager, shrink_json_text  # noqa: E402
+
+
+def manager(**context) -> ContextManager:
+    return ContextManager({'agent': {'context': context}})
+
+
+def conversation(pages: int, page_chars: int = 20000) -> list:
+    """System and user messages, then one answered search per page, then an unanswered one"""
+    messages = [{"role": "system", "content": "system"}, {"role": "user", "content": "question"}]
+    for i in range(pages + 1):
+        messages.append({"role": "assistant", "content": None, "tool_calls": []})
+        messages.append({"role": "tool", "tool_call_id": f"call_{i}", "content": json.dumps(
+            [{"title": f"Result {i}", "url": f"https://example.com/{i}", "content": "text " * (page_chars // 5)}]
+        )})
+    return messages
+
+
+def test_answered_tool_outputs_are_shrunk_to_valid_json():
+    messages = conversation(3)
+    newest = messages[-1]["content"]
+    
+    manager(stale_tool_output_chars=500).compact(messages)
+    
+    for message in messages[3:-2:2]:
+        assert len(message["content"]) <= 500
+        assert json.loads(message["content"])[0]["url"].startswith("https://example.com/")
+    # The model has not seen the newest output yet
+    assert messages[-1]["content"] == newest
+    assert messages[:2] == conversation(0)[:2]
+
+
+def test_oldest_outputs_are_dropped_until_the_budget_fits():
+    context = manager(max_prompt_tokens=3000, stale_tool_output_chars=0)
+    messages = conversation(3, page_chars=4000)
+    
+    context.compact(messages)
+    
+    assert context.count_tokens(messages) <= 3000
+    assert "removed to fit the context budget" in messages[3]["content"]
+    assert "removed" not in messages[-1]["content"]
+
+
+def test_calibration_scales_the_estimate():
+    context = manager()
+    messages = conversation(0, page_chars=400)
+    estimate = context.count_tokens(messages)
+    
+    context.record_usage(messages, estimate * 2)
+    
+    assert context.count_tokens(messages) == estimate * 2
+
+
+def test_non_json_output_is_truncated():
+    shrunk = shrink_json_text("x" * 1000, 100)
+    
+    assert shrunk.startswith("x" * 100)
+    assert "truncated 900 chars" in shrunk
\ No newline at end of file
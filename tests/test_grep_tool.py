@@ -0,0 +1,82 @@
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools import grep_tool  # noqa: E402
+from tools.grep_tool import GrepTool  # noqa: E402
+
+
+class CancelAfter:
+    """Token that reports cancellation from its n-th check on"""
+    
+    def __init__(self, checks: int):
+        self.checks = checks
+    
+    @property
+    def cancelled(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+def grep(tmp_path, text: bytes, pattern: str, **config):
+    path = tmp_path / "data.txt"
+    path.write_bytes(text)
+    return GrepTool({'grep': config}).execute(pattern, str(path))
+
+
+def test_windowed_scan_matches_a_whole_file_scan(tmp_path, monkeypatch):
+    lines = [f"line {i} {'needle' if i % 3 == 0 else 'hay'}" for i in range(50)]
+    lines[10] = "needle in an overlong line " + "x" * 100 + " needle"
+    text = "\n".join(lines).encode()
+    expected = [(i + 1, line) for i, line in enumerate(lines) if "needle" in line]
+    
+    monkeypatch.setattr(grep_tool, "SCAN_WINDOW", 16)
+    result = grep(tmp_path, text, "needle$|^needle")
+    
+    found = [(m["line"], m["text"]) for m in result["matches"]]
+    assert found == [(n, line) for n, line in expected if line.endswith("needle") or line.startswith("needle")]
+    assert [(m["line"], m["text"]) for m in grep(tmp_path, text, "needle")["matches"]] == expected
+
+
+def test_newlines_are_counted_in_bounded_slices(monkeypatch):
+    monkeypatch.setattr(grep_tool, "SCAN_WINDOW", 4)
+    data = b"a\nb\n\nccccccccc\nd"
+    
+    assert grep_tool._count_newlines(data, 0, len(data)) == 4
+    assert grep_tool._count_newlines(data, 3, 14) == 2
+
+
+def test_scan_stops_between_windows_once_cancelled(monkeypatch):
+    monkeypatch.setattr(grep_tool, "SCAN_WINDOW", 8)
+    data = b"\n".join(b"x" for _ in range(1000))
+    tool = GrepTool({})
+    
+    matches = tool._matches("data", data, re.compile(b"nothing"), 0, 10, CancelAfter(2))
+    
+    assert matches == []
+    assert len(tool._matches("data", data, re.compile(b"x"), 0, 5000, CancelAfter(3))) <= 16
+
+
+def test_truncated_only_when_a_match_was_left_out(tmp_path):
+    text = b"hit\nmiss\nhit\nhit\n"
+    
+    assert grep(tmp_path, text, "hit", max_matches=3)["truncated"] is False
+    result = grep(tmp_path, text, "hit", max_matches=2)
+    assert result["truncated"] is True
+    assert len(result["matches"]) == 2
+
+
+def test_nested_quantifiers_are_rejected(tmp_path):
+    for pattern in ("(a+)+$", r"(\w+\s?)*$", "(a|b+)*c"):
+        assert "nested quantifiers" in grep(tmp_path, b"aaaa", pattern)["error"]
+    assert grep(tmp_path, b"aaaa", "(ab)+|a{2,}")["success"]
+
+
+def test_expired_search_returns_timed_out(tmp_path):
+    result = grep(tmp_path, b"hit\n" * 10, "hit", timeout=0)
+    
+    assert result["timed_out"] is True
+    assert result["truncated"] is True
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from html_extract import available_backends, extract_text  # noqa: E402
+
+PAGE = b"""<html><head><title>Title</title><style>p { color: red }</style></head><body>
+<header><a href="/">Home</a></header>
+<nav><ul><li>Menu entry</li></ul></nav>
+<main><h1>Article</h1>
+<p>First   paragraph
+ of the <b>article</b>.</p><script>var tracking = 1;</script>
+<aside>Related links</aside>
+<p>Second paragraph.</p></main>
+<footer>Copyright</footer>
+</body></html>"""
+
+
+def chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_main_content_without_page_chrome(backend):
+    text = extract_text(chunks(PAGE, 7), max_chars=1000, backend=backend)
+    
+    assert "Article First paragraph of the article. Second paragraph." in text
+    for boilerplate in ("Home", "Menu entry", "Related links", "Copyright", "tracking", "color"):
+        assert boilerplate not in text
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_text_is_clipped_to_max_chars(backend):
+    page = b"<p>" + b"word " * 10000 + b"</p>"
+    
+    text = extract_text(chunks(page, 100), max_chars=50, backend=backend)
+    
+    assert text == ("word " * 10)[:50] + "..."
\ No newline at end of file
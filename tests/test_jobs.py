@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jobs import JobStore, QueueFull  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def lose_worker(store, job_id):
+    """Age the job's heartbeat as if its worker had died"""
+    with store._lock:
+        store._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 3600, job_id))
+
+
+def test_claims_respect_order_and_tenant_limits(store):
+    first = store.submit("a", tenant="t1")
+    second = store.submit("b", tenant="t1")
+    other = store.submit("c", tenant="t2")
+    
+    assert store.claim("w1", 1, 30)["id"] == first
+    assert store.claim("w2", 1, 30)["id"] == other
+    assert store.claim("w3", 1, 30) is None
+    store.finish(first, "succeeded", result="done")
+    assert store.claim("w3", 1, 30)["id"] == second
+    with pytest.raises(QueueFull):
+        for _ in range(3):
+            store.submit("d", tenant="t3", max_active=2)
+
+
+def test_stale_job_is_reclaimed_as_a_new_attempt(store):
+    job_id = store.submit("a")
+    first = store.claim("w1", 1, 30)
+    store.add_event(job_id, "content", "old", attempt=first["attempt"])
+    
+    lose_worker(store, job_id)
+    second = store.claim("w2", 1, 30)
+    
+    assert (first["attempt"], second["attempt"]) == (1, 2)
+    # The first worker lost the job: its heartbeats, events and result no longer count
+    assert store.heartbeat(job_id, 1) is None
+    assert store.heartbeat(job_id, 2) == "running"
+    store.add_event(job_id, "content", "new", attempt=2)
+    assert [data for _, _, data in store.events_since(job_id)] == ["new"]
+    store.finish(job_id, "succeeded", result="stale", attempt=1)
+    assert store.get(job_id)["status"] == "running"
+    store.finish(job_id, "succeeded", result="fresh", attempt=2)
+    assert store.get(job_id)["result"] == "fresh"
+
+
+def test_job_fails_once_it_used_max_attempts(store):
+    job_id = store.submit("crashes its worker")
+    for attempt in (1, 2):
+        assert store.claim("w", 1, 30, max_attempts=2)["attempt"] == attempt
+        lose_worker(store, job_id)
+    
+    assert store.claim("w", 1, 30, max_attempts=2) is None
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert "max_attempts" in job["error"]
+    assert [event_type for _, event_type, _ in store.events_since(job_id)] == ["error"]
+
+
+def test_cancelled_job_stays_cancelled(store):
+    job_id = store.submit("a")
+    claimed = store.claim("w", 1, 30)
+    
+    assert store.cancel(job_id)
+    assert store.heartbeat(job_id, claimed["attempt"]) == "cancelled"
+    store.finish(job_id, "failed", error="stopped", attempt=claimed["attempt"])
+    assert store.get(job_id)["status"] == "cancelled"
\ No newline at end of file
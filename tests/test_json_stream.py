@@ -0,0 +1,36 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from json_stream import JsonStringArrayParser  # noqa: E402
+
+
+def feed_chunks(text: str, size: int) -> list:
+    parser = JsonStringArrayParser()
+    strings = []
+    for i in range(0, len(text), size):
+        strings.extend(parser.feed(text[i:i + size]))
+    assert parser.done
+    return strings
+
+
+def test_strings_are_returned_as_they_complete():
+    parser = JsonStringArrayParser()
+    
+    assert parser.feed('```json\n["first", "sec') == ["first"]
+    assert parser.feed('ond \\"quoted\\"", "third"]') == ['second "quoted"', "third"]
+    assert parser.done
+
+
+def test_brackets_in_the_preamble_do_not_open_the_array():
+    text = 'Here are [4] questions, see [ref]:\n[\n  "one",\n  "two"\n]'
+    
+    for size in (1, 3, len(text)):
+        assert feed_chunks(text, size) == ["one", "two"]
+
+
+def test_empty_and_nested_openings():
+    assert feed_chunks("Nothing to ask: [ ]", 2) == []
+    assert feed_chunks('[["a", "b"]]', 1) == ["a", "b"]
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+from openai.types.chat import ChatCompletionMessageToolCall
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent import AsyncOpenRouterAgent, OpenRouterAgent  # noqa: E402
+from llm_cache import LLMCache, LLMCacheMiss, get_llm_cache  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "question"}]
+ANSWER = {"role": "assistant", "content": "answer"}
+
+
+def cache(tmp_path, mode: str, **kwargs) -> LLMCache:
+    return LLMCache(str(tmp_path / "llm"), mode=mode, **kwargs)
+
+
+def test_record_then_replay(tmp_path):
+    recorder = cache(tmp_path, "record")
+    key = recorder.key("model", MESSAGES)
+    assert recorder.get(key) is None
+    recorder.put(key, "model", ANSWER, {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4})
+    
+    replayed = cache(tmp_path, "replay").get(key)
+    
+    assert replayed.choices[0].message.content == "answer"
+    assert replayed.usage.prompt_tokens == 3
+
+
+def test_replay_misses_fail_for_responses_and_tools(tmp_path):
+    replay = cache(tmp_path, "replay")
+    calls = []
+    
+    with pytest.raises(LLMCacheMiss):
+        replay.get(replay.key("model", MESSAGES))
+    with pytest.raises(LLMCacheMiss):
+        replay.run_tool("search_web", {"query": "q"}, lambda: calls.append(1))
+    assert calls == []
+
+
+def test_tool_results_are_recorded_and_replayed(tmp_path):
+    assert cache(tmp_path, "record").run_tool("search_web", {"query": "q"}, lambda: ["live"]) == ["live"]
+    
+    assert cache(tmp_path, "replay").run_tool("search_web", {"query": "q"}, lambda: ["again"]) == ["live"]
+
+
+def test_read_through_reuses_answers_within_ttl(tmp_path):
+    read_through = cache(tmp_path, "read_through", ttl=60)
+    key = read_through.key("model", MESSAGES)
+    assert read_through.get(key) is None
+    read_through.put(key, "model", ANSWER)
+    
+    assert read_through.get(key).choices[0].message.content == "answer"
+    # Another model or conversation is another request
+    assert read_through.key("other", MESSAGES) != key
+
+
+def test_off_and_unquoted_off_disable_the_cache(tmp_path):
+    for mode in ("off", False, None):
+        llm_cache = get_llm_cache({'llm_cache': {'mode': mode, 'path': str(tmp_path)}})
+        assert not llm_cache.enabled
+        assert llm_cache.key("model", MESSAGES) is None
+    with pytest.raises(ValueError):
+        LLMCache(str(tmp_path), mode="sometimes")
+
+def test_agent_tool_call_without_recording_fails_the_run(tmp_path):
+    tool_call = ChatCompletionMessageToolCall.model_validate({
+        "id": "call_0", "type": "function",
+        "function": {"name": "calculate", "arguments": '{"expression": "1 + 1"}'}
+    })
+    agent = OpenRouterAgent(silent=True)
+    agent.llm_cache = cache(tmp_path, "replay")
+    async_agent = AsyncOpenRouterAgent(silent=True)
+    async_agent.llm_cache = agent.llm_cache
+    
+    with pytest.raises(LLMCacheMiss):
+        agent.handle_tool_call(tool_call)
+    with pytest.raises(LLMCacheMiss):
+        asyncio.run(async_agent.handle_tool_call(tool_call))
+
+def test_fallback_answers_are_not_recorded(tmp_path):
+    agent = OpenRouterAgent(silent=True)
+    agent.llm_cache = cache(tmp_path, "record")
+    key = agent.llm_cache.key(agent.model, MESSAGES)
+    
+    agent._cache_answer(types.SimpleNamespace(attributes={"llm.fallback": True}), key, ANSWER, None)
+    assert cache(tmp_path, "read_through").get(key) is None
+    agent._cache_answer(types.SimpleNamespace(attributes={}), key, ANSWER, None)
+    assert cache(tmp_path, "read_through").get(key) is not None
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent import AsyncOpenRouterAgent, OpenRouterAgent  # noqa: E402
+from cancellation import CancellationToken  # noqa: E402
+from llm_cache import LLMCacheMiss  # noqa: E402
+from orchestrator import AsyncTaskOrchestrator, TaskOrchestrator  # noqa: E402
+
+
+def write_config(tmp_path, **orchestrator) -> str:
+    """The shipped config with orchestrator overrides and no disk caches"""
+    with open(os.path.join(ROOT, 'config.yaml'), 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['orchestrator'].update(orchestrator)
+    config['cache'] = {'enabled': False}
+    config['llm_cache'] = {'mode': 'off'}
+    config['telemetry'] = {'enabled': False}
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(config), encoding='utf-8')
+    return str(path)
+
+
+class SlowAgentOrchestrator(AsyncTaskOrchestrator):
+    """Agents that never answer, started after a decomposition that takes part of task_timeout"""
+    
+    async def iter_questions(self, user_input: str, num_agents: int):
+        await asyncio.sleep(0.2)
+        for i in range(num_agents):
+            yield f"question {i}"
+    
+    async def run_agent_parallel(self, agent_id: int, subtask: str, tool_callback=None):
+        await asyncio.sleep(60)
+    
+    async def aggregate_results(self, agent_results, content_callback=None) -> str:
+        return f"{len(agent_results)} results"
+
+
+def test_async_orchestrate_stops_waiting_at_task_timeout(tmp_path, monkeypatch):
+    # Each agent's own timeout ends 0.2s after the orchestration's: the collect loop must not spin meanwhile
+    config_path = write_config(tmp_path, parallel_agents=2, task_timeout=0.3, quorum={'min_agents': 2})
+    orchestrator = SlowAgentOrchestrator(config_path, silent=True)
+    
+    wakeups = 0
+    real_wait = asyncio.wait
+    
+    async def counting_wait(*args, **kwargs):
+        nonlocal wakeups
+        wakeups += 1
+        return await real_wait(*args, **kwargs)
+    
+    monkeypatch.setattr(asyncio, 'wait', counting_wait)
+    start = time.monotonic()
+    result = asyncio.run(orchestrator.orchestrate("query"))
+    
+    assert wakeups <= 3
+    assert result == "0 results"
+    assert time.monotonic() - start < 1
+    assert set(orchestrator.get_progress_status().values()) == {"CANCELLED"}
+
+def raise_miss(*args, **kwargs):
+    raise LLMCacheMiss("No recorded LLM response (llm_cache.mode: replay)")
+
+
+async def araise_miss(*args, **kwargs):
+    raise_miss()
+
+
+async def araise_miss_stream(*args, **kwargs):
+    raise_miss()
+    yield
+
+
+@pytest.fixture
+def replay_miss(monkeypatch):
+    """Every LLM call of every agent misses the recording"""
+    for name in ('call_llm', 'call_llm_stream', 'run'):
+        monkeypatch.setattr(OpenRouterAgent, name, raise_miss)
+    monkeypatch.setattr(AsyncOpenRouterAgent, 'call_llm', araise_miss)
+    monkeypatch.setattr(AsyncOpenRouterAgent, 'call_llm_stream', araise_miss_stream)
+    monkeypatch.setattr(AsyncOpenRouterAgent, 'run', araise_miss)
+
+
+def test_replay_miss_fails_every_phase(tmp_path, replay_miss):
+    orchestrator = TaskOrchestrator(write_config(tmp_path, parallel_agents=2), silent=True)
+    results = [{"agent_id": i, "status": "success", "response": f"answer {i}"} for i in range(2)]
+    
+    for phase in (
+        lambda: orchestrator.orchestrate("query"),
+        lambda: orchestrator.decompose_task("query", 2),
+        lambda: orchestrator.run_agent_parallel(0, "question"),
+        lambda: orchestrator._summarize("question", "answer", CancellationToken()),
+        lambda: orchestrator._aggregate_hierarchical(results),
+        lambda: orchestrator._aggregate_consensus(["a", "b"], results),
+    ):
+        with pytest.raises(LLMCacheMiss):
+            phase()
+
+
+def test_async_replay_miss_fails_every_phase(tmp_path, replay_miss):
+    orchestrator = AsyncTaskOrchestrator(write_config(tmp_path, parallel_agents=2), silent=True)
+    results = [{"agent_id": i, "status": "success", "response": f"answer {i}"} for i in range(2)]
+    
+    for phase in (
+        lambda: orchestrator.orchestrate("query"),
+        lambda: orchestrator.decompose_task("query", 2),
+        lambda: orchestrator.run_agent_parallel(0, "question"),
+        lambda: orchestrator._summarize("question", "answer", CancellationToken()),
+        lambda: orchestrator._aggregate_hierarchical(results),
+        lambda: orchestrator._aggregate_consensus(["a", "b"], results),
+    ):
+        with pytest.raises(LLMCacheMiss):
+            asyncio.run(phase())
+
+
+class AgentMissOrchestrator(TaskOrchestrator):
+    """Decomposition works, the agents' calls miss the recording"""
+    
+    def iter_questions(self, user_input: str, num_agents: int):
+        yield from (f"question {i}" for i in range(num_agents))
+
+
+def test_replay_miss_in_an_agent_fails_the_orchestration(tmp_path, replay_miss):
+    orchestrator = AgentMissOrchestrator(write_config(tmp_path, parallel_agents=2), silent=True)
+    
+    with pytest.raises(LLMCacheMiss):
+        orchestrator.orchestrate("query")
\ No newline at end of file
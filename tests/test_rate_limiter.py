@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rate_limiter import CircuitOpenError, RateLimiter  # noqa: E402
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(headers=headers or {})
+
+
+def limiter(**rate_limit) -> RateLimiter:
+    return RateLimiter({'rate_limit': dict({'backoff_base': 0.01, 'backoff_max': 0.02}, **rate_limit)})
+
+
+def failing(*errors):
+    """A request failing with errors in turn, then answering "ok"; calls counts the attempts"""
+    calls = []
+    
+    def request():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return request, calls
+
+
+def test_transient_failures_are_retried():
+    request, calls = failing(StatusError(503), StatusError(502))
+    
+    assert limiter().call(request) == "ok"
+    assert len(calls) == 3
+
+
+def test_rejected_requests_are_not_retried():
+    request, calls = failing(StatusError(400))
+    
+    with pytest.raises(StatusError):
+        limiter().call(request)
+    assert len(calls) == 1
+
+
+def test_rate_limit_answers_slow_down_and_honour_retry_after():
+    rate_limiter = limiter()
+    request, calls = failing(StatusError(429, {'retry-after-ms': '200'}))
+    
+    start = time.monotonic()
+    assert rate_limiter.call(request) == "ok"
+    
+    assert time.monotonic() - start >= 0.2
+    assert rate_limiter.rate_scale < 1.0
+
+
+def test_request_budget_spaces_calls_out():
+    rate_limiter = limiter(requests_per_minute=600)
+    for _ in range(600):
+        rate_limiter._reserve(0)
+    
+    # The bucket is empty: the next request waits for one refill (60s / 600)
+    assert rate_limiter._reserve(0) == pytest.approx(0.1, abs=0.01)
+
+
+def test_circuit_opens_after_consecutive_failures():
+    rate_limiter = limiter(max_retries=0, circuit_breaker={'failure_threshold': 2, 'reset_timeout': 60})
+    request, calls = failing(*[StatusError(500)] * 10)
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            rate_limiter.call(request)
+    
+    with pytest.raises(CircuitOpenError):
+        rate_limiter.call(request)
+    assert len(calls) == 2
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.read_file_tool import ReadFileTool  # noqa: E402
+
+TEXT = "".join(f"ligne {i}: café, naïve, 日本語\n" for i in range(200))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    return str(path)
+
+
+def read(path, max_output_bytes=100, **kwargs):
+    return ReadFileTool({'read_file': {'max_output_bytes': max_output_bytes}}).execute(path, **kwargs)
+
+
+def test_pages_cover_the_file_exactly(path):
+    pages = []
+    result = read(path)
+    while True:
+        assert len(result["content"].encode("utf-8")) <= 100
+        pages.append(result["content"])
+        if "next_offset" not in result:
+            break
+        result = read(path, offset=result["next_offset"])
+    
+    assert "".join(pages) == TEXT
+
+
+def test_offsets_inside_a_character_move_to_the_next_one(tmp_path):
+    path = tmp_path / "accents.txt"
+    path.write_bytes("é".encode("utf-8") * 100)
+    
+    for offset in range(0, 8):
+        result = read(str(path), max_output_bytes=11, offset=offset)
+        assert set(result["content"]) == {"é"}
+        assert len(result["content"].encode("utf-8")) <= 11
+
+
+def test_head_tail_and_line_ranges(path):
+    lines = TEXT.splitlines()
+    
+    assert read(path, max_output_bytes=65536, head=2)["content"] == "\n".join(lines[:2])
+    assert read(path, max_output_bytes=65536, tail=3)["content"] == "\n".join(lines[-3:])
+    result = read(path, max_output_bytes=65536, start_line=10, end_line=12)
+    assert result["content"] == "\n".join(lines[9:12])
+    assert result["total_lines"] == 200
+
+
+def test_truncated_tail_stays_within_the_budget(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_bytes("日本語".encode("utf-8") * 100)
+    
+    result = read(str(path), max_output_bytes=10, tail=1)
+    
+    assert result["truncated"]
+    assert len(result["content"].encode("utf-8")) <= 10
+    assert set(result["content"]) <= set("日本語")
+
+
+def test_invalid_parameter_combinations(path):
+    assert "Cannot combine" in read(path, head=1, tail=1)["error"]
+    assert "must not be negative" in read(path, offset=-1)["error"]
\ No newline at end of file
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools import search_tool  # noqa: E402
+from tools.search_tool import SearchTool  # noqa: E402
+
+RESULTS = [{"title": f"Result {i}", "href": f"https://example.com/{i}", "body": f"snippet {i}"} for i in range(3)]
+
+
+def make_tool(monkeypatch, handler, **search):
+    """SearchTool with canned results whose pages are served by handler on an async mock transport"""
+    tool = SearchTool({'cache': {'enabled': False}, 'search': dict({'html_parser': 'html.parser'}, **search)})
+    monkeypatch.setattr(tool, "_search", lambda query, max_results: RESULTS[:max_results])
+    monkeypatch.setattr(search_tool, "get_async_http_client",
+                        lambda config: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return tool
+
+
+def guarded(run_in_executor):
+    def run(executor, *args):
+        assert executor is not None, "blocking work sent to the default executor"
+        return run_in_executor(executor, *args)
+    return run
+
+
+def test_aexecute_fetches_pages_on_the_event_loop(monkeypatch):
+    requests = []
+    
+    async def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, html=f"<html><body><p>Page {request.url.path}</p></body></html>")
+    tool = make_tool(monkeypatch, handler)
+    
+    async def run():
+        loop = asyncio.get_running_loop()
+        # Nothing may be offloaded to the loop's default executor
+        monkeypatch.setattr(loop, "run_in_executor", guarded(loop.run_in_executor))
+        return await tool.aexecute("query", max_results=3)
+    
+    results = asyncio.run(run())
+    
+    assert [r["content"] for r in results] == ["Page /0", "Page /1", "Page /2"]
+    assert sorted(requests) == [r["href"] for r in RESULTS]
+
+
+def test_slow_and_failed_pages_degrade(monkeypatch):
+    async def handler(request):
+        if request.url.path == "/1":
+            await asyncio.sleep(5)
+        if request.url.path == "/2":
+            return httpx.Response(500)
+        return httpx.Response(200, html="<p>fast</p>")
+    tool = make_tool(monkeypatch, handler, fetch_deadline=0.2)
+    
+    results = asyncio.run(tool.aexecute("query", max_results=3))
+    
+    assert results[0]["content"] == "fast"
+    assert results[1]["content"] == "snippet 1"
+    assert results[2]["content"].startswith("Could not fetch content")
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cancellation import CancellationToken, use_token  # noqa: E402
+from tools import write_file_tool  # noqa: E402
+from tools.write_file_tool import WriteFileTool  # noqa: E402
+
+
+def staging_files(directory) -> list:
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+def test_concurrent_appends_never_interleave(tmp_path):
+    path = str(tmp_path / "log.txt")
+    tool = WriteFileTool({})
+    
+    def writer(n):
+        for _ in range(50):
+            tool.execute(path, f"{n}" * 100 + "\n", mode="append")
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 400
+    assert all(len(set(line)) == 1 and len(line) == 100 for line in lines)
+    assert write_file_tool._path_locks == {}
+
+
+def test_chunked_write_appears_only_when_complete(tmp_path):
+    path = str(tmp_path / "big.txt")
+    tool = WriteFileTool({})
+    
+    first = tool.execute(path, "one ", mode="chunk", chunk_index=0)
+    upload_id = first["upload_id"]
+    assert not os.path.exists(path)
+    assert "Expected chunk_index 1" in tool.execute(path, "x", mode="chunk", chunk_index=2, upload_id=upload_id)["error"]
+    assert "upload_id" in tool.execute(path, "x", mode="chunk", chunk_index=1)["error"]
+    tool.execute(path, "two ", mode="chunk", chunk_index=1, upload_id=upload_id)
+    tool.execute(path, "three", mode="chunk", chunk_index=2, upload_id=upload_id, final=True)
+    
+    with open(path) as f:
+        assert f.read() == "one two three"
+    assert staging_files(tmp_path) == []
+
+
+def test_parallel_uploads_of_one_path_stay_separate(tmp_path):
+    path = str(tmp_path / "shared.txt")
+    tool = WriteFileTool({})
+    
+    a = tool.execute(path, "a1", mode="chunk", chunk_index=0)["upload_id"]
+    b = tool.execute(path, "b1", mode="chunk", chunk_index=0)["upload_id"]
+    tool.execute(path, "b2", mode="chunk", chunk_index=1, upload_id=b, final=True)
+    with open(path) as f:
+        assert f.read() == "b1b2"
+    tool.execute(path, "a2", mode="chunk", chunk_index=1, upload_id=a, final=True)
+    with open(path) as f:
+        assert f.read() == "a1a2"
+
+
+def test_uploads_of_cancelled_agents_are_swept(tmp_path):
+    token = CancellationToken()
+    with use_token(token):
+        abandoned = WriteFileTool({}).execute(str(tmp_path / "a.txt"), "partial", mode="chunk", chunk_index=0)
+    token.cancel("agent stopped")
+    
+    WriteFileTool({}).execute(str(tmp_path / "b.txt"), "x", mode="chunk", chunk_index=0)
+    
+    assert abandoned["upload_id"] not in write_file_tool._uploads
+    assert [name.startswith(".b.txt.") for name in staging_files(tmp_path)] == [True]
+
+
+def test_idle_uploads_are_swept(tmp_path):
+    idle = WriteFileTool({}).execute(str(tmp_path / "a.txt"), "partial", mode="chunk", chunk_index=0)
+    
+    WriteFileTool({'write_file': {'upload_ttl': 0}}).execute(str(tmp_path / "b.txt"), "x", mode="chunk", chunk_index=0)
+    
+    assert idle["upload_id"] not in write_file_tool._uploads
+    assert [name.startswith(".b.txt.") for name in staging_files(tmp_path)] == [True]
\ No newline at end of file
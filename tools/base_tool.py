@@ -1,9 +1,16 @@
+import asyncio
+import contextvars
+import functools
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List
 
 class BaseTool(ABC):
     """Base class for all tools"""
     
+    # Tools that change external state (files, ...) set this to True: the agent never runs
+    # them concurrently with other tool calls from the same turn
+    side_effecting = False
+    
     @property
     @abstractmethod
     def name(self) -> str:
@@ -27,6 +34,13 @@ class BaseTool(ABC):
         """Execute the tool with given parameters"""
         pass
     
+    async def aexecute(self, **kwargs) -> Any:
+        """Execute the tool from async code; blocking tools run in the loop's default executor"""
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so the agent's cancellation token follows the call
+        call = functools.partial(self.execute, **kwargs)
+        return await loop.run_in_executor(None, contextvars.copy_context().run, call)
+    
     def to_openrouter_schema(self) -> Dict[str, Any]:
         """Convert tool to OpenRouter function schema"""
         return {
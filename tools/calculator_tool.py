@@ -1,40 +1,369 @@
 from .base_tool import BaseTool
+from cancellation import current_token
+from typing import NamedTuple, Optional
+import functools
 import math
 import ast
+import multiprocessing
 import operator
+import statistics
+import threading
+import time
+
+# Expressions are validated once and compiled into nested closures, cached per expression
+# string, so evaluating them again costs one function call per node instead of a parse and
+# an AST walk. Arithmetic and math functions broadcast over lists NumPy-style: binding a
+# variable to an array evaluates the expression for a whole column in one call.
+#
+# Evaluation is resource-bounded: integer sizes are checked before multiplying or raising
+# to a power (9**9**9 fails at once instead of pinning a core), arrays and argument lists
+# are capped, and a wall-clock budget is checked between operations. With isolation
+# "process" expressions run in worker processes that are killed when they overrun.
+
+
+class Limits(NamedTuple):
+    """Resource limits compiled into an expression"""
+    max_int_bits: int = 4096
+    max_elements: int = 100000
+
+
+def _broadcast(func, *args):
+    """Apply func element-wise when any argument is a list; scalars are repeated"""
+    lengths = {len(arg) for arg in args if isinstance(arg, list)}
+    if not lengths:
+        return func(*args)
+    if len(lengths) > 1:
+        raise ValueError(f"Arrays of different lengths: {sorted(lengths)}")
+    return [_broadcast(func, *(arg[i] if isinstance(arg, list) else arg for arg in args))
+            for i in range(lengths.pop())]
+
+
+def _values(args) -> list:
+    """Numbers passed either as one array or as separate arguments"""
+    if len(args) == 1 and isinstance(args[0], list):
+        return args[0]
+    return list(args)
+
+
+def _aggregate(func):
+    return lambda *args: func(_values(args))
+
+
+def _percentile(values, q):
+    """q-th percentile (0-100) with linear interpolation between closest ranks"""
+    data = sorted(_values([values]))
+    if not data:
+        raise ValueError("percentile of an empty array")
+    if not 0 <= q <= 100:
+        raise ValueError("percentile q must be between 0 and 100")
+    rank = (len(data) - 1) * q / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(data) - 1)
+    return data[lower] + (data[upper] - data[lower]) * (rank - lower)
+
+
+# round(x, -n) builds 10**n internally: one call with a huge n runs unbounded between ticks
+MAX_NDIGITS = 1000
+
+
+def _round(number, ndigits=None):
+    if isinstance(ndigits, int) and abs(ndigits) > MAX_NDIGITS:
+        raise ValueError(f"round() ndigits must be between -{MAX_NDIGITS} and {MAX_NDIGITS}")
+    return round(number, ndigits)
+
+
+def _int_bits(value) -> int:
+    return value.bit_length() if isinstance(value, int) else 0
+
+
+def _bounded(op, limits: Limits):
+    """Wrap an arithmetic operator so oversized integer results are refused before computing"""
+    def check(result):
+        if _int_bits(result) > limits.max_int_bits:
+            raise ValueError(f"Integer result exceeds {limits.max_int_bits} bits")
+        return result
+    
+    if op is operator.pow:
+        def power(base, exponent):
+            # |base| ** exponent needs at least (bits(base) - 1) * exponent bits
+            if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1 \
+                    and (base.bit_length() - 1) * exponent > limits.max_int_bits:
+                raise ValueError(f"Exponent too large: result would exceed {limits.max_int_bits} bits")
+            return check(base ** exponent)
+        return power
+    if op is operator.mul:
+        def multiply(left, right):
+            if _int_bits(left) + _int_bits(right) > limits.max_int_bits + 1:
+                raise ValueError(f"Integer result exceeds {limits.max_int_bits} bits")
+            return check(left * right)
+        return multiply
+    return lambda *args: check(op(*args))
+
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Mod: operator.mod,
+}
+
+CONSTANTS = {
+    'pi': math.pi,
+    'e': math.e,
+}
+
+FUNCTIONS = {
+    # Element-wise on arrays
+    'abs': functools.partial(_broadcast, abs),
+    'round': functools.partial(_broadcast, _round),
+    'sqrt': functools.partial(_broadcast, math.sqrt),
+    'sin': functools.partial(_broadcast, math.sin),
+    'cos': functools.partial(_broadcast, math.cos),
+    'tan': functools.partial(_broadcast, math.tan),
+    'log': functools.partial(_broadcast, math.log),
+    'log10': functools.partial(_broadcast, math.log10),
+    'exp': functools.partial(_broadcast, math.exp),
+    # Aggregates: one array or several numbers
+    'max': _aggregate(max),
+    'min': _aggregate(min),
+    'sum': _aggregate(sum),
+    'count': _aggregate(len),
+    'mean': _aggregate(statistics.fmean),
+    'median': _aggregate(statistics.median),
+    'stdev': _aggregate(statistics.stdev),
+    'variance': _aggregate(statistics.variance),
+    'percentile': _percentile,
+}
+
+
+class _Evaluation:
+    """Variable bindings and the wall-clock budget of one evaluation"""
+    
+    def __init__(self, variables: dict, timeout: Optional[float] = None, token=None):
+        self.variables = variables
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.token = token
+    
+    def tick(self):
+        """Called before every operation: stop once the budget is spent or the agent was cancelled"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError(f"Evaluation exceeded its {self.timeout:g}s budget")
+        if self.token is not None:
+            self.token.raise_if_cancelled()
+
+
+def _compile_node(node, limits: Limits):
+    """Validate an AST node and return a closure evaluating it in an _Evaluation"""
+    if isinstance(node, ast.Constant):  # Numbers
+        value = node.value
+        if not isinstance(value, (int, float, complex)):
+            raise ValueError(f"Unsupported constant: {value!r}")
+        if _int_bits(value) > limits.max_int_bits:
+            raise ValueError(f"Integer constant exceeds {limits.max_int_bits} bits")
+        return lambda ev: value
+    elif isinstance(node, ast.Name):  # Variables/constants
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda ev: value
+        if name in FUNCTIONS:
+            raise ValueError(f"Function {name} must be called")
+        
+        def variable(ev):
+            try:
+                return ev.variables[name]
+            except KeyError:
+                raise ValueError(f"Unknown variable: {name}")
+        return variable
+    elif isinstance(node, ast.BinOp):  # Binary operations
+        if type(node.op) not in OPERATORS:
+            raise ValueError(f"Unsupported operation: {type(node.op)}")
+        op = _bounded(OPERATORS[type(node.op)], limits)
+        left = _compile_node(node.left, limits)
+        right = _compile_node(node.right, limits)
+        
+        def binary(ev):
+            a, b = left(ev), right(ev)
+            ev.tick()
+            return _broadcast(op, a, b)
+        return binary
+    elif isinstance(node, ast.UnaryOp):  # Unary operations
+        if type(node.op) not in OPERATORS:
+            raise ValueError(f"Unsupported unary operation: {type(node.op)}")
+        op = OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand, limits)
+        return lambda ev: _broadcast(op, operand(ev))
+    elif isinstance(node, ast.Call):  # Function calls
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError(f"Unknown function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise ValueError("Keyword arguments are not supported")
+        if len(node.args) > limits.max_elements:
+            raise ValueError(f"Too many arguments (limit {limits.max_elements})")
+        func = FUNCTIONS[node.func.id]
+        args = [_compile_node(arg, limits) for arg in node.args]
+        
+        def call(ev):
+            values = [arg(ev) for arg in args]
+            ev.tick()
+            return func(*values)
+        return call
+    elif isinstance(node, (ast.List, ast.Tuple)):  # Array literals
+        if len(node.elts) > limits.max_elements:
+            raise ValueError(f"Array exceeds {limits.max_elements} elements")
+        items = [_compile_node(item, limits) for item in node.elts]
+        return lambda ev: [item(ev) for item in items]
+    else:
+        raise ValueError(f"Unsupported node type: {type(node)}")
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(expression: str, limits: Limits = Limits()):
+    """Parse, validate and compile an expression once; the result takes an _Evaluation"""
+    return _compile_node(ast.parse(expression, mode='eval').body, limits)
+
+
+def _check_variables(variables: dict, limits: Limits):
+    for name, value in variables.items():
+        if not name.isidentifier():
+            raise ValueError(f"Invalid variable name: {name}")
+        # Built-in names win inside expressions, so a variable called e or sum would be ignored
+        if name in CONSTANTS or name in FUNCTIONS:
+            raise ValueError(f"Variable name {name} is reserved for a built-in constant or function; rename it")
+        values = value if isinstance(value, list) else [value]
+        if len(values) > limits.max_elements:
+            raise ValueError(f"Variable {name} exceeds {limits.max_elements} elements")
+        if not all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in values):
+            raise ValueError(f"Variable {name} must be a number or an array of numbers")
+        if any(_int_bits(item) > limits.max_int_bits for item in values):
+            raise ValueError(f"Variable {name} exceeds {limits.max_int_bits} bits")
+
+
+def evaluate(expression: str, variables: dict, limits: Limits = Limits(), timeout: Optional[float] = None,
+             token=None):
+    """Compile (cached) and evaluate an expression within its limits and time budget"""
+    compiled = compile_expression(expression, limits)
+    _check_variables(variables, limits)
+    return compiled(_Evaluation(variables, timeout, token))
+
+
+def _worker_main(conn):
+    """Entry point of a calculator worker process: evaluate requests until the pipe closes"""
+    while True:
+        try:
+            expression, variables, limits, timeout = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, evaluate(expression, variables, limits, timeout))
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name="calculator-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class EvaluationPool:
+    """Reusable calculator worker processes; a worker that overruns its budget is killed and replaced"""
+    
+    # Time granted on top of the budget (pipe transfer, the worker's own timeout) before killing it
+    GRACE = 0.5
+    
+    def __init__(self, processes: int = 2):
+        # Spawned (not forked) so workers never inherit the agents' threads and sockets
+        self.context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(processes)
+        self._idle = []
+        self._lock = threading.Lock()
+    
+    def evaluate(self, expression: str, variables: dict, limits: Limits, timeout: Optional[float] = None,
+                 token=None):
+        with self._slots:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self.context)
+            try:
+                worker.conn.send((expression, variables, limits, timeout))
+                ok, value = self._wait(worker, timeout, token)
+            except BaseException:
+                # Overrun, cancelled or broken: the worker may still be computing, never reuse it
+                worker.kill()
+                raise
+            with self._lock:
+                self._idle.append(worker)
+        if not ok:
+            raise ValueError(value)
+        return value
+    
+    def _wait(self, worker: _Worker, timeout: Optional[float], token=None):
+        deadline = time.monotonic() + timeout + self.GRACE if timeout is not None else None
+        # Poll in short slices so a cancelled agent does not wait for the whole budget
+        while not worker.conn.poll(0.1 if deadline is None else min(0.1, max(deadline - time.monotonic(), 0))):
+            if token is not None:
+                token.raise_if_cancelled()
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Evaluation exceeded its {timeout:g}s budget")
+        return worker.conn.recv()
+    
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+
+# One worker pool per process, shared by every agent's calculator
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(processes: int) -> EvaluationPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EvaluationPool(processes)
+        return _pool
+
 
 class CalculatorTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
-        # Safe operators for evaluation
-        self.safe_operators = {
-            ast.Add: operator.add,
-            ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
-            ast.Div: operator.truediv,
-            ast.Pow: operator.pow,
-            ast.USub: operator.neg,
-            ast.UAdd: operator.pos,
-            ast.Mod: operator.mod,
-        }
+        calculator_config = config.get('calculator', {}) or {}
         
-        # Safe functions
-        self.safe_functions = {
-            'abs': abs,
-            'round': round,
-            'max': max,
-            'min': min,
-            'sum': sum,
-            'sqrt': math.sqrt,
-            'sin': math.sin,
-            'cos': math.cos,
-            'tan': math.tan,
-            'log': math.log,
-            'log10': math.log10,
-            'exp': math.exp,
-            'pi': math.pi,
-            'e': math.e,
-        }
+        # Checked before evaluating: expression length, integer size, array length / argument count
+        self.max_expression_chars = calculator_config.get('max_expression_chars', 2000)
+        self.limits = Limits(
+            max_int_bits=calculator_config.get('max_int_bits', 4096),
+            max_elements=calculator_config.get('max_elements', 100000)
+        )
+        
+        # Wall-clock budget per evaluation in seconds (None = unlimited)
+        self.timeout = calculator_config.get('timeout', 2.0)
+        
+        # "inline" evaluates in the agent's thread; "process" in killable worker processes
+        self.isolation = calculator_config.get('isolation', 'inline')
+        if self.isolation == 'process' and multiprocessing.current_process().daemon:
+            # Daemonic processes (the job workers) may not start children
+            print("Warning: calculator isolation 'process' is unavailable in a daemonic process, evaluating inline")
+            self.isolation = 'inline'
+        self.processes = calculator_config.get('processes', 2)
     
     @property
     def name(self) -> str:
@@ -42,7 +371,9 @@ class CalculatorTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Perform mathematical calculations and evaluations"
+        return ("Perform mathematical calculations and evaluations. Bind variables to arrays to compute a "
+                "whole column in one call (element-wise, e.g. 'price * qty' with price=[...], qty=[...]) "
+                "and use aggregates: mean, median, stdev, variance, percentile(x, q), sum, min, max, count.")
     
     @property
     def parameters(self) -> dict:
@@ -51,55 +382,47 @@ class CalculatorTool(BaseTool):
             "properties": {
                 "expression": {
                     "type": "string",
-                    "description": "Mathematical expression to evaluate (e.g., '2 + 3 * 4', 'sqrt(16)', 'sin(pi/2)')"
+                    "description": "Mathematical expression to evaluate (e.g., '2 + 3 * 4', 'sqrt(16)', 'sin(pi/2)', 'mean(x)')"
+                },
+                "variables": {
+                    "type": "object",
+                    "description": "Values of the names used in the expression: numbers or arrays of numbers",
+                    "additionalProperties": {
+                        "anyOf": [
+                            {"type": "number"},
+                            {"type": "array", "items": {"type": "number"}}
+                        ]
+                    }
                 }
             },
             "required": ["expression"]
         }
     
-    def _safe_eval(self, node):
-        """Safely evaluate an AST node"""
-        if isinstance(node, ast.Constant):  # Numbers
-            return node.value
-        elif isinstance(node, ast.Name):  # Variables/constants
-            if node.id in self.safe_functions:
-                return self.safe_functions[node.id]
-            else:
-                raise ValueError(f"Unknown variable: {node.id}")
-        elif isinstance(node, ast.BinOp):  # Binary operations
-            left = self._safe_eval(node.left)
-            right = self._safe_eval(node.right)
-            if type(node.op) in self.safe_operators:
-                return self.safe_operators[type(node.op)](left, right)
-            else:
-                raise ValueError(f"Unsupported operation: {type(node.op)}")
-        elif isinstance(node, ast.UnaryOp):  # Unary operations
-            operand = self._safe_eval(node.operand)
-            if type(node.op) in self.safe_operators:
-                return self.safe_operators[type(node.op)](operand)
-            else:
-                raise ValueError(f"Unsupported unary operation: {type(node.op)}")
-        elif isinstance(node, ast.Call):  # Function calls
-            func = self._safe_eval(node.func)
-            args = [self._safe_eval(arg) for arg in node.args]
-            return func(*args)
-        else:
-            raise ValueError(f"Unsupported node type: {type(node)}")
-    
-    def execute(self, expression: str) -> dict:
+    def execute(self, expression: str, variables: dict = None) -> dict:
         """Execute mathematical calculation"""
         try:
-            # Parse the expression
-            tree = ast.parse(expression, mode='eval')
+            if len(expression) > self.max_expression_chars:
+                raise ValueError(f"Expression longer than {self.max_expression_chars} characters")
+            variables = variables or {}
             
-            # Evaluate safely
-            result = self._safe_eval(tree.body)
+            # The budget never outlives the calling agent's own deadline
+            token = current_token()
+            timeout = token.bound(self.timeout) if token is not None else self.timeout
             
-            return {
+            if self.isolation == 'process':
+                result = _get_pool(self.processes).evaluate(expression, variables, self.limits, timeout, token)
+            else:
+                # Parse and validate once per distinct expression
+                result = evaluate(expression, variables, self.limits, timeout, token)
+            
+            response = {
                 "expression": expression,
                 "result": result,
                 "success": True
             }
+            if isinstance(result, list):
+                response["count"] = len(result)
+            return response
         
         except Exception as e:
             return {
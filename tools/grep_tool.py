@@ -0,0 +1,301 @@
+from .base_tool import BaseTool
+from cancellation import CancellationToken, current_token, check_cancelled
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import fnmatch
+import functools
+import mmap
+import os
+import re
+import threading
+
+try:
+    from re import _parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+
+# Directories never worth scanning for an agent
+SKIPPED_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', '.cache'}
+
+# Files are scanned in windows of whole lines so the search deadline is checked between them:
+# a running regex search cannot be interrupted, and a timed-out scan must not hold its pool slot
+SCAN_WINDOW = 4 * 1024 * 1024
+
+# One scan pool per process, shared by every GrepTool instance (config reloads create new ones)
+_scan_pool = None
+_scan_pool_lock = threading.Lock()
+
+
+def _get_scan_pool(workers: int) -> ThreadPoolExecutor:
+    global _scan_pool
+    with _scan_pool_lock:
+        if _scan_pool is None:
+            # Files are scanned in parallel threads, so opening, mapping and paging in files overlap
+            _scan_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grep-scan")
+        return _scan_pool
+
+
+def _subpatterns(value):
+    """Parsed sub-patterns found in the argument of a regex opcode"""
+    if isinstance(value, _sre_parse.SubPattern):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _subpatterns(item)
+
+
+def _nested_quantifier(parsed, in_unbounded_repeat: bool = False) -> bool:
+    r"""Whether a repetition sits inside an unbounded one, as in (a+)+ or (\w+\s?)*: exponential backtracking"""
+    for op, value in parsed:
+        if op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT):
+            _, high, body = value
+            if in_unbounded_repeat and high > 1:
+                return True
+            if _nested_quantifier(body, in_unbounded_repeat or high == _sre_parse.MAXREPEAT):
+                return True
+        else:
+            # Possessive repeats and atomic groups never backtrack into their body
+            inside = in_unbounded_repeat and op not in (getattr(_sre_parse, 'POSSESSIVE_REPEAT', None),
+                                                        getattr(_sre_parse, 'ATOMIC_GROUP', None))
+            if any(_nested_quantifier(sub, inside) for sub in _subpatterns(value)):
+                return True
+    return False
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(pattern: str, ignore_case: bool):
+    """Byte regex for scanning mapped files; ^ and $ match at line boundaries"""
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    if _nested_quantifier(_sre_parse.parse(pattern, flags)):
+        raise re.error("nested quantifiers such as (a+)+ can take exponential time; repeat a single token instead")
+    return re.compile(pattern.encode('utf-8'), flags)
+
+
+def _line_bounds(mm, position: int):
+    """Start and end (without the newline) of the line containing position"""
+    start = mm.rfind(b"\n", 0, position) + 1
+    end = mm.find(b"\n", position)
+    return start, len(mm) if end < 0 else end
+
+
+def _window(mm, position: int):
+    """End of the scan window starting at position and where the next one starts: the window ends
+    at the newline of the line crossing SCAN_WINDOW, or is cut there if that line is longer than a window"""
+    limit = position + SCAN_WINDOW
+    if limit >= len(mm):
+        return len(mm), len(mm)
+    end = mm.find(b"\n", limit, limit + SCAN_WINDOW)
+    return (limit, limit) if end < 0 else (end, end + 1)
+
+
+def _count_newlines(mm, start: int, end: int) -> int:
+    """Newlines in mm[start:end], counted slice by slice instead of copying the whole range"""
+    return sum(mm[position:min(position + SCAN_WINDOW, end)].count(b"\n")
+               for position in range(start, end, SCAN_WINDOW))
+
+
+class GrepTool(BaseTool):
+    def __init__(self, config: dict):
+        self.config = config
+        grep_config = config.get('grep', {}) or {}
+        
+        # Matches returned per call, characters kept per line, files scanned at most per call
+        self.max_matches = grep_config.get('max_matches', 100)
+        self.max_line_chars = grep_config.get('max_line_chars', 500)
+        self.max_files = grep_config.get('max_files', 10000)
+        
+        # Seconds one search may take (bounded by the agent's own deadline); slower scans return what they found
+        self.timeout = grep_config.get('timeout', 10)
+        self._scan_pool = _get_scan_pool(grep_config.get('workers', 8))
+    
+    @property
+    def name(self) -> str:
+        return "grep_files"
+    
+    @property
+    def description(self) -> str:
+        return ("Search a file or a directory tree for a regular expression and return only the matching "
+                "lines, with line numbers, byte offsets and optional context lines. Much cheaper than "
+                "reading whole files: use it to locate text, then read_file with start_line or offset.")
+    
+    @property
+    def parameters(self) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "pattern": {
+                    "type": "string",
+                    "description": "Regular expression to search for (Python syntax, matched per line)"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "File or directory to search (directories are searched recursively)"
+                },
+                "glob": {
+                    "type": "string",
+                    "description": "Only search files whose name matches this pattern, e.g. '*.py'"
+                },
+                "ignore_case": {
+                    "type": "boolean",
+                    "description": "Case-insensitive matching (ASCII letters)",
+                    "default": False
+                },
+                "context": {
+                    "type": "integer",
+                    "description": "Lines of context to include before and after each match",
+                    "default": 0
+                },
+                "max_matches": {
+                    "type": "integer",
+                    "description": "Maximum number of matching lines to return"
+                }
+            },
+            "required": ["pattern", "path"]
+        }
+    
+    def execute(self, pattern: str, path: str, glob: str = None, ignore_case: bool = False,
+                context: int = 0, max_matches: int = None) -> dict:
+        try:
+            try:
+                regex = _compile(pattern, bool(ignore_case))
+            except re.error as e:
+                return {"error": f"Invalid regular expression: {str(e)}"}
+            
+            if not os.path.exists(path):
+                return {"error": f"Path not found: {path}"}
+            
+            limit = min(max_matches or self.max_matches, self.max_matches)
+            context = max(0, min(context or 0, 10))
+            files, truncated = self._files(path, glob)
+            
+            # Scan files concurrently; each stops one match past the limit (to tell whether any were
+            # left out) or at the search deadline, and results keep path order
+            agent_token = current_token()
+            token = agent_token.child(self.timeout) if agent_token is not None else CancellationToken(self.timeout)
+            futures = [self._scan_pool.submit(self._scan_file, file_path, regex, context, limit + 1, token)
+                       for file_path in files]
+            matches = []
+            timed_out = False
+            try:
+                for future in futures:
+                    check_cancelled()
+                    try:
+                        matches.extend(future.result(timeout=token.remaining()))
+                    except FutureTimeout:
+                        timed_out = True
+                        break
+                    if len(matches) > limit:
+                        truncated = True
+                        break
+                timed_out = timed_out or token.cancelled
+            finally:
+                # Files not started yet are not needed any more; running scans stop at their next window
+                token.cancel("search finished")
+                for future in futures:
+                    future.cancel()
+            
+            result = {
+                "pattern": pattern,
+                "path": path,
+                "matches": matches[:limit],
+                "files_scanned": len(files),
+                "truncated": truncated or timed_out,
+                "success": True
+            }
+            if timed_out:
+                result["timed_out"] = True
+            return result
+        
+        except PermissionError:
+            return {"error": f"Permission denied: {path}"}
+        except Exception as e:
+            return {"error": f"Search failed: {str(e)}"}
+    
+    def _files(self, path: str, glob: str = None):
+        """Files to scan under path, and whether the max_files limit cut the list"""
+        if os.path.isfile(path):
+            return [path], False
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRS)
+            for name in sorted(names):
+                if glob and not fnmatch.fnmatch(name, glob):
+                    continue
+                files.append(os.path.join(root, name))
+                if len(files) >= self.max_files:
+                    return files, True
+        return files, False
+    
+    def _scan_file(self, file_path: str, regex, context: int, limit: int, token=None) -> list:
+        """Matching lines of one file, found on a read-only memory map"""
+        try:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Binary files (NUL bytes near the start) are skipped
+                    if mm.find(b"\0", 0, 8192) >= 0:
+                        return []
+                    return self._matches(file_path, mm, regex, context, limit, token)
+        except (OSError, ValueError):
+            return []
+    
+    def _matches(self, file_path: str, mm, regex, context: int, limit: int, token=None) -> list:
+        matches = []
+        line_number = 1
+        counted_to = 0
+        next_line_start = 0
+        position = 0
+        while position < len(mm) and len(matches) < limit:
+            if token is not None and token.cancelled:
+                break
+            window_end, next_window = _window(mm, position)
+            for match in regex.finditer(mm, position, window_end):
+                if match.start() < next_line_start:
+                    # Another match on a line already reported
+                    continue
+                if token is not None and token.cancelled:
+                    break
+                start, end = _line_bounds(mm, match.start())
+                # Line numbers are counted incrementally between matches
+                line_number += _count_newlines(mm, counted_to, start)
+                counted_to = start
+                entry = {
+                    "path": file_path,
+                    "line": line_number,
+                    "offset": start,
+                    "text": self._text(mm[start:end])
+                }
+                if context:
+                    entry["before"] = self._context_before(mm, start, context)
+                    entry["after"] = self._context_after(mm, end, context)
+                matches.append(entry)
+                if len(matches) >= limit:
+                    break
+                next_line_start = end + 1
+            position = next_window
+        return matches
+    
+    def _context_before(self, mm, start: int, count: int) -> list:
+        lines = []
+        end = start - 1
+        while end >= 0 and len(lines) < count:
+            line_start = mm.rfind(b"\n", 0, end) + 1
+            lines.append(self._text(mm[line_start:end]))
+            end = line_start - 1
+        return lines[::-1]
+    
+    def _context_after(self, mm, end: int, count: int) -> list:
+        lines = []
+        start = end + 1
+        while start < len(mm) and len(lines) < count:
+            line_end = mm.find(b"\n", start)
+            line_end = len(mm) if line_end < 0 else line_end
+            lines.append(self._text(mm[start:line_end]))
+            start = line_end + 1
+        return lines
+    
+    def _text(self, line: bytes) -> str:
+        text = line.decode('utf-8', errors='replace').rstrip('\r')
+        if len(text) > self.max_line_chars:
+            text = text[:self.max_line_chars] + "..."
+        return text
\ No newline at end of file
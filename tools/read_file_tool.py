@@ -1,9 +1,90 @@
 from .base_tool import BaseTool
+from bisect import bisect_left
+from collections import OrderedDict
+import mmap
 import os
+import threading
+
+# Sparse line index: newlines counted per 1 MiB block, so locating a line scans at most one block
+_INDEX_BLOCK = 1 << 20
+_MAX_INDEXES = 16
+
+# Line indexes of recently read files, keyed by (path, mtime, size)
+_line_indexes = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+class _LineIndex:
+    """Newline counts before each block of a file version, for O(block) line lookups"""
+    
+    def __init__(self, mm, size: int):
+        self.size = size
+        # newlines[k]: newlines in bytes [0, k * _INDEX_BLOCK)
+        self.newlines = [0]
+        for start in range(0, size, _INDEX_BLOCK):
+            self.newlines.append(self.newlines[-1] + mm[start:start + _INDEX_BLOCK].count(b"\n"))
+        total = self.newlines[-1]
+        # A last line without a trailing newline still counts
+        self.total_lines = total + (1 if size and mm[size - 1:size] != b"\n" else 0)
+    
+    def offset(self, mm, line: int) -> int:
+        """Byte offset where the 0-based line starts (the file size past the last line)"""
+        if line <= 0:
+            return 0
+        if line >= self.total_lines:
+            return self.size
+        # The block holding the line-th newline, then a scan within it
+        block = bisect_left(self.newlines, line) - 1
+        position = block * _INDEX_BLOCK
+        for _ in range(line - self.newlines[block]):
+            position = mm.find(b"\n", position) + 1
+        return position
+
+
+def _line_index(path: str, mm, stat) -> _LineIndex:
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is not None:
+            _line_indexes.move_to_end(key)
+            return index
+    index = _LineIndex(mm, stat.st_size)
+    with _line_indexes_lock:
+        _line_indexes[key] = index
+        while len(_line_indexes) > _MAX_INDEXES:
+            _line_indexes.popitem(last=False)
+    return index
+
+
+def _char_boundary(data, position: int) -> int:
+    """Move position back to the start of a UTF-8 character"""
+    while 0 < position < len(data) and (data[position] & 0xC0) == 0x80:
+        position -= 1
+    return position
+
+
+def _next_char_boundary(data, position: int) -> int:
+    """Move position forward to the start of a UTF-8 character"""
+    while 0 < position < len(data) and (data[position] & 0xC0) == 0x80:
+        position += 1
+    return position
+
+
+def _cut(data: bytes, budget: int) -> bytes:
+    """At most budget bytes of data, ending after a whole line when one fits"""
+    if len(data) <= budget:
+        return data
+    end = data.rfind(b"\n", 0, budget) + 1
+    return data[:end or _char_boundary(data, budget)]
+
 
 class ReadFileTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
+        read_config = config.get('read_file', {}) or {}
+        
+        # Hard limit on the content returned by one call; larger reads continue with next_offset
+        self.max_output_bytes = read_config.get('max_output_bytes', 65536)
     
     @property
     def name(self) -> str:
@@ -11,7 +92,10 @@ class ReadFileTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Read the complete contents of a file from the file system. Handles various text encodings and provides detailed error messages if the file cannot be read."
+        return ("Read the contents of a file from the file system. Large files are returned in pages: "
+                "when the result has a next_offset, call again with offset=next_offset to continue. "
+                "Supports the first/last N lines and line ranges. Handles various text encodings and "
+                "provides detailed error messages if the file cannot be read.")
     
     @property
     def parameters(self) -> dict:
@@ -29,16 +113,37 @@ class ReadFileTool(BaseTool):
                 "tail": {
                     "type": "integer",
                     "description": "If provided, returns only the last N lines of the file"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Byte offset to start reading at (use next_offset from a previous call to continue)"
+                },
+                "start_line": {
+                    "type": "integer",
+                    "description": "First line to return (1-based)"
+                },
+                "end_line": {
+                    "type": "integer",
+                    "description": "Last line to return (inclusive, defaults to as many as fit in one page)"
                 }
             },
             "required": ["path"]
         }
     
-    def execute(self, path: str, head: int = None, tail: int = None) -> dict:
+    def execute(self, path: str, head: int = None, tail: int = None, offset: int = None,
+                start_line: int = None, end_line: int = None) -> dict:
         try:
             # Validate parameters
-            if head is not None and tail is not None:
-                return {"error": "Cannot specify both head and tail parameters"}
+            modes = [name for name, value in (("head", head), ("tail", tail), ("offset", offset),
+                                              ("start_line", start_line)) if value is not None]
+            if len(modes) > 1:
+                return {"error": f"Cannot combine {' and '.join(modes)} parameters"}
+            if end_line is not None and start_line is None:
+                start_line = 1
+            if any(value is not None and value < 0 for value in (head, tail, offset)) \
+                    or (start_line is not None and start_line < 1) \
+                    or (end_line is not None and end_line < start_line):
+                return {"error": "head, tail and offset must not be negative, line numbers start at 1"}
             
             # Check if file exists
             if not os.path.exists(path):
@@ -48,36 +153,114 @@ class ReadFileTool(BaseTool):
             if not os.path.isfile(path):
                 return {"error": f"Path is not a file: {path}"}
             
-            # Read file with appropriate method
+            # Read file with appropriate method; memory stays bounded by the output budget
             if head is not None:
-                # Read first N lines
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = []
-                    for i in range(head):
-                        line = f.readline()
-                        if not line:  # EOF reached
-                            break
-                        lines.append(line)
-                    content = ''.join(lines).rstrip('\n')
-            elif tail is not None:
-                # Read last N lines
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    content = ''.join(lines[-tail:]).rstrip('\n') if lines else ""
-            else:
-                # Read entire file
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            
-            return {
-                "path": path,
-                "content": content,
-                "success": True
-            }
+                return self._read_head(path, head)
+            if tail is not None:
+                return self._read_tail(path, tail)
+            if start_line is not None:
+                return self._read_lines(path, start_line, end_line)
+            return self._read_range(path, offset or 0)
         
         except UnicodeDecodeError as e:
             return {"error": f"Failed to decode file as UTF-8: {str(e)}"}
         except PermissionError:
             return {"error": f"Permission denied reading file: {path}"}
         except Exception as e:
-            return {"error": f"Failed to read file: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to read file: {str(e)}"}
+    
+    def _result(self, path: str, data: bytes, start: int, size: int, strip: bool = False, **extra) -> dict:
+        """Decode a page of the file; next_offset tells the caller where the following page starts"""
+        content = data.decode('utf-8').replace('\r\n', '\n')
+        result = {
+            "path": path,
+            "content": content.rstrip('\n') if strip else content,
+            "success": True
+        }
+        end = start + len(data)
+        if start > 0 or end < size:
+            result.update(offset=start, size=size)
+            if end < size:
+                result["next_offset"] = end
+        result.update({key: value for key, value in extra.items() if value})
+        return result
+    
+    def _read_range(self, path: str, offset: int) -> dict:
+        """One page of bytes from offset; the whole file when it fits the budget"""
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(min(offset, size))
+            data = f.read(self.max_output_bytes + 1)
+        # An offset inside a multi-byte character moves on to the next character
+        skip = 0
+        while skip < len(data) and (data[skip] & 0xC0) == 0x80:
+            skip += 1
+        # Skipped bytes count against the page, so a page ending inside a character is cut too
+        page = _cut(data[skip:], self.max_output_bytes - skip)
+        return self._result(path, page, min(offset, size) + skip, size, truncated=len(page) < len(data) - skip)
+    
+    def _read_head(self, path: str, head: int) -> dict:
+        # Read first N lines
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            lines = []
+            used = 0
+            truncated = False
+            for _ in range(head):
+                line = f.readline(self.max_output_bytes - used + 1)
+                if not line:  # EOF reached
+                    break
+                if used + len(line) > self.max_output_bytes:
+                    # Only part of a line fits: stop at a line boundary if anything was read
+                    truncated = True
+                    if not lines:
+                        lines.append(line[:_char_boundary(line, self.max_output_bytes)])
+                    break
+                lines.append(line)
+                used += len(line)
+        data = b''.join(lines)
+        return self._result(path, data, 0, size, strip=True, truncated=truncated)
+    
+    def _read_tail(self, path: str, tail: int) -> dict:
+        # Read last N lines, seeking backwards from the end of the file
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or tail == 0:
+                return self._result(path, b'', size, size, strip=True)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # A trailing newline ends the last line, it does not start a new one
+                position = size - 1 if mm[size - 1:size] == b"\n" else size
+                for _ in range(tail):
+                    position = mm.rfind(b"\n", 0, position)
+                    if position < 0:
+                        break
+                start = position + 1
+                truncated = size - start > self.max_output_bytes
+                if truncated:
+                    # Keep the last lines that fit, starting at a line boundary when possible
+                    cut = size - self.max_output_bytes
+                    newline = mm.find(b"\n", cut, size - 1)
+                    start = newline + 1 if newline >= 0 else _next_char_boundary(mm, cut)
+                data = mm[start:size]
+        return self._result(path, data, start, size, strip=True, truncated=truncated)
+    
+    def _read_lines(self, path: str, start_line: int, end_line: int = None) -> dict:
+        """Lines start_line..end_line (1-based, inclusive) located through the cached line index"""
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            if size == 0:
+                return self._result(path, b'', 0, 0, strip=True, total_lines=0)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                index = _line_index(path, mm, stat)
+                start = index.offset(mm, start_line - 1)
+                if end_line is not None:
+                    end = index.offset(mm, end_line)
+                else:
+                    end = min(size, start + self.max_output_bytes + 1)
+                data = mm[start:min(end, start + self.max_output_bytes + 1)]
+        page = _cut(data, self.max_output_bytes)
+        extra = {"total_lines": index.total_lines, "truncated": end_line is not None and start + len(page) < end}
+        if page.endswith(b"\n") and start + len(page) < size:
+            extra["next_line"] = start_line + page.count(b"\n")
+        return self._result(path, page, start, size, strip=True, **extra)
\ No newline at end of file
@@ -1,12 +1,54 @@
 from .base_tool import BaseTool
 from ddgs import DDGS
-from bs4 import BeautifulSoup
-import requests
+from http_pool import get_http_client, get_async_http_client
+from html_extract import extract_text, limit_bytes
+from cache_store import get_cache
+from cancellation import current_token, check_cancelled
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
+import contextvars
+import functools
 import json
+import threading
+import weakref
+
+# One fetch pool per process, shared by every SearchTool instance (config reloads create new ones)
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _get_fetch_pool(workers: int) -> ThreadPoolExecutor:
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-fetch")
+        return _fetch_pool
+
 
 class SearchTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
+        search_config = config.get('search', {})
+        
+        # Page fetching: per-page timeout, overall deadline for one search call
+        self.fetch_timeout = search_config.get('fetch_timeout', 10)
+        self.fetch_deadline = search_config.get('fetch_deadline', 15)
+        
+        # Content extraction: characters kept per page, body bytes read at most, parser backend
+        self.content_chars = search_config.get('content_chars', 1000)
+        self.max_page_bytes = search_config.get('max_page_bytes', 2 * 1024 * 1024)
+        self.html_parser = search_config.get('html_parser', 'auto')
+        
+        # Bounded worker pool shared by every agent and every instance of this tool
+        self._fetch_pool = _get_fetch_pool(search_config.get('fetch_workers', 8))
+        
+        # Two-level cache shared by all agents: normalized query -> results, URL -> page text
+        self.query_cache = get_cache('search_queries', config)
+        self.page_cache = get_cache('search_pages', config)
+        
+        # Async page fetches in flight per event loop, so agents on one loop share a download
+        self._async_fetches = weakref.WeakKeyDictionary()
+        self._async_fetches_lock = threading.Lock()
     
     @property
     def name(self) -> str:
@@ -37,54 +79,160 @@ class SearchTool(BaseTool):
     def execute(self, query: str, max_results: int = 5) -> list:
         """Search the web using DuckDuckGo and fetch page content"""
         try:
-            # Use ddgs library
-            ddgs = DDGS()
-            results = ddgs.text(query, max_results=max_results)
+            # Don't start network work for an agent that was cancelled meanwhile
+            check_cancelled()
             
-            simplified_results = []
+            # Near-identical queries from parallel agents share one search
+            query_key = f"{max_results}:{' '.join(query.lower().split())}"
+            results = self.query_cache.get_or_compute(query_key, functools.partial(self._search, query, max_results))
+            
+            # Fetch all result pages concurrently under one overall deadline;
+            # the page cache coalesces agents asking for the same URL into one download
+            futures = [
+                self.page_cache.get_or_submit(
+                    result['href'],
+                    functools.partial(self._fetch_content, result['href']),
+                    self._fetch_pool
+                )
+                for result in results
+            ]
+            # ...never waiting past the calling agent's own deadline
+            token = current_token()
+            done, _ = wait(futures, timeout=token.bound(self.fetch_deadline) if token else self.fetch_deadline)
+            return self._simplify(results, futures, done)
+        
+        except Exception as e:
+            return [{"error": f"Search failed: {str(e)}"}]
+    
+    async def aexecute(self, query: str, max_results: int = 5) -> list:
+        """
+        Native async search: pages are fetched on the event loop's pooled client, so concurrent
+        agents do not queue on the loop's few default executor threads for up to fetch_deadline.
+        """
+        try:
+            check_cancelled()
+            loop = asyncio.get_running_loop()
             
-            for result in results:
+            # DuckDuckGo has no async API: the search runs on this tool's own pool instead
+            query_key = f"{max_results}:{' '.join(query.lower().split())}"
+            search = functools.partial(self.query_cache.get_or_compute, query_key,
+                                       functools.partial(self._search, query, max_results))
+            results = await loop.run_in_executor(self._fetch_pool, contextvars.copy_context().run, search)
+            
+            futures = [self._page_task(result['href']) for result in results]
+            token = current_token()
+            done = set()
+            if futures:
+                done, _ = await asyncio.wait(futures, timeout=token.bound(self.fetch_deadline) if token else self.fetch_deadline)
+            return self._simplify(results, futures, done)
+        
+        except Exception as e:
+            return [{"error": f"Search failed: {str(e)}"}]
+    
+    @staticmethod
+    def _simplify(results: list, futures: list, done: set) -> list:
+        """Search results with the content of their page, in the original ranking order"""
+        simplified_results = []
+        for result, future in zip(results, futures):
+            if future not in done:
+                # Too slow: degrade to the search snippet instead of blocking the tool call.
+                # The fetch is shared with other agents and still fills the cache when it lands.
+                content = result['body']
+            else:
                 try:
-                    # Fetch content with requests
-                    response = requests.get(
-                        result['href'], 
-                        headers={'User-Agent': self.config.get('search', {}).get('user_agent', 'Mozilla/5.0')},
-                        timeout=10
-                    )
-                    response.raise_for_status()
-                    
-                    # Parse HTML with BeautifulSoup
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    # Get text content
-                    text = soup.get_text()
-                    # Clean up whitespace
-                    text = ' '.join(text.split())
-                    
-                    # Limit content length
-                    content_snippet = text[:1000] + "..." if len(text) > 1000 else text
-                    
-                    simplified_results.append({
-                        "title": result['title'],
-                        "url": result['href'],
-                        "snippet": result['body'],
-                        "content": content_snippet
-                    })
-                
+                    content = future.result()
                 except Exception as e:
                     # If we can't fetch the page, still include the search result
-                    simplified_results.append({
-                        "title": result['title'],
-                        "url": result['href'],
-                        "snippet": result['body'],
-                        "content": f"Could not fetch content: {str(e)}"
-                    })
+                    content = f"Could not fetch content: {str(e)}"
             
-            return simplified_results
+            simplified_results.append({
+                "title": result['title'],
+                "url": result['href'],
+                "snippet": result['body'],
+                "content": content
+            })
         
-        except Exception as e:
-            return [{"error": f"Search failed: {str(e)}"}]
\ No newline at end of file
+        return simplified_results
+    
+    def _search(self, query: str, max_results: int) -> list:
+        """Run the DuckDuckGo search and keep the fields we use"""
+        # Use ddgs library
+        ddgs = DDGS()
+        return [
+            {"title": result['title'], "href": result['href'], "body": result['body']}
+            for result in ddgs.text(query, max_results=max_results)
+        ]
+    
+    def _headers(self) -> dict:
+        return {'User-Agent': self.config.get('search', {}).get('user_agent', 'Mozilla/5.0')}
+    
+    def _fetch_content(self, url: str) -> str:
+        """Fetch a result page and return a cleaned-up text snippet"""
+        # Stream the body through the shared keep-alive connection pool so extraction
+        # can stop reading once it has enough text, and never read more than max_page_bytes
+        with get_http_client(self.config).stream(
+            "GET",
+            url,
+            headers=self._headers(),
+            timeout=self.fetch_timeout
+        ) as response:
+            response.raise_for_status()
+            return extract_text(
+                limit_bytes(response.iter_bytes(), self.max_page_bytes),
+                max_chars=self.content_chars,
+                encoding=response.charset_encoding,
+                backend=self.html_parser
+            )
+    
+    def _page_task(self, url: str) -> asyncio.Future:
+        """Cached page text, or the shared task fetching it on the running loop"""
+        loop = asyncio.get_running_loop()
+        content = self.page_cache.get(url)
+        if content is not None:
+            future = loop.create_future()
+            future.set_result(content)
+            return future
+        
+        with self._async_fetches_lock:
+            fetches = self._async_fetches.setdefault(loop, {})
+        task = fetches.get(url)
+        if task is None:
+            task = loop.create_task(self._afetch_content(url))
+            fetches[url] = task
+            
+            def forget(done):
+                fetches.pop(url, None)
+                # A page nobody waited for any more may have failed: that is not worth a warning
+                if not done.cancelled():
+                    done.exception()
+            task.add_done_callback(forget)
+        return task
+    
+    async def _afetch_content(self, url: str) -> str:
+        """Async _fetch_content: the body is read on the loop, only the extraction runs on the pool"""
+        chunks = []
+        async with get_async_http_client(self.config).stream(
+            "GET",
+            url,
+            headers=self._headers(),
+            timeout=self.fetch_timeout
+        ) as response:
+            response.raise_for_status()
+            size = 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_page_bytes:
+                    break
+            encoding = response.charset_encoding
+        
+        extract = functools.partial(
+            extract_text,
+            limit_bytes(chunks, self.max_page_bytes),
+            max_chars=self.content_chars,
+            encoding=encoding,
+            backend=self.html_parser
+        )
+        content = await asyncio.get_running_loop().run_in_executor(self._fetch_pool, extract)
+        self.page_cache.set(url, content)
+        return content
\ No newline at end of file
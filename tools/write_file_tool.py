@@ -1,10 +1,66 @@
 from .base_tool import BaseTool
+from cancellation import current_token
+from contextlib import contextmanager
 import os
+import stat
 import tempfile
+import threading
+import time
+import uuid
+
+# One lock per target file, shared by every agent thread of the process.
+# Entries are [lock, users] and removed when the last user releases them
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+# Chunked writes in progress, shared by every agent: upload id -> _Upload
+_uploads = {}
+_uploads_lock = threading.Lock()
+
+MODES = ("overwrite", "append", "chunk")
+
+
+@contextmanager
+def _path_lock(abs_path: str):
+    """Hold the lock of abs_path; writers of different files never wait for each other"""
+    with _path_locks_lock:
+        entry = _path_locks.get(abs_path)
+        if entry is None:
+            entry = _path_locks[abs_path] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _path_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _path_locks[abs_path]
+
+
+class _Upload:
+    """Staging file of one chunked write, owned by the agent run that started it"""
+    
+    def __init__(self, abs_path: str, temp_path: str, token=None):
+        self.abs_path = abs_path
+        self.temp_path = temp_path
+        self.token = token
+        self.next_index = 0
+        self.touched = time.monotonic()
+
 
 class WriteFileTool(BaseTool):
+    side_effecting = True
+    
     def __init__(self, config: dict):
         self.config = config
+        write_config = config.get('write_file', {}) or {}
+        
+        # Flush written data to disk before reporting success (slower, survives power loss)
+        self.fsync = write_config.get('fsync', False)
+        
+        # Unfinished chunked writes idle for longer than this (seconds) are discarded
+        self.upload_ttl = write_config.get('upload_ttl', 3600)
     
     @property
     def name(self) -> str:
@@ -12,7 +68,11 @@ class WriteFileTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Create a new file or completely overwrite an existing file with new content. Use with caution as it will overwrite existing files without warning."
+        return ("Create a new file or completely overwrite an existing file with new content. Use with caution as it "
+                "will overwrite existing files without warning. mode='append' adds content to the end of the file; "
+                "mode='chunk' builds a large file over several calls (chunk_index 0, 1, 2, ...; final=true on the "
+                "last one): chunk 0 returns an upload_id to pass with every later chunk, and the file only "
+                "appears once it is complete.")
     
     @property
     def parameters(self) -> dict:
@@ -26,13 +86,36 @@ class WriteFileTool(BaseTool):
                 "content": {
                     "type": "string",
                     "description": "The content to write to the file"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": list(MODES),
+                    "description": "overwrite (default), append, or chunk for incremental writes",
+                    "default": "overwrite"
+                },
+                "chunk_index": {
+                    "type": "integer",
+                    "description": "Position of this chunk in mode 'chunk', starting at 0"
+                },
+                "upload_id": {
+                    "type": "string",
+                    "description": "In mode 'chunk': the upload_id returned by chunk 0, required for later chunks"
+                },
+                "final": {
+                    "type": "boolean",
+                    "description": "In mode 'chunk': this is the last chunk, publish the file",
+                    "default": False
                 }
             },
             "required": ["path", "content"]
         }
     
-    def execute(self, path: str, content: str) -> dict:
+    def execute(self, path: str, content: str, mode: str = "overwrite", chunk_index: int = None,
+                upload_id: str = None, final: bool = False) -> dict:
         try:
+            if mode not in MODES:
+                return {"error": f"Unknown mode: {mode} (expected one of {', '.join(MODES)})"}
+            
             # Get absolute path
             abs_path = os.path.abspath(path)
             
@@ -41,34 +124,145 @@ class WriteFileTool(BaseTool):
             if parent_dir and not os.path.exists(parent_dir):
                 os.makedirs(parent_dir, exist_ok=True)
             
-            # Write file atomically using temporary file
-            temp_path = abs_path + '.tmp'
-            try:
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                # Atomic rename
-                os.rename(temp_path, abs_path)
-                
-                return {
-                    "path": abs_path,
-                    "bytes_written": len(content.encode('utf-8')),
-                    "success": True,
-                    "message": f"Successfully wrote to {path}"
-                }
+            data = content.encode('utf-8')
+            extra = {}
+            if mode == "chunk":
+                self._sweep_uploads()
+            # Agents writing the same file from parallel threads take turns
+            with _path_lock(abs_path):
+                if mode == "append":
+                    self._append(abs_path, data)
+                    message = f"Successfully appended to {path}"
+                elif mode == "chunk":
+                    extra = self._write_chunk(abs_path, data, chunk_index, upload_id, final)
+                    if "error" in extra:
+                        return extra
+                    message = f"Successfully wrote chunk {chunk_index} of {path}" + (" (file complete)" if final else "")
+                else:
+                    self._replace(abs_path, data)
+                    message = f"Successfully wrote to {path}"
             
-            except Exception as e:
-                # Clean up temp file if it exists
-                if os.path.exists(temp_path):
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
-                raise e
+            return {
+                "path": abs_path,
+                "bytes_written": len(data),
+                "success": True,
+                "message": message,
+                **extra
+            }
         
         except PermissionError:
             return {"error": f"Permission denied writing to file: {path}"}
         except OSError as e:
             return {"error": f"OS error writing file: {str(e)}"}
         except Exception as e:
-            return {"error": f"Failed to write file: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to write file: {str(e)}"}
+    
+    def _sync(self, f):
+        if self.fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _sync_directory(self, directory: str):
+        """Persist a rename (POSIX only; directories cannot be opened on Windows)"""
+        if self.fsync and os.name == 'posix':
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    
+    def _append(self, abs_path: str, data: bytes):
+        with open(abs_path, 'ab') as f:
+            f.write(data)
+            self._sync(f)
+    
+    def _new_temp(self, abs_path: str) -> str:
+        """Unique temporary file next to the target, so the final rename stays on one file system"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(abs_path), prefix=f".{os.path.basename(abs_path)}.", suffix=".tmp")
+        os.close(fd)
+        # mkstemp creates the file owner-only; keep the target's permissions (or the usual default)
+        try:
+            file_mode = stat.S_IMODE(os.stat(abs_path).st_mode)
+        except FileNotFoundError:
+            file_mode = 0o644
+        os.chmod(temp_path, file_mode)
+        return temp_path
+    
+    def _publish(self, temp_path: str, abs_path: str):
+        # Atomic rename: readers see the old or the new file, never a partial one
+        os.replace(temp_path, abs_path)
+        self._sync_directory(os.path.dirname(abs_path))
+    
+    def _replace(self, abs_path: str, data: bytes):
+        # Write file atomically using a unique temporary file
+        temp_path = self._new_temp(abs_path)
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                self._sync(f)
+            self._publish(temp_path, abs_path)
+        except BaseException:
+            # Clean up temp file if it exists
+            self._discard(temp_path)
+            raise
+    
+    @staticmethod
+    def _discard(temp_path: str):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    
+    def _write_chunk(self, abs_path: str, data: bytes, chunk_index: int, upload_id: str = None,
+                     final: bool = False) -> dict:
+        """Append a chunk to the staging file of an upload; the last chunk publishes it atomically"""
+        if chunk_index is None:
+            return {"error": "chunk_index is required in mode 'chunk'"}
+        if chunk_index == 0:
+            # Every chunk 0 starts its own upload, so agents writing the same path never share a staging file
+            upload_id = uuid.uuid4().hex
+            upload = _Upload(abs_path, self._new_temp(abs_path), current_token())
+            with _uploads_lock:
+                _uploads[upload_id] = upload
+        else:
+            if not upload_id:
+                return {"error": "upload_id (returned by chunk 0) is required for later chunks"}
+            with _uploads_lock:
+                upload = _uploads.get(upload_id)
+            if upload is None or upload.abs_path != abs_path:
+                return {"error": f"Unknown upload_id {upload_id} for {abs_path}: start again with chunk_index 0"}
+            if chunk_index != upload.next_index:
+                return {"error": f"Expected chunk_index {upload.next_index} for upload {upload_id}, got {chunk_index}"}
+        try:
+            with open(upload.temp_path, 'ab') as f:
+                f.write(data)
+                if final:
+                    self._sync(f)
+            upload.next_index = chunk_index + 1
+            upload.touched = time.monotonic()
+            if final:
+                self._end_upload(upload_id)
+                self._publish(upload.temp_path, abs_path)
+        except BaseException:
+            self._end_upload(upload_id)
+            self._discard(upload.temp_path)
+            raise
+        return {"upload_id": upload_id}
+    
+    @staticmethod
+    def _end_upload(upload_id: str):
+        with _uploads_lock:
+            _uploads.pop(upload_id, None)
+    
+    def _sweep_uploads(self):
+        """Discard staging files of uploads abandoned without final=true: idle too long or agent cancelled"""
+        now = time.monotonic()
+        with _uploads_lock:
+            stale = [upload_id for upload_id, upload in _uploads.items()
+                     if now - upload.touched > self.upload_ttl
+                     or (upload.token is not None and upload.token.cancelled)]
+            uploads = [_uploads.pop(upload_id) for upload_id in stale]
+        for upload in uploads:
+            # Taking the path lock waits for a chunk of that upload still being written
+            with _path_lock(upload.abs_path):
+                self._discard(upload.temp_path)
\ No newline at end of file